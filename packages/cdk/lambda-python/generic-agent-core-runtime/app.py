@@ -1,14 +1,26 @@
 """Main FastAPI application for Generic AgentCore Runtime."""
 
-import json
+import asyncio
 import logging
 import traceback
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 
+from src.admission import AdmissionController, AdmissionRejectedError
 from src.agent import AgentManager
-from src.utils import clean_ws_directory, create_error_response, create_ws_directory
+from src.batch import BatchRunner
+from src.config import BATCH_MAX_ITEMS, DEBUG_ENDPOINTS
+from src.context import RequestContext
+from src.executors import executors, run_blocking
+from src.loop_monitor import LoopLagMonitor
+from src.metrics import metrics
+from src.startup import measure_import_time
+from src.types import HistoryConfig, ResponseCacheConfig
+from src.utils import PayloadTooLargeError, create_error_response, parse_request_body, read_request_body
+from src.workspaces import workspaces
 
 # Configure root logger
 logging.basicConfig(
@@ -18,21 +30,78 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# Initialize agent manager
+agent_manager = AgentManager()
+
+# Reports handlers that block the event loop
+loop_monitor = LoopLagMonitor()
+
+# Limits the number of concurrent agent runs
+admission = AdmissionController()
+
+# Runs batches of independent requests
+batch_runner = BatchRunner(agent_manager, admission)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up the MCP server pool and tools in the background at startup and stop them at shutdown"""
+    loop_monitor.start()
+    await run_blocking("workspace", workspaces.start)
+    warmup_task = asyncio.create_task(run_blocking("mcp", agent_manager.warm_up))
+    yield
+    warmup_task.cancel()
+    await run_blocking("mcp", agent_manager.tool_manager.mcp_pool.stop)
+    await run_blocking("workspace", workspaces.stop)
+    loop_monitor.stop()
+    executors.shutdown()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Generic AgentCore Runtime",
     description="AWS Bedrock AgentCore Runtime with Strands Agent and MCP support",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
-# Initialize agent manager
-agent_manager = AgentManager()
-
 
 @app.get("/ping")
 async def ping():
     """Health check endpoint required by AgentCore"""
-    return {"status": "healthy", "service": "generic-agent-core-runtime"}
+    return {
+        "status": "healthy",
+        "service": "generic-agent-core-runtime",
+        "ready": agent_manager.tool_manager.mcp_pool.is_ready,
+    }
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Runtime metrics including MCP server startup times"""
+    return {
+        "mcp_pool": agent_manager.tool_manager.mcp_pool.get_status(),
+        "event_loop": loop_monitor.get_status(),
+        "admission": admission.get_status(),
+        "session_cache": agent_manager.session_cache.get_status(),
+        "model_routing": agent_manager.model_router.get_status(),
+        "workspaces": workspaces.get_status(),
+        **metrics.snapshot(),
+    }
+
+
+if DEBUG_ENDPOINTS:
+
+    @app.get("/debug/importtime")
+    async def debug_importtime(module: str = "app", top: int = 20):
+        """Import time report of a fresh interpreter (python -X importtime)"""
+        try:
+            return await run_blocking("workspace", measure_import_time, module, top)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content=create_error_response(str(e)))
+        except Exception as e:
+            logger.error(f"Error measuring import time: {e}")
+            return JSONResponse(status_code=500, content=create_error_response(str(e)))
 
 
 @app.post("/invocations")
@@ -47,17 +116,20 @@ async def invocations(request: Request):
     trace_id = headers.get("x-amzn-trace-id")
     logger.info(f"New invocation: {session_id} {trace_id}")
 
-    # Set session info in agent manager
-    agent_manager.set_session_info(session_id, trace_id)
+    # Each request gets its own context; the workspace is shared by the turns of a session only
+    context = RequestContext(session_id, trace_id)
 
-    # Ensure workspace directory exists
-    create_ws_directory()
+    # Wait for a free slot before reading the body, so queued requests hold no request data
+    try:
+        ticket = await admission.acquire()
+    except AdmissionRejectedError as e:
+        return JSONResponse(status_code=e.status_code, content=create_error_response(str(e)), headers={"Retry-After": str(e.retry_after)})
 
     try:
-        # Read and parse request body
-        body = await request.body()
-        body_str = body.decode()
-        request_data = json.loads(body_str)
+        # Read and parse request body, decoding base64 media into bytes while parsing
+        body = await read_request_body(request)
+        request_data = await run_blocking("parse", parse_request_body, body)
+        del body
 
         # Handle input field if present (AWS Lambda integration format)
         if "input" in request_data and isinstance(request_data["input"], dict):
@@ -68,22 +140,74 @@ async def invocations(request: Request):
         system_prompt = request_data.get("system_prompt")
         prompt = request_data.get("prompt", [])
         model_info = request_data.get("model", {})
+        history_config = HistoryConfig(**request_data.get("history") or {})
+        cache_config = ResponseCacheConfig(**request_data.get("cache") or {})
 
         # Return streaming response
         async def generate():
+            # Ensure the workspace of the session exists (file system work never runs on the event loop)
+            await run_blocking("workspace", workspaces.acquire, context, True)
             try:
-                async for chunk in agent_manager.process_request_streaming(messages=messages, system_prompt=system_prompt, prompt=prompt, model_info=model_info):
+                async for chunk in agent_manager.process_request_streaming(
+                    messages=messages,
+                    system_prompt=system_prompt,
+                    prompt=prompt,
+                    model_info=model_info,
+                    context=context,
+                    history_config=history_config,
+                    cache_config=cache_config,
+                    session_cache=True,
+                ):
                     yield chunk
             finally:
-                clean_ws_directory()
-
-        return StreamingResponse(generate(), media_type="text/event-stream")
+                ticket.release()
+                workspaces.release(context)
+
+        # The background task releases the slot if the stream is never started
+        return StreamingResponse(generate(), media_type="text/event-stream", background=BackgroundTask(ticket.release))
+    except PayloadTooLargeError as e:
+        ticket.release()
+        logger.warning(f"Request rejected: {e}")
+        return JSONResponse(status_code=413, content=create_error_response(str(e)))
     except Exception as e:
+        ticket.release()
         logger.error(f"Error processing request: {e}")
         logger.error(traceback.format_exc())
         return create_error_response(str(e))
-    finally:
-        clean_ws_directory()
+
+
+@app.post("/batch")
+async def batch(request: Request):
+    """Batch invocation endpoint
+
+    Expects request with requests (a list of invocation requests with an
+    optional id) and an optional concurrency. Streams one batchResult line
+    per item in completion order, followed by a batchSummary line.
+    """
+    headers = dict(request.headers)
+    session_id = headers.get("x-amzn-bedrock-agentcore-runtime-session-id")
+    trace_id = headers.get("x-amzn-trace-id")
+
+    try:
+        body = await read_request_body(request)
+        request_data = await run_blocking("parse", parse_request_body, body)
+        del body
+
+        items = request_data.get("requests", [])
+        if not isinstance(items, list) or not items:
+            return JSONResponse(status_code=400, content=create_error_response("requests must be a non-empty list"))
+        if len(items) > BATCH_MAX_ITEMS:
+            return JSONResponse(status_code=413, content=create_error_response(f"A batch can contain at most {BATCH_MAX_ITEMS} requests"))
+
+        logger.info(f"New batch: {len(items)} requests {session_id} {trace_id}")
+        return StreamingResponse(batch_runner.run(items, request_data.get("concurrency"), session_id, trace_id), media_type="application/x-ndjson")
+    except PayloadTooLargeError as e:
+        logger.warning(f"Request rejected: {e}")
+        return JSONResponse(status_code=413, content=create_error_response(str(e)))
+    except Exception as e:
+        logger.error(f"Error processing batch: {e}")
+        logger.error(traceback.format_exc())
+        return create_error_response(str(e))
 
 
 if __name__ == "__main__":
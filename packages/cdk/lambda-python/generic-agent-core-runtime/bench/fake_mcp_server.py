@@ -0,0 +1,39 @@
+"""Fake stdio MCP server used by the benchmarks.
+
+Provides a single `<name>_fetch` tool that answers after a fixed latency with a
+payload of a fixed size. The startup delay simulates slow server
+installation or initialization.
+
+Usage: python bench/fake_mcp_server.py [--latency-ms 50] [--payload-bytes 2048] [--startup-ms 0]
+"""
+
+import argparse
+import asyncio
+import time
+
+from mcp.server.fastmcp import FastMCP
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--name", default="fake")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--payload-bytes", type=int, default=2048)
+    parser.add_argument("--startup-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    time.sleep(args.startup_ms / 1000)
+    server = FastMCP(args.name)
+    payload = ("x" * 63 + "\n") * (args.payload_bytes // 64) + "x" * (args.payload_bytes % 64)
+
+    @server.tool(name=f"{args.name}_fetch")
+    async def fetch(query: str = "") -> str:
+        """Fetch a document for the query"""
+        await asyncio.sleep(args.latency_ms / 1000)
+        return payload
+
+    server.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Memory benchmark for request ingestion with multi-MB media payloads.
+
+Compares peak memory of the previous ingestion path (decode the body to
+str, json.loads, then convert every media block) with parse_request_body,
+which decodes media straight from the raw body into bytes buffers.
+
+Usage: uv run python -m bench.ingest_memory [--images 4] [--documents 2] [--size-mb 3]
+"""
+
+import argparse
+import base64
+import json
+import os
+import time
+import tracemalloc
+
+from src.utils import parse_request_body, process_messages, process_prompt
+
+
+def build_payload(images: int, documents: int, size_mb: float) -> bytes:
+    """Build a request body with several large image and document blocks"""
+    media_size = int(size_mb * 1024 * 1024)
+    content = [{"text": "Describe the attachments"}]
+    for _ in range(images):
+        content.append({"image": {"format": "png", "source": {"bytes": base64.b64encode(os.urandom(media_size)).decode()}}})
+    for i in range(documents):
+        content.append({"document": {"format": "pdf", "name": f"doc{i}", "source": {"bytes": base64.b64encode(os.urandom(media_size)).decode()}}})
+
+    messages = [
+        {"role": "user", "content": content},
+        {"role": "assistant", "content": [{"text": "OK"}]},
+    ]
+    return json.dumps({"messages": messages, "prompt": content, "model": {"modelId": "dummy", "region": "us-east-1"}}).encode()
+
+
+def legacy_ingest(body: bytes):
+    """The ingestion path before parse_request_body was introduced"""
+    # The app used to keep the body returned by request.body() alive during parsing
+    body = bytes(bytearray(body))
+    request_data = json.loads(body.decode())
+    return process_messages(request_data["messages"]), process_prompt(request_data["prompt"])
+
+
+def streaming_ingest(body: bytes):
+    """Ingestion with media decoded while parsing"""
+    # The app reads the body into a bytearray, which parse_request_body consumes
+    request_data = parse_request_body(bytearray(body))
+    return process_messages(request_data["messages"]), process_prompt(request_data["prompt"])
+
+
+def measure(name: str, func, body: bytes) -> dict:
+    """Measure peak traced memory and wall time of an ingestion function"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(body)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {"name": name, "peak_mb": round(peak / 1024 / 1024, 1), "seconds": round(elapsed, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--documents", type=int, default=2)
+    parser.add_argument("--size-mb", type=float, default=3)
+    args = parser.parse_args()
+
+    body = build_payload(args.images, args.documents, args.size_mb)
+    print(json.dumps({"body_mb": round(len(body) / 1024 / 1024, 1)}))
+    for name, func in [("legacy", legacy_ingest), ("streaming", streaming_ingest)]:
+        print(json.dumps(measure(name, func, body)))
+
+
+if __name__ == "__main__":
+    main()
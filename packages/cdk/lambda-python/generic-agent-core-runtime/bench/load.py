@@ -0,0 +1,257 @@
+"""Offline load benchmark for the agent core runtime and mcp-api.
+
+Starts bench.serve (StubModel and fake MCP servers) in a child process,
+sends requests from N concurrent clients to /invocations or /streaming
+and reports throughput, time to first token and latency percentiles,
+the peak memory of the server and its MCP servers, and the event loop
+lag reported by the server. Results are written as JSON so runs of
+different versions can be compared with --compare.
+
+Usage: uv run --with httpx python -m bench.load [--target runtime] [--clients 8] [--requests 10] [--tool fake0_fetch] [--output bench/results/runtime.json] [--compare previous.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from src.metrics import percentile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RUNTIME_DIR = os.path.dirname(BENCH_DIR)
+
+# Marker of the first text token of StubModel
+FIRST_TOKEN_MARKER = b"token0"
+
+# Metrics compared with --compare, and whether larger is better
+COMPARED_METRICS = {
+    "requests_per_second": True,
+    "tokens_per_second": True,
+    "ttft_seconds.p50": False,
+    "ttft_seconds.p99": False,
+    "latency_seconds.p50": False,
+    "latency_seconds.p99": False,
+    "peak_rss_mb": False,
+    "event_loop_max_lag_seconds": False,
+}
+
+
+def free_port() -> int:
+    """Find a free local port"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def read_rss_kb(pid: int) -> int:
+    """Resident memory of a process and all its descendants in KB (Linux only)"""
+    total = 0
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1])
+        # Children are listed per thread, and MCP servers are started from worker threads
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                for child in f.read().split():
+                    total += read_rss_kb(int(child))
+    except (FileNotFoundError, ProcessLookupError, PermissionError):
+        pass
+    return total
+
+
+def build_request(target: str, index: int) -> tuple[str, dict]:
+    """Build the request path and body of the target"""
+    prompt = f"Benchmark request {index}"
+    model = {"modelId": "bench-stub", "region": "us-east-1"}
+    if target == "runtime":
+        return "/invocations", {"messages": [], "system_prompt": "You are a benchmark.", "prompt": [{"text": prompt}], "model": model}
+    return "/streaming", {"systemPrompt": "You are a benchmark.", "userPrompt": prompt, "messages": [], "model": model}
+
+
+async def wait_ready(client: httpx.AsyncClient, target: str, timeout: float) -> float:
+    """Wait until the server and its MCP servers are ready and return the time it took"""
+    start_time = time.monotonic()
+    while time.monotonic() - start_time < timeout:
+        try:
+            if target == "runtime":
+                ready = (await client.get("/ping")).json().get("ready")
+            else:
+                ready = (await client.get("/metrics")).json().get("mcp_ready")
+            if ready:
+                return time.monotonic() - start_time
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise TimeoutError(f"Server was not ready within {timeout}s")
+
+
+async def run_request(client: httpx.AsyncClient, target: str, index: int) -> dict:
+    """Send one request and measure its time to first token and latency"""
+    path, body = build_request(target, index)
+    start_time = time.monotonic()
+    ttft = None
+    received = 0
+    async with client.stream("POST", path, json=body) as response:
+        async for chunk in response.aiter_bytes():
+            received += len(chunk)
+            if ttft is None and FIRST_TOKEN_MARKER in chunk:
+                ttft = time.monotonic() - start_time
+        status = response.status_code
+    return {"status": status, "ttft": ttft, "latency": time.monotonic() - start_time, "bytes": received}
+
+
+async def run_load(base_url: str, target: str, clients: int, requests: int, pid: int, ready_timeout: float) -> dict:
+    """Run the load and collect the results"""
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=httpx.Limits(max_connections=clients + 4)) as client:
+        ready_seconds = await wait_ready(client, target, ready_timeout)
+        idle_rss_kb = read_rss_kb(pid)
+        peak_rss_kb = idle_rss_kb
+        results = []
+
+        async def sample_memory():
+            nonlocal peak_rss_kb
+            while True:
+                peak_rss_kb = max(peak_rss_kb, read_rss_kb(pid))
+                await asyncio.sleep(0.1)
+
+        async def run_client(client_index: int):
+            for i in range(requests):
+                try:
+                    results.append(await run_request(client, target, client_index * requests + i))
+                except httpx.HTTPError as e:
+                    results.append({"status": None, "error": str(e)})
+
+        sampler = asyncio.create_task(sample_memory())
+        start_time = time.monotonic()
+        await asyncio.gather(*(run_client(i) for i in range(clients)))
+        elapsed = time.monotonic() - start_time
+        sampler.cancel()
+
+        server_metrics = (await client.get("/metrics")).json()
+
+    succeeded = [r for r in results if r.get("status") == 200]
+    ttfts = [r["ttft"] for r in succeeded if r["ttft"] is not None]
+    latencies = [r["latency"] for r in succeeded]
+    lag = server_metrics.get("histograms", {}).get("event_loop_lag_seconds", {})
+    max_lag = lag.get("max") or 0.0
+    p99_lag = lag.get("p99")
+
+    return {
+        "ready_seconds": ready_seconds,
+        "requests": len(results),
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "elapsed_seconds": elapsed,
+        "requests_per_second": len(succeeded) / elapsed if elapsed > 0 else 0.0,
+        "tokens_per_second": len(succeeded) * int(os.environ["BENCH_TOKENS"]) / elapsed if elapsed > 0 else 0.0,
+        "ttft_seconds": {p: percentile(ttfts, int(p[1:])) for p in ("p50", "p90", "p99")},
+        "latency_seconds": {p: percentile(latencies, int(p[1:])) for p in ("p50", "p90", "p99")},
+        "idle_rss_mb": idle_rss_kb / 1024,
+        "peak_rss_mb": peak_rss_kb / 1024,
+        "event_loop_max_lag_seconds": max_lag,
+        "event_loop_p99_lag_seconds": p99_lag,
+    }
+
+
+def get_metric(results: dict, path: str):
+    """Get a nested metric such as ttft_seconds.p50"""
+    value = results
+    for key in path.split("."):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def compare(results: dict, baseline: dict):
+    """Print the relative change of the key metrics against a previous run"""
+    print(f"Compared with {baseline.get('version', 'baseline')}:")
+    changed = {k: (baseline.get("config", {}).get(k), v) for k, v in results["config"].items() if baseline.get("config", {}).get(k) != v}
+    if changed:
+        print(f"  Warning: the runs used different settings: {changed}")
+    for path, higher_is_better in COMPARED_METRICS.items():
+        current = get_metric(results["results"], path)
+        previous = get_metric(baseline["results"], path)
+        if not current or not previous:
+            continue
+        change = (current - previous) / previous * 100
+        better = (change > 0) == higher_is_better
+        print(f"  {path:32} {previous:12.4f} -> {current:12.4f} ({change:+.1f}%{'' if abs(change) < 5 else ', better' if better else ', WORSE'})")
+
+
+def get_version() -> str:
+    """Git commit of the working tree, if available"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RUNTIME_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", default="runtime", choices=["runtime", "mcp-api"])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--tokens-per-second", type=float, default=500)
+    parser.add_argument("--first-token-ms", type=float, default=200)
+    parser.add_argument("--tool", default="", help="tool called by the stub model before answering, e.g. fake0_fetch")
+    parser.add_argument("--mcp-servers", type=int, default=2)
+    parser.add_argument("--mcp-latency-ms", type=float, default=50)
+    parser.add_argument("--payload-bytes", type=int, default=2048)
+    parser.add_argument("--ready-timeout", type=float, default=60)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare with the results of a previous run")
+    args = parser.parse_args()
+
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    env = {
+        **os.environ,
+        "BENCH_TOKENS": str(args.tokens),
+        "BENCH_TOKENS_PER_SECOND": str(args.tokens_per_second),
+        "BENCH_FIRST_TOKEN_MS": str(args.first_token_ms),
+        "BENCH_TOOL_NAME": args.tool,
+        "BENCH_TOOL_INPUT": json.dumps({"query": "benchmark"}),
+    }
+    os.environ["BENCH_TOKENS"] = str(args.tokens)
+
+    port = free_port()
+    command = [sys.executable, "-m", "bench.serve", args.target, "--port", str(port), "--mcp-servers", str(args.mcp_servers), "--mcp-latency-ms", str(args.mcp_latency_ms), "--payload-bytes", str(args.payload_bytes)]
+    server = subprocess.Popen(command, cwd=RUNTIME_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        results = asyncio.run(run_load(f"http://127.0.0.1:{port}", args.target, args.clients, args.requests, server.pid, args.ready_timeout))
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    report = {
+        "version": get_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": config,
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
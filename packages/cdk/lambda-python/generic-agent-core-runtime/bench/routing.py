@@ -0,0 +1,87 @@
+"""Benchmark for latency and throttle aware model routing.
+
+Sends model calls to StubModel targets: a fast primary that throttles at
+the given rate (plus a burst of throttles on demand), a second region
+with a slower first token and a third one. The calls go once to the
+primary alone, the way the runtime used to call a single target, and once
+through ModelRouter, then the failures, time to first token and share of
+each target are compared. Set ROUTING_THROTTLE_HALF_LIFE_SECONDS to a
+fraction of a second to see traffic return to the primary within a run.
+
+Usage: uv run python -m bench.routing [--calls 200] [--concurrency 8] [--throttle-rate 0.2] [--burst 20]
+"""
+
+import argparse
+import asyncio
+import time
+
+from bench.stub_model import StubModel
+from src.metrics import percentile
+from src.routing import ModelRouter, is_throttle_error
+
+MESSAGES = [{"role": "user", "content": [{"text": "hello"}]}]
+
+
+async def run_calls(model, calls: int, concurrency: int) -> dict:
+    """Run calls with bounded concurrency, returning the failures and first token latencies"""
+    semaphore = asyncio.Semaphore(concurrency)
+    first_token_seconds: list[float] = []
+    failures = 0
+
+    async def call():
+        nonlocal failures
+        async with semaphore:
+            start_time = time.perf_counter()
+            try:
+                async for event in model.stream(MESSAGES):
+                    if "contentBlockDelta" in event and start_time:
+                        first_token_seconds.append(time.perf_counter() - start_time)
+                        start_time = 0
+            except Exception as e:
+                if not is_throttle_error(e):
+                    raise
+                failures += 1
+
+    await asyncio.gather(*(call() for _ in range(calls)))
+    return {"failures": failures, "p50": percentile(first_token_seconds, 50), "p99": percentile(first_token_seconds, 99)}
+
+
+def create_targets(throttle_rate: float) -> dict[tuple[str, str], StubModel]:
+    return {
+        ("bench-stub", "us-east-1"): StubModel(tokens=5, tokens_per_second=0, first_token_ms=50, throttle_rate=throttle_rate),
+        ("bench-stub", "us-west-2"): StubModel(tokens=5, tokens_per_second=0, first_token_ms=120),
+        ("bench-stub", "ap-northeast-1"): StubModel(tokens=5, tokens_per_second=0, first_token_ms=200),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--throttle-rate", type=float, default=0.2)
+    parser.add_argument("--burst", type=int, default=20, help="Calls of the primary throttled on demand at the start")
+    parser.add_argument("--cooldown-seconds", type=float, default=1)
+    args = parser.parse_args()
+
+    single_targets = create_targets(args.throttle_rate)
+    primary = single_targets[("bench-stub", "us-east-1")]
+    primary.throttle(args.burst)
+    single = asyncio.run(run_calls(primary, args.calls, args.concurrency))
+
+    targets = create_targets(args.throttle_rate)
+    targets[("bench-stub", "us-east-1")].throttle(args.burst)
+    router = ModelRouter(cooldown_seconds=args.cooldown_seconds)
+    routed_model = router.get_model(list(targets), lambda model_id, region: targets[(model_id, region)])
+    routed = asyncio.run(run_calls(routed_model, args.calls, args.concurrency))
+
+    print(f"{args.calls} calls, concurrency {args.concurrency}, primary throttle rate {args.throttle_rate:.0%} and {args.burst} throttled at the start")
+    print(f"single : failed {single['failures']}, TTFT p50 {single['p50'] * 1000:.0f} ms p99 {single['p99'] * 1000:.0f} ms")
+    print(f"routed : failed {routed['failures']}, TTFT p50 {routed['p50'] * 1000:.0f} ms p99 {routed['p99'] * 1000:.0f} ms")
+    for (_, region), model in targets.items():
+        print(f"  {region:<15} calls {model.calls:>4}, throttled {model.throttled:>4}")
+    for target, status in router.get_status().items():
+        print(f"  {target}: {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Benchmark for S3 uploads of workspace files.
+
+Creates a workspace with many small files and a few large ones, then
+uploads them against an in-process S3 stand-in (moto) the way the runtime
+used to (a new client and one blocking upload_file per file, one after
+another) and with S3Uploader's concurrent batch upload. The batch is then
+repeated to show the content-hash skip. --latency-ms adds a delay to every
+S3 request to stand in for the network round trip that moto does not have.
+
+moto is only needed for this benchmark and is not a runtime dependency.
+
+Usage: uv run --with "moto[s3]" python -m bench.s3_upload [--files 50] [--size-kb 256] [--large-mb 32] [--latency-ms 20]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import boto3
+from moto import mock_aws
+
+from src.clients import get_boto_session
+from src.uploads import S3Uploader, resolve_upload_paths
+
+BUCKET = "bench-bucket"
+REGION = "us-east-1"
+
+
+def add_latency(session, latency_ms: float):
+    """Delay every request sent by clients of the session"""
+
+    def delay(**kwargs):
+        time.sleep(latency_ms / 1000)
+
+    session.events.register("before-send.s3.*", delay)
+
+
+def create_workspace(workspace_dir: str, files: int, size_kb: int, large_mb: int):
+    """Create small files and two large files that go through multipart upload"""
+    for i in range(files):
+        with open(os.path.join(workspace_dir, f"chart_{i}.png"), "wb") as f:
+            f.write(os.urandom(size_kb * 1024))
+    for i in range(2):
+        with open(os.path.join(workspace_dir, f"report_{i}.pdf"), "wb") as f:
+            f.write(os.urandom(large_mb * 1024 * 1024))
+
+
+def run_legacy(paths: list[str]) -> float:
+    """A new client and a blocking upload per file"""
+    start_time = time.perf_counter()
+    for path in paths:
+        s3 = boto3.client("s3", region_name=REGION)
+        s3.upload_file(path, BUCKET, f"legacy/{os.path.basename(path)}")
+    return time.perf_counter() - start_time
+
+
+def run_batch(uploader: S3Uploader, paths: list[str], prefix: str) -> tuple[float, int]:
+    """Concurrent batch upload, returning the elapsed time and number of uploaded files"""
+    files = [(path, f"{prefix}/{os.path.basename(path)}") for path in paths]
+    start_time = time.perf_counter()
+    results = asyncio.run(uploader.upload_files_async(files, BUCKET, REGION))
+    elapsed = time.perf_counter() - start_time
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return elapsed, sum(1 for result in results if result)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--size-kb", type=int, default=256)
+    parser.add_argument("--large-mb", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+    with mock_aws(), tempfile.TemporaryDirectory() as workspace_dir:
+        boto3.client("s3", region_name=REGION).create_bucket(Bucket=BUCKET)
+        if args.latency_ms > 0:
+            boto3.setup_default_session()
+            add_latency(boto3.DEFAULT_SESSION, args.latency_ms)
+            add_latency(get_boto_session(REGION), args.latency_ms)
+        create_workspace(workspace_dir, args.files, args.size_kb, args.large_mb)
+        paths = resolve_upload_paths("*", workspace_dir)
+        total_mb = sum(os.path.getsize(path) for path in paths) / 1024 / 1024
+
+        uploader = S3Uploader()
+        legacy = run_legacy(paths)
+        batch, uploaded = run_batch(uploader, paths, "batch")
+        repeat, reuploaded = run_batch(uploader, paths, "batch")
+
+        print(f"{len(paths)} files, {total_mb:.1f} MB")
+        print(f"legacy : {legacy:.2f}s ({total_mb / legacy:.1f} MB/s)")
+        print(f"batch  : {batch:.2f}s ({total_mb / batch:.1f} MB/s), uploaded {uploaded}")
+        print(f"repeat : {repeat:.2f}s, uploaded {reuploaded} (unchanged files skipped)")
+
+
+if __name__ == "__main__":
+    main()
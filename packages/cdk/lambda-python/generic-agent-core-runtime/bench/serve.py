@@ -0,0 +1,82 @@
+"""Runs a runtime with StubModel and fake MCP servers for the load benchmark.
+
+Writes an mcp.json that starts the given number of fake MCP servers,
+replaces the Bedrock model of the app with StubModel and serves it with
+uvicorn. Both the agent core runtime (/invocations) and mcp-api
+(/streaming) can be served.
+
+Usage: uv run python -m bench.serve {runtime,mcp-api} [--port 8080] [--mcp-servers 2] [--mcp-latency-ms 50] [--payload-bytes 2048]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import uvicorn
+
+from bench.stub_model import StubModel
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RUNTIME_DIR = os.path.dirname(BENCH_DIR)
+
+
+def write_mcp_config(directory: str, servers: int, latency_ms: float, payload_bytes: int, startup_ms: float) -> str:
+    """Write an mcp.json with fake MCP servers and return its path"""
+    mcp_servers = {
+        f"fake{i}": {
+            "command": sys.executable,
+            "args": [os.path.join(BENCH_DIR, "fake_mcp_server.py"), "--name", f"fake{i}", "--latency-ms", str(latency_ms), "--payload-bytes", str(payload_bytes), "--startup-ms", str(startup_ms)],
+        }
+        for i in range(servers)
+    }
+    path = os.path.join(directory, "mcp.json")
+    with open(path, "w") as f:
+        json.dump({"mcpServers": mcp_servers}, f)
+    return path
+
+
+def load_runtime_app(config_path: str):
+    """Import the agent core runtime with the stub model"""
+    os.environ["MCP_CONFIG_PATH"] = config_path
+    sys.path.insert(0, RUNTIME_DIR)
+    import app as runtime_app
+    import src.agent
+
+    model = StubModel()
+    src.agent.get_bedrock_model = lambda model_id, region: model
+    return runtime_app.app
+
+
+def load_mcp_api_app(config_path: str):
+    """Import mcp-api with the stub model"""
+    os.environ["MCP_CONFIG_PATH"] = config_path
+    os.environ.setdefault("CODE_INTERPRETER_ENABLED", "false")
+    sys.path.insert(0, RUNTIME_DIR)
+    import mcp_api
+    import src.agent
+
+    model = StubModel()
+    src.agent.get_bedrock_model = lambda model_id, region: model
+    return mcp_api.app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("target", choices=["runtime", "mcp-api"])
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--mcp-servers", type=int, default=2)
+    parser.add_argument("--mcp-latency-ms", type=float, default=50)
+    parser.add_argument("--payload-bytes", type=int, default=2048)
+    parser.add_argument("--mcp-startup-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench-")
+    config_path = write_mcp_config(directory, args.mcp_servers, args.mcp_latency_ms, args.payload_bytes, args.mcp_startup_ms)
+    app = load_runtime_app(config_path) if args.target == "runtime" else load_mcp_api_app(config_path)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Startup time check for the agent core runtime.
+
+Measures, over several cold starts, the import time of app in a fresh
+interpreter and the time from starting the server (bench.serve with
+fake MCP servers) until /ping answers. Fails with exit code 1 when the
+median exceeds the documented targets STARTUP_IMPORT_BUDGET_SECONDS and
+STARTUP_PING_BUDGET_SECONDS (see src/config.py), so it can run in CI.
+
+The import budget is also checked by tests/test_startup.py with
+STARTUP_BUDGET_TEST=true.
+
+MCP servers are not part of the target: they start in the background
+and /ping reports them with ready=false until they are up.
+
+Usage: uv run --with httpx python -m bench.startup [--runs 3] [--output bench/results/startup.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from bench.load import free_port
+from src.config import STARTUP_IMPORT_BUDGET_SECONDS, STARTUP_PING_BUDGET_SECONDS
+from src.startup import RUNTIME_DIR, measure_import_time
+
+
+def measure_ping_time(timeout: float) -> float:
+    """Start the runtime and return the time until /ping answers"""
+    port = free_port()
+    command = [sys.executable, "-m", "bench.serve", "runtime", "--port", str(port)]
+    start_time = time.monotonic()
+    server = subprocess.Popen(command, cwd=RUNTIME_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        while time.monotonic() - start_time < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/ping", timeout=1).status_code == 200:
+                    return time.monotonic() - start_time
+            except httpx.TransportError:
+                pass
+            time.sleep(0.02)
+        raise TimeoutError(f"/ping did not answer within {timeout}s")
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="slowest packages to report")
+    parser.add_argument("--import-budget", type=float, default=STARTUP_IMPORT_BUDGET_SECONDS)
+    parser.add_argument("--ping-budget", type=float, default=STARTUP_PING_BUDGET_SECONDS)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    reports = [measure_import_time("app", args.top) for _ in range(args.runs)]
+    ping_seconds = [measure_ping_time(timeout=args.ping_budget * 10) for _ in range(args.runs)]
+
+    import_seconds = statistics.median(r["total_seconds"] for r in reports)
+    ping_median = statistics.median(ping_seconds)
+    report = {
+        "python": reports[-1]["python"],
+        "import_seconds": import_seconds,
+        "import_budget_seconds": args.import_budget,
+        "ping_seconds": ping_median,
+        "ping_budget_seconds": args.ping_budget,
+        "packages": reports[-1]["packages"],
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    if import_seconds > args.import_budget:
+        failures.append(f"import of app took {import_seconds:.2f}s (target {args.import_budget:.2f}s)")
+    if ping_median > args.ping_budget:
+        failures.append(f"first /ping took {ping_median:.2f}s (target {args.ping_budget:.2f}s)")
+    for failure in failures:
+        print(f"Startup budget exceeded: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark for the NDJSON stream encoder.
+
+Encodes a synthetic Strands event stream (text deltas with periodic tool
+use and stop events) the way the runtime used to (one json.dumps and one
+write per event) and with NDJSONStreamEncoder, and reports events per
+second, CPU time per token and the number of writes.
+
+Usage: uv run python -m bench.stream_encoder [--tokens 20000] [--backend auto]
+"""
+
+import argparse
+import json
+import time
+
+from src.streaming import NDJSONStreamEncoder
+
+
+def build_events(tokens: int) -> list[dict]:
+    """Build a stream of text deltas with a tool use every 500 tokens"""
+    events = [{"event": {"messageStart": {"role": "assistant"}}}]
+    for i in range(tokens):
+        events.append({"event": {"contentBlockDelta": {"delta": {"text": "トークン "}, "contentBlockIndex": 0}}})
+        if i % 500 == 499:
+            events.append({"event": {"contentBlockStop": {"contentBlockIndex": 0}}})
+            events.append({"event": {"contentBlockStart": {"start": {"toolUse": {"name": "search", "toolUseId": f"t{i}"}}, "contentBlockIndex": 1}}})
+            events.append({"event": {"contentBlockStop": {"contentBlockIndex": 1}}})
+    events.append({"event": {"messageStop": {"stopReason": "end_turn"}}})
+    events.append({"event": {"metadata": {"usage": {"inputTokens": 10, "outputTokens": tokens, "totalTokens": tokens + 10}}}})
+    return events
+
+
+def run_legacy(events: list[dict]) -> int:
+    """One json.dumps and one write per event"""
+    writes = 0
+    for event in events:
+        chunk = json.dumps(event, ensure_ascii=False) + "\n"
+        chunk.encode()
+        writes += 1
+    return writes
+
+
+def run_encoder(events: list[dict], backend: str, max_bytes: int, max_ms: float) -> int:
+    """Batched writes with NDJSONStreamEncoder"""
+    encoder = NDJSONStreamEncoder(max_bytes=max_bytes, max_ms=max_ms, backend=backend)
+    for event in events:
+        encoder.encode(event)
+    encoder.flush()
+    return encoder.writes
+
+
+def measure(name: str, func, events: list[dict], tokens: int) -> dict:
+    """Measure wall time, CPU time and writes of an encoding strategy"""
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    writes = func(events)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    return {
+        "name": name,
+        "events_per_second": round(len(events) / wall),
+        "cpu_us_per_token": round(cpu / tokens * 1_000_000, 2),
+        "writes": writes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--backend", default="auto", choices=["auto", "json", "orjson"])
+    parser.add_argument("--max-bytes", type=int, default=4096)
+    parser.add_argument("--max-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    events = build_events(args.tokens)
+    print(json.dumps(measure("legacy", run_legacy, events, args.tokens)))
+    print(json.dumps(measure(f"encoder[{args.backend}]", lambda e: run_encoder(e, args.backend, args.max_bytes, args.max_ms), events, args.tokens)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Offline stand-in for BedrockModel used by the benchmarks.
+
+StubModel streams the same events as Bedrock ConverseStream (message
+start, text deltas, optional tool use, message stop and usage metadata)
+at a configurable rate, so a full agent run including tool calls can be
+measured without AWS access. It can also throttle calls like Bedrock
+does, at a given rate or on demand, to exercise model routing.
+"""
+
+import asyncio
+import json
+import os
+import random
+from typing import Any
+
+from strands.models.model import Model
+from strands.types.exceptions import ModelThrottledException
+
+
+class StubModel(Model):
+    """Streams synthetic tokens and, on the first cycle, an optional tool use.
+
+    Settings are read from BENCH_* environment variables when not given,
+    so the benchmark servers can configure the model of a child process.
+    """
+
+    def __init__(
+        self,
+        tokens: int | None = None,
+        tokens_per_second: float | None = None,
+        first_token_ms: float | None = None,
+        tool_name: str | None = None,
+        tool_input: dict[str, Any] | None = None,
+        throttle_rate: float | None = None,
+    ):
+        self.tokens = tokens if tokens is not None else int(os.environ.get("BENCH_TOKENS", "200"))
+        self.tokens_per_second = tokens_per_second if tokens_per_second is not None else float(os.environ.get("BENCH_TOKENS_PER_SECOND", "500"))
+        self.first_token_ms = first_token_ms if first_token_ms is not None else float(os.environ.get("BENCH_FIRST_TOKEN_MS", "200"))
+        self.tool_name = tool_name if tool_name is not None else os.environ.get("BENCH_TOOL_NAME") or None
+        self.tool_input = tool_input if tool_input is not None else json.loads(os.environ.get("BENCH_TOOL_INPUT", "{}"))
+        self.throttle_rate = throttle_rate if throttle_rate is not None else float(os.environ.get("BENCH_THROTTLE_RATE", "0"))
+        self.throttle_next = 0
+        self.calls = 0
+        self.throttled = 0
+        self.config: dict[str, Any] = {"model_id": "bench-stub"}
+
+    def throttle(self, calls: int = 1):
+        """Throttle the next calls"""
+        self.throttle_next += calls
+
+    def update_config(self, **model_config: Any):
+        self.config.update(model_config)
+
+    def get_config(self) -> dict[str, Any]:
+        return self.config
+
+    async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs):
+        raise NotImplementedError("StubModel does not support structured output")
+        yield  # pragma: no cover
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        self.calls += 1
+        if self.throttle_next > 0 or random.random() < self.throttle_rate:
+            self.throttle_next = max(self.throttle_next - 1, 0)
+            self.throttled += 1
+            await asyncio.sleep(0.01)
+            raise ModelThrottledException("ThrottlingException: Too many requests, please wait before trying again.")
+
+        await asyncio.sleep(self.first_token_ms / 1000)
+        yield {"messageStart": {"role": "assistant"}}
+
+        has_tool_result = any("toolResult" in block for message in messages for block in message.get("content", []))
+        if self.tool_name and not has_tool_result:
+            tool_use_id = f"tooluse_{len(messages)}"
+            yield {"contentBlockStart": {"start": {"toolUse": {"name": self.tool_name, "toolUseId": tool_use_id}}}}
+            yield {"contentBlockDelta": {"delta": {"toolUse": {"input": json.dumps(self.tool_input)}}}}
+            yield {"contentBlockStop": {}}
+            yield {"messageStop": {"stopReason": "tool_use"}}
+            output_tokens = 10
+        else:
+            interval = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+            for i in range(self.tokens):
+                yield {"contentBlockDelta": {"delta": {"text": f"token{i} "}}}
+                if interval:
+                    await asyncio.sleep(interval)
+            yield {"contentBlockStop": {}}
+            yield {"messageStop": {"stopReason": "end_turn"}}
+            output_tokens = self.tokens
+
+        input_tokens = sum(len(json.dumps(message, default=str)) for message in messages) // 4
+        yield {"metadata": {"usage": {"inputTokens": input_tokens, "outputTokens": output_tokens, "totalTokens": input_tokens + output_tokens}, "metrics": {"latencyMs": 0}}}
@@ -0,0 +1,120 @@
+"""FastAPI application of the MCP chat API (mcp-api).
+
+Runs the MCP chat use case on the same core as the agent core runtime
+(AgentManager, ToolManager and the MCP server pool) and streams the
+answer in the {"text", "trace"} NDJSON format of /streaming.
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from uuid import uuid4
+
+from fastapi import FastAPI, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from src.agent import AgentManager
+from src.config import MCP_API_FIXED_SYSTEM_PROMPT
+from src.context import RequestContext
+from src.executors import executors, run_blocking
+from src.loop_monitor import LoopLagMonitor
+from src.metrics import metrics
+from src.streaming import TextTraceStreamEncoder
+from src.workspaces import workspaces
+
+logger = logging.getLogger(__name__)
+
+
+class UnrecordedMessage(BaseModel):
+    role: str
+    content: str
+
+
+class Model(BaseModel):
+    modelId: str
+    region: str
+
+
+class StreamingRequest(BaseModel):
+    systemPrompt: str
+    userPrompt: str
+    messages: list[UnrecordedMessage]
+    model: Model
+
+
+# Initialize agent manager
+agent_manager = AgentManager()
+
+# Reports handlers that block the event loop
+loop_monitor = LoopLagMonitor()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start all MCP servers in the background as soon as the app starts and stop them at shutdown"""
+    loop_monitor.start()
+    await run_blocking("workspace", workspaces.start)
+    warmup_task = asyncio.create_task(run_blocking("mcp", agent_manager.warm_up))
+    yield
+    warmup_task.cancel()
+    await run_blocking("mcp", agent_manager.tool_manager.mcp_pool.stop)
+    await run_blocking("workspace", workspaces.stop)
+    loop_monitor.stop()
+    executors.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.get("/")
+async def healthcheck():
+    """Readiness check of the Lambda web adapter"""
+    return Response(status_code=status.HTTP_200_OK)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Runtime metrics including MCP server startup times"""
+    mcp_pool = agent_manager.tool_manager.mcp_pool
+    return {
+        "mcp_ready": mcp_pool.is_ready,
+        "mcp_pool": mcp_pool.get_status(),
+        "model_routing": agent_manager.model_router.get_status(),
+        "event_loop": loop_monitor.get_status(),
+        **metrics.snapshot(),
+    }
+
+
+@app.post("/streaming")
+async def streaming(request: StreamingRequest):
+    """Stream the answer to a chat as {"text", "trace"} lines"""
+    # Chats have no session header; every request gets its own id, which also keys its uploads under mcp/
+    session_id = str(uuid4())
+    context = RequestContext(session_id, session_id)
+    messages = [{"role": m.role, "content": [{"text": m.content}]} for m in request.messages]
+    logger.info(f"New session {session_id}")
+
+    async def generate():
+        await run_blocking("workspace", workspaces.acquire, context)
+        try:
+            async for chunk in agent_manager.process_request_streaming(
+                messages=messages,
+                system_prompt=request.systemPrompt,
+                prompt=request.userPrompt,
+                model_info=request.model.model_dump(),
+                context=context,
+                encoder=TextTraceStreamEncoder(),
+                fixed_system_prompt=MCP_API_FIXED_SYSTEM_PROMPT,
+            ):
+                yield chunk
+        finally:
+            workspaces.release(context)
+
+    return StreamingResponse(generate(), media_type="text/event-stream")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=8080, log_level="warning", access_log=False)
@@ -0,0 +1,177 @@
+"""Admission control for agent runs of the agent core runtime."""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+
+from .config import ADMISSION_MAX_CONCURRENT, ADMISSION_MAX_QUEUE, ADMISSION_MAX_WAIT_SECONDS
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Weight of the latest run in the moving average of run durations
+RUN_SECONDS_SMOOTHING = 0.2
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a run is not admitted. Carries the HTTP status and a retry hint."""
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """A slot held by an admitted run. Releasing it more than once is a no-op."""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._admitted_at = time.monotonic()
+        self._released = False
+
+    def release(self):
+        """Give the slot to the next queued run"""
+        if self._released:
+            return
+        self._released = True
+        self._controller._release(time.monotonic() - self._admitted_at)
+
+
+class AdmissionController:
+    """Limits concurrent agent runs with a bounded, time-limited wait queue.
+
+    Up to max_concurrent runs execute at once. Further runs wait in FIFO
+    order; when max_queue runs are already waiting, a run is rejected at
+    once with 429, and a run that waits longer than max_wait_seconds is
+    rejected with 503. Both carry a Retry-After estimate based on the
+    average run duration. Everything runs on the event loop, so no locks
+    are needed. A max_concurrent of 0 disables the limit.
+
+    Background runs (batch items) wait in a separate, unbounded queue
+    without a time limit and only get a slot when no foreground run is
+    waiting, so they never take queue places or slots from interactive
+    requests.
+    """
+
+    def __init__(self, max_concurrent: int = ADMISSION_MAX_CONCURRENT, max_queue: int = ADMISSION_MAX_QUEUE, max_wait_seconds: float = ADMISSION_MAX_WAIT_SECONDS):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.running = 0
+        self.average_run_seconds = 10.0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._background_waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the number of concurrent runs is limited"""
+        return self.max_concurrent > 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of runs waiting for a slot"""
+        return len(self._waiters)
+
+    @property
+    def background_queue_depth(self) -> int:
+        """Number of background runs waiting for a slot"""
+        return len(self._background_waiters)
+
+    def retry_after(self) -> int:
+        """Estimate the seconds until a new run could be admitted"""
+        if not self.enabled:
+            return 1
+        rounds = (self.queue_depth + 1) / self.max_concurrent
+        return max(1, math.ceil(rounds * self.average_run_seconds))
+
+    def _update_gauges(self):
+        metrics.set_gauge("admission_running", self.running)
+        metrics.set_gauge("admission_queue_depth", self.queue_depth)
+        metrics.set_gauge("admission_background_queue_depth", self.background_queue_depth)
+
+    def _reject(self, message: str, status_code: int, reason: str) -> AdmissionRejectedError:
+        metrics.increment("admission_rejected_total", reason=reason)
+        logger.warning(f"Run rejected ({reason}): running={self.running}, queued={self.queue_depth}")
+        return AdmissionRejectedError(message, status_code, self.retry_after())
+
+    async def acquire(self, background: bool = False) -> AdmissionTicket:
+        """Wait for a slot, or raise AdmissionRejectedError (never for background runs)"""
+        start_time = time.monotonic()
+
+        if not self.enabled or (self.running < self.max_concurrent and not self._waiters and not self._background_waiters):
+            self.running += 1
+            self._update_gauges()
+            metrics.observe("admission_wait_seconds", 0.0)
+            return AdmissionTicket(self)
+
+        if not background and self.queue_depth >= self.max_queue:
+            raise self._reject("Too many concurrent requests. Please retry later.", 429, "queue_full")
+
+        waiters = self._background_waiters if background else self._waiters
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        self._update_gauges()
+        try:
+            # The slot is handed over by _release, which already counts it as running
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=None if background else self.max_wait_seconds)
+        except TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just as the wait timed out
+                return self._admitted(start_time)
+            self._remove_waiter(waiters, waiter)
+            raise self._reject("The server is busy. Please retry later.", 503, "queue_timeout") from None
+        except asyncio.CancelledError:
+            # The client went away while waiting
+            if waiter.done() and not waiter.cancelled():
+                # The slot was already handed over; pass it on without counting a run
+                self._release(None)
+            else:
+                self._remove_waiter(waiters, waiter)
+            raise
+
+        return self._admitted(start_time)
+
+    def _admitted(self, start_time: float) -> AdmissionTicket:
+        metrics.observe("admission_wait_seconds", time.monotonic() - start_time)
+        return AdmissionTicket(self)
+
+    def _remove_waiter(self, waiters: deque[asyncio.Future], waiter: asyncio.Future):
+        waiter.cancel()
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            pass
+        self._update_gauges()
+
+    def _release(self, run_seconds: float | None):
+        """Give up a slot, recording the duration of its run unless run_seconds is None (no run took place)"""
+        if run_seconds is not None:
+            self.average_run_seconds += RUN_SECONDS_SMOOTHING * (run_seconds - self.average_run_seconds)
+            metrics.observe("admission_run_seconds", run_seconds)
+
+        # Hand the slot directly to the oldest waiter so newcomers cannot overtake the queue.
+        # Background runs only get a slot when no foreground run is waiting.
+        for waiters in (self._waiters, self._background_waiters):
+            while waiters:
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+                    self._update_gauges()
+                    return
+
+        self.running -= 1
+        self._update_gauges()
+
+    def get_status(self) -> dict[str, float]:
+        """Current status for the metrics endpoint"""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self.running,
+            "queue_depth": self.queue_depth,
+            "background_queue_depth": self.background_queue_depth,
+            "max_queue": self.max_queue,
+            "average_run_seconds": self.average_run_seconds,
+        }
@@ -1,31 +1,63 @@
 """Agent management for the agent core runtime."""
 
-import json
 import logging
+import time
 from collections.abc import AsyncGenerator
 from typing import Any
 
-import boto3
 from strands import Agent as StrandsAgent
-from strands.models import BedrockModel
 
-from .config import extract_model_info, get_system_prompt
+from .clients import get_bedrock_model
+from .config import FIXED_SYSTEM_PROMPT, extract_model_targets, get_system_prompt, get_workspace_prompt
+from .context import RequestContext, set_request_context
+from .executors import run_blocking
+from .history import HistoryCompactor
+from .metrics import metrics
+from .response_cache import ResponseCache, compute_cache_key, get_side_effect_tools, iter_replay_chunks
+from .routing import ModelRouter, get_served_target
+from .session_cache import SessionAgent, SessionAgentCache, fingerprint_messages
+from .streaming import NDJSONStreamEncoder, TextTraceStreamEncoder, iter_with_deadline
+from .tool_results import ToolResultLimitHook, tool_result_policy
 from .tools import ToolManager
-from .types import Message, ModelInfo
-from .utils import process_messages, process_prompt
+from .tracing import Phase, ToolTracingHook
+from .types import HistoryConfig, Message, ModelInfo, ResponseCacheConfig
+from .utils import add_workspace_prompt, process_messages, process_prompt
 
 logger = logging.getLogger(__name__)
 
 
+def record_usage(model_id: str, usage: dict[str, Any]):
+    """Record input, cache-read and cache-write tokens of a request
+
+    The hit ratio is the share of prompt tokens served from the prompt cache.
+    """
+    input_tokens = usage.get("inputTokens", 0)
+    cache_read_tokens = usage.get("cacheReadInputTokens", 0)
+    cache_write_tokens = usage.get("cacheWriteInputTokens", 0)
+    metrics.increment("input_tokens_total", input_tokens, model_id=model_id)
+    metrics.increment("output_tokens_total", usage.get("outputTokens", 0), model_id=model_id)
+    metrics.increment("prompt_cache_read_tokens_total", cache_read_tokens, model_id=model_id)
+    metrics.increment("prompt_cache_write_tokens_total", cache_write_tokens, model_id=model_id)
+
+    prompt_tokens = input_tokens + cache_read_tokens + cache_write_tokens
+    if prompt_tokens > 0:
+        metrics.observe("prompt_cache_hit_ratio", cache_read_tokens / prompt_tokens, model_id=model_id)
+    logger.info(f"Token usage of {model_id}: input={input_tokens} cache_read={cache_read_tokens} cache_write={cache_write_tokens}")
+
+
 class AgentManager:
     """Manages Strands agent creation and execution."""
 
     def __init__(self):
         self.tool_manager = ToolManager()
+        self.history_compactor = HistoryCompactor()
+        self.response_cache = ResponseCache()
+        self.session_cache = SessionAgentCache()
+        self.model_router = ModelRouter()
 
-    def set_session_info(self, session_id: str, trace_id: str):
-        """Set session and trace IDs"""
-        self.tool_manager.set_session_info(session_id, trace_id)
+    def warm_up(self):
+        """Start the MCP server pool and build the tool registry"""
+        self.tool_manager.build_tool_registry()
 
     async def process_request_streaming(
         self,
@@ -33,50 +65,210 @@ class AgentManager:
         system_prompt: str | None,
         prompt: str | list[dict[str, Any]],
         model_info: ModelInfo,
-    ) -> AsyncGenerator[str]:
-        """Process a request and yield streaming responses as raw events"""
+        context: RequestContext,
+        history_config: HistoryConfig | None = None,
+        cache_config: ResponseCacheConfig | None = None,
+        encoder: NDJSONStreamEncoder | TextTraceStreamEncoder | None = None,
+        session_cache: bool = False,
+        fixed_system_prompt: str = FIXED_SYSTEM_PROMPT,
+    ) -> AsyncGenerator[bytes]:
+        """Process a request and yield streaming responses as batched NDJSON raw events
+
+        Another output format (e.g. the text-and-trace lines of mcp-api) can
+        be streamed by passing its encoder, and an entry point that does not
+        run on AgentCore passes its own fixed system prompt. With
+        session_cache, the agent of the session is kept warm between turns
+        (see SessionAgentCache). Each phase of the run is timed as
+        phase_seconds and, with tracing enabled, as a child span of an
+        agent_request span.
+        """
+        # Tools read the session and workspace of the current request from the context
+        set_request_context(context)
+        start_time = time.monotonic()
+        encoder = encoder or NDJSONStreamEncoder()
+        request_phase = Phase("agent_request", session_id=context.session_id, request_id=context.request_id, message_count=len(messages))
+        error = None
+
         try:
             # Get model info
-            model_id, region = extract_model_info(model_info)
+            targets = extract_model_targets(model_info)
+            model_id, region = targets[0]
+            request_phase.set_attribute("model_id", model_id)
 
             # Combine system prompts
-            combined_system_prompt = get_system_prompt(system_prompt)
-
-            # Get all tools
-            tools = self.tool_manager.get_all_tools()
-
-            # Create boto3 session and Bedrock model
-            session = boto3.Session(region_name=region)
-            bedrock_model = BedrockModel(
-                model_id=model_id,
-                boto_session=session,
-                cache_prompt="default",
-                cache_tools="default",
-            )
-
-            # Process messages and prompt using utility functions
-            processed_messages = process_messages(messages)
-            processed_prompt = process_prompt(prompt)
-
-            # Create Strands agent and stream response
-            agent = StrandsAgent(
-                system_prompt=combined_system_prompt,
-                messages=processed_messages,
-                model=bedrock_model,
-                tools=tools,
-            )
-
-            async for event in agent.stream_async(processed_prompt):
-                if "event" in event:
-                    yield json.dumps(event, ensure_ascii=False) + "\n"
+            combined_system_prompt = get_system_prompt(system_prompt, fixed_system_prompt)
+
+            # Get all tools (waits in the MCP pool if the MCP servers are still warming up)
+            with Phase("tool_assembly", parent=request_phase) as phase:
+                tools = await run_blocking("mcp", self.tool_manager.get_all_tools)
+                phase.set_attribute("tool_count", len(tools))
+
+            # The caches key on the version of the tool set, which is only computed when one of them is used
+            use_response_cache = self.response_cache.enabled and (cache_config is None or cache_config.enabled)
+            use_session_cache = session_cache and self.session_cache.enabled and context.session_id
+            tool_set_version = self.tool_manager.get_tool_set_version(tools) if use_response_cache or use_session_cache else None
+
+            # Get the cached Bedrock model (keeps the boto3 session and connection pool warm), routed over
+            # the equivalent targets of the model. Creating it for the first time loads botocore data, so it
+            # runs off the event loop.
+            with Phase("model_setup", parent=request_phase, model_id=model_id, region=region, targets=len(targets)):
+                bedrock_model = await run_blocking("model", self.model_router.get_model, targets, get_bedrock_model)
+
+            # Replay the recorded response of an identical request (requests with media are never cached)
+            cache_key = None
+            if use_response_cache:
+                with Phase("response_cache_lookup", parent=request_phase) as phase:
+                    cache_key = compute_cache_key(
+                        model_id=model_id,
+                        region=region,
+                        system_prompt=system_prompt,
+                        messages=messages,
+                        prompt=prompt,
+                        history=history_config.model_dump() if history_config else None,
+                        tools=tool_set_version,
+                        output_format=encoder.format,
+                    )
+                    cached = await run_blocking("cache", self.response_cache.get, cache_key) if cache_key else None
+                    phase.set_attribute("hit", cached is not None)
+                if cached is not None:
+                    request_phase.set_attribute("response_cache_hit", True)
+                    for chunk in iter_replay_chunks(cached):
+                        yield chunk
+                    return
+
+            # Reuse the warm agent of the session if the request continues its conversation
+            session_agent = None
+            if use_session_cache:
+                with Phase("session_cache_lookup", parent=request_phase) as phase:
+                    session_signature = compute_cache_key(
+                        model_id=model_id,
+                        region=region,
+                        targets=targets,
+                        system_prompt=system_prompt,
+                        history=history_config.model_dump() if history_config else None,
+                        tools=tool_set_version,
+                    )
+                    history = await run_blocking("cache", fingerprint_messages, messages)
+                    session_agent = self.session_cache.checkout(context.session_id, session_signature, history, messages)
+                    phase.set_attribute("hit", session_agent is not None)
+                request_phase.set_attribute("session_cache_hit", session_agent is not None)
+
+            if session_agent is not None:
+                agent = session_agent.agent
+                processed_prompt = process_prompt(prompt)
+                with Phase("history_compaction", parent=request_phase, strategy=history_config.strategy if history_config else None):
+                    agent.messages = await self.history_compactor.compact(agent.messages, history_config, bedrock_model, model_id)
+                session_agent.prepare(combined_system_prompt, context.workspace_dir, request_phase)
+            else:
+                # Process messages and prompt using utility functions
+                with Phase("message_processing", parent=request_phase, message_count=len(messages)):
+                    processed_messages = process_messages(messages)
+                    processed_prompt = process_prompt(prompt)
+
+                # Compact the conversation history according to the requested strategy
+                with Phase("history_compaction", parent=request_phase, strategy=history_config.strategy if history_config else None):
+                    processed_messages = await self.history_compactor.compact(processed_messages, history_config, bedrock_model, model_id)
+
+                # Create Strands agent and stream response
+                with Phase("agent_setup", parent=request_phase):
+                    result_hook = ToolResultLimitHook(tool_result_policy, context.workspace_dir)
+                    tracing_hook = ToolTracingHook(request_phase)
+                    agent = StrandsAgent(
+                        system_prompt=combined_system_prompt,
+                        messages=processed_messages,
+                        model=bedrock_model,
+                        tools=tools,
+                        callback_handler=None,
+                        # After-tool callbacks run in reverse order: tracing sees the full result, then it is cut for the model
+                        hooks=[result_hook, tracing_hook],
+                    )
+                    if use_session_cache:
+                        session_agent = SessionAgent(agent, session_signature, tracing_hook, result_hook)
+
+            # The workspace directory differs per request, so it goes in the user turn and the system prompt stays cacheable
+            processed_prompt = add_workspace_prompt(processed_prompt, get_workspace_prompt(context.workspace_dir, context.workspace_retained))
+
+            # A routed model records the target that serves each call, so metrics are labelled with the target used
+            context.model_target = None
+            first_token_phase = Phase("time_to_first_token", parent=request_phase)
+            stream_phase = Phase("agent_stream", parent=request_phase)
+            usage: dict[str, int] = {}
+            usage_by_target: dict[tuple[str, str], dict[str, int]] = {}
+            recorded: list[bytes] = []
+            used_tools: set[str] = set()
+            response_bytes = 0
+            try:
+                # Buffered deltas are flushed when they are due, even while the model is not sending anything
+                async for event in iter_with_deadline(agent.stream_async(processed_prompt), encoder.flush_deadline):
+                    if event is None:
+                        chunk = encoder.flush()
+                        if chunk:
+                            response_bytes += len(chunk)
+                            if cache_key:
+                                recorded.append(chunk)
+                            yield chunk
+                        continue
+                    if "event" in event:
+                        served_model_id, served_region = get_served_target() or targets[0]
+                        if "contentBlockDelta" in event["event"] and not first_token_phase.ended:
+                            first_token_phase.metric_labels["model_id"] = served_model_id
+                            first_token_phase.set_attribute("model_id", served_model_id)
+                            first_token_phase.set_attribute("region", served_region)
+                            first_token_phase.end()
+                            metrics.observe("time_to_first_token_seconds", time.monotonic() - start_time, model_id=served_model_id)
+                        # Every model call of the agent loop reports its own usage, counted for the target that served it
+                        for key, value in event["event"].get("metadata", {}).get("usage", {}).items():
+                            if isinstance(value, int):
+                                usage[key] = usage.get(key, 0) + value
+                                target_usage = usage_by_target.setdefault((served_model_id, served_region), {})
+                                target_usage[key] = target_usage.get(key, 0) + value
+                        tool_use = event["event"].get("contentBlockStart", {}).get("start", {}).get("toolUse")
+                        if tool_use:
+                            used_tools.add(tool_use.get("name"))
+                    chunk = encoder.encode_agent_event(event)
+                    if chunk:
+                        response_bytes += len(chunk)
+                        if cache_key:
+                            recorded.append(chunk)
+                        yield chunk
+
+                chunk = encoder.flush()
+                if chunk:
+                    response_bytes += len(chunk)
+                    if cache_key:
+                        recorded.append(chunk)
+                    yield chunk
+            finally:
+                first_token_phase.end()
+                served_model_id, served_region = get_served_target() or targets[0]
+                stream_phase.set_attribute("model_id", served_model_id)
+                stream_phase.set_attribute("region", served_region)
+                request_phase.set_attribute("served_model_id", served_model_id)
+                request_phase.set_attribute("served_region", served_region)
+                stream_phase.set_attribute("response_bytes", response_bytes)
+                stream_phase.set_attribute("input_tokens", usage.get("inputTokens"))
+                stream_phase.set_attribute("output_tokens", usage.get("outputTokens"))
+                stream_phase.end()
+
+            for (served_model_id, _), target_usage in usage_by_target.items():
+                record_usage(served_model_id, target_usage)
+
+            # Keep the agent warm for the next turn of the session
+            if session_agent is not None:
+                self.session_cache.checkin(context.session_id, session_agent, history, prompt)
+
+            # Record the response unless a tool with possible side effects was used
+            if cache_key:
+                side_effect_tools = get_side_effect_tools(used_tools)
+                if side_effect_tools:
+                    logger.info(f"Response not cached: used tools with side effects {sorted(side_effect_tools)}")
+                    metrics.increment("response_cache_skipped_total", reason="side_effects")
+                else:
+                    await run_blocking("cache", self.response_cache.put, cache_key, b"".join(recorded), cache_config.ttl_seconds if cache_config else None)
 
         except Exception as e:
+            error = e
             logger.error(f"Error processing agent request: {e}")
-            error_event = {
-                "event": {
-                    "internalServerException": {
-                        "message": f"An error occurred while processing your request: {str(e)}",
-                    }
-                }
-            }
-            yield json.dumps(error_event, ensure_ascii=False) + "\n"
+            yield encoder.encode_error(f"An error occurred while processing your request: {str(e)}")
+        finally:
+            request_phase.end(error)
@@ -0,0 +1,164 @@
+"""Batch invocation of many independent requests for the agent core runtime."""
+
+import asyncio
+import json
+import logging
+import time
+from collections.abc import AsyncGenerator
+from typing import Any
+from uuid import uuid4
+
+from .admission import AdmissionController
+from .agent import AgentManager
+from .config import BATCH_DEFAULT_CONCURRENCY, BATCH_MAX_CONCURRENCY
+from .context import RequestContext
+from .executors import run_blocking
+from .metrics import metrics, percentile
+from .streaming import get_event_serializer
+from .types import HistoryConfig, ResponseCacheConfig
+from .workspaces import workspaces
+
+logger = logging.getLogger(__name__)
+
+
+def collect_result(chunk: bytes, result: dict[str, Any]):
+    """Accumulate the text, usage and errors of NDJSON events into a result"""
+    for line in chunk.splitlines():
+        if not line:
+            continue
+        event = json.loads(line).get("event", {})
+        if "contentBlockDelta" in event:
+            text = event["contentBlockDelta"].get("delta", {}).get("text")
+            if text:
+                result["text_parts"].append(text)
+        elif "contentBlockStart" in event:
+            tool_use = event["contentBlockStart"].get("start", {}).get("toolUse")
+            if tool_use:
+                result["tools"].append(tool_use.get("name"))
+        elif "messageStop" in event:
+            result["stop_reason"] = event["messageStop"].get("stopReason")
+        elif "metadata" in event:
+            for key, value in event["metadata"].get("usage", {}).items():
+                if isinstance(value, int):
+                    result["usage"][key] = result["usage"].get(key, 0) + value
+        elif "internalServerException" in event:
+            result["error"] = event["internalServerException"].get("message")
+
+
+class BatchRunner:
+    """Runs independent requests with bounded concurrency on the warm runtime.
+
+    Every item gets its own request context and workspace and goes through
+    the same path as /invocations (shared MCP pool, cached tools and models,
+    response cache), but only its final text and usage are returned. Items
+    take admission slots as background runs, so a batch never takes queue
+    places or slots from interactive requests. A failing item only produces
+    an error result.
+    """
+
+    def __init__(self, agent_manager: AgentManager, admission: AdmissionController):
+        self.agent_manager = agent_manager
+        self.admission = admission
+        self.dumps = get_event_serializer()
+
+    async def run_item(self, index: int, item: dict[str, Any], session_id: str | None, trace_id: str | None) -> dict[str, Any]:
+        """Run one item and return its result"""
+        item_id = item.get("id", index)
+        result = {"text_parts": [], "tools": [], "usage": {}, "stop_reason": None, "error": None}
+        # Each item gets a trace id of its own, so that concurrent items never share upload keys
+        request_id = str(uuid4())
+        context = RequestContext(session_id, f"{trace_id or request_id}-{item_id}", request_id)
+        start_time = time.monotonic()
+
+        ticket = await self.admission.acquire(background=True)
+        try:
+            await run_blocking("workspace", workspaces.acquire, context)
+            async for chunk in self.agent_manager.process_request_streaming(
+                messages=item.get("messages", []),
+                system_prompt=item.get("system_prompt"),
+                prompt=item.get("prompt", []),
+                model_info=item.get("model", {}),
+                context=context,
+                history_config=HistoryConfig(**item.get("history") or {}),
+                cache_config=ResponseCacheConfig(**item.get("cache") or {}),
+            ):
+                collect_result(chunk, result)
+        except Exception as e:
+            logger.error(f"Error processing batch item {item_id}: {e}")
+            result["error"] = str(e)
+        finally:
+            ticket.release()
+            workspaces.release(context)
+
+        return {
+            "id": item_id,
+            "status": "error" if result["error"] else "success",
+            "text": "".join(result["text_parts"]),
+            "tools": result["tools"],
+            "stop_reason": result["stop_reason"],
+            "usage": result["usage"],
+            "error": result["error"],
+            "latency_seconds": time.monotonic() - start_time,
+        }
+
+    async def run(self, items: list[dict[str, Any]], concurrency: int | None = None, session_id: str | None = None, trace_id: str | None = None) -> AsyncGenerator[bytes]:
+        """Run all items and yield an NDJSON line per item, in completion order, followed by a summary"""
+        concurrency = max(1, min(concurrency or BATCH_DEFAULT_CONCURRENCY, BATCH_MAX_CONCURRENCY, len(items) or 1))
+        pending = iter(enumerate(items))
+        results: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue()
+        start_time = time.monotonic()
+
+        async def worker():
+            try:
+                for index, item in pending:
+                    try:
+                        results.put_nowait(await self.run_item(index, item, session_id, trace_id))
+                    except Exception as e:
+                        results.put_nowait({"id": item.get("id", index) if isinstance(item, dict) else index, "status": "error", "error": str(e), "latency_seconds": 0.0})
+            finally:
+                results.put_nowait(None)
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        latencies = []
+        succeeded = failed = 0
+        usage: dict[str, int] = {}
+        try:
+            finished_workers = 0
+            while finished_workers < len(workers):
+                result = await results.get()
+                if result is None:
+                    finished_workers += 1
+                    continue
+
+                if result["status"] == "success":
+                    succeeded += 1
+                else:
+                    failed += 1
+                latencies.append(result["latency_seconds"])
+                for key, value in result.get("usage", {}).items():
+                    usage[key] = usage.get(key, 0) + value
+                metrics.increment("batch_items_total", status=result["status"])
+                yield self.dumps({"batchResult": result}) + b"\n"
+
+            elapsed = time.monotonic() - start_time
+            summary = {
+                "items": len(items),
+                "succeeded": succeeded,
+                "failed": failed,
+                "concurrency": concurrency,
+                "elapsed_seconds": elapsed,
+                "items_per_second": len(items) / elapsed if elapsed > 0 else 0.0,
+                "latency_seconds": {
+                    "p50": percentile(latencies, 50),
+                    "p90": percentile(latencies, 90),
+                    "p99": percentile(latencies, 99),
+                    "max": max(latencies, default=0.0),
+                },
+                "usage": usage,
+            }
+            logger.info(f"Batch finished: {succeeded} succeeded, {failed} failed in {elapsed:.2f}s")
+            yield self.dumps({"batchSummary": summary}) + b"\n"
+        finally:
+            # Stop the remaining items if the client goes away
+            for task in workers:
+                task.cancel()
@@ -0,0 +1,57 @@
+"""Cached boto3 sessions, clients and Bedrock models for the agent core runtime."""
+
+import logging
+import threading
+from functools import lru_cache
+
+import boto3
+from botocore.config import Config as BotocoreConfig
+from strands.models import BedrockModel
+
+from .config import BOTO_MAX_POOL_CONNECTIONS, BOTO_TCP_KEEPALIVE, CLIENT_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# boto3 sessions are not thread-safe when creating clients
+_session_lock = threading.Lock()
+
+
+def get_boto_client_config() -> BotocoreConfig:
+    """Get the botocore config shared by all cached clients"""
+    return BotocoreConfig(
+        max_pool_connections=BOTO_MAX_POOL_CONNECTIONS,
+        tcp_keepalive=BOTO_TCP_KEEPALIVE,
+    )
+
+
+@lru_cache(maxsize=CLIENT_CACHE_SIZE)
+def get_boto_session(region: str) -> boto3.Session:
+    """Get a boto3 session for the region, reused across requests"""
+    logger.info(f"Create boto3 session for {region}")
+    return boto3.Session(region_name=region)
+
+
+@lru_cache(maxsize=CLIENT_CACHE_SIZE)
+def get_boto_client(service_name: str, region: str):
+    """Get a boto3 client for the service and region, reused across requests"""
+    logger.info(f"Create {service_name} client for {region}")
+    with _session_lock:
+        return get_boto_session(region).client(service_name, config=get_boto_client_config())
+
+
+@lru_cache(maxsize=CLIENT_CACHE_SIZE)
+def get_bedrock_model(model_id: str, region: str) -> BedrockModel:
+    """Get a Bedrock model for (model_id, region), reused across requests
+
+    The model keeps its bedrock-runtime client, so the TLS connection pool
+    stays warm between invocations.
+    """
+    logger.info(f"Create Bedrock model {model_id} in {region}")
+    with _session_lock:
+        return BedrockModel(
+            model_id=model_id,
+            boto_session=get_boto_session(region),
+            boto_client_config=get_boto_client_config(),
+            cache_prompt="default",
+            cache_tools="default",
+        )
@@ -1,5 +1,6 @@
 """Configuration and environment setup for the agent core runtime."""
 
+import json
 import logging
 import os
 from typing import Any
@@ -13,13 +14,176 @@ logger = logging.getLogger(__name__)
 
 WORKSPACE_DIR = "/tmp/ws"
 
-FIXED_SYSTEM_PROMPT = f"""## About File Output
-- You are running on AWS Bedrock AgentCore. Therefore, when writing files, always write them under `{WORKSPACE_DIR}`.
-- Similarly, if you need a workspace, please use the `{WORKSPACE_DIR}` directory. Do not ask the user about their current workspace. It's always `{WORKSPACE_DIR}`.
-- Also, users cannot directly access files written under `{WORKSPACE_DIR}`. So when submitting these files to users, *always upload them to S3 using the `upload_file_to_s3_and_retrieve_s3_url` tool and provide the S3 URL*. The S3 URL must be included in the final output.
+# Workspaces retained per AgentCore session between turns (WORKSPACE_MAX_SESSIONS=0 deletes every
+# workspace after its request). Idle workspaces over their quota, unused for the TTL or, least recently
+# used first, over the total limits are deleted by a background sweeper.
+WORKSPACE_MAX_SESSIONS = int(os.environ.get("WORKSPACE_MAX_SESSIONS", "32"))
+WORKSPACE_SESSION_MAX_BYTES = int(os.environ.get("WORKSPACE_SESSION_MAX_BYTES", str(512 * 1024 * 1024)))
+WORKSPACE_MAX_BYTES = int(os.environ.get("WORKSPACE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+WORKSPACE_TTL_SECONDS = float(os.environ.get("WORKSPACE_TTL_SECONDS", "3600"))
+WORKSPACE_SWEEP_INTERVAL = float(os.environ.get("WORKSPACE_SWEEP_INTERVAL", "60"))
+
+# MCP server pool settings
+MCP_CONFIG_PATH = os.environ.get("MCP_CONFIG_PATH", "mcp.json")
+MCP_STARTUP_TIMEOUT = float(os.environ.get("MCP_STARTUP_TIMEOUT", "30"))
+
+# MCP servers installed into the image at build time by src/mcp_prebake.py
+# (servers missing from the manifest are started with uvx; set it to "" to always use uvx)
+MCP_PREBAKED_DIR = os.environ.get("MCP_PREBAKED_DIR", "/opt/mcp")
+MCP_PREBAKED_MANIFEST = os.environ.get("MCP_PREBAKED_MANIFEST", os.path.join(MCP_PREBAKED_DIR, "manifest.json"))
+
+# MCP server supervision: health checks (pings), tool call timeouts and restarts of failed
+# servers with exponential backoff (0 disables the health checks or the call timeout)
+MCP_HEALTH_CHECK_INTERVAL = float(os.environ.get("MCP_HEALTH_CHECK_INTERVAL", "30"))
+MCP_HEALTH_CHECK_TIMEOUT = float(os.environ.get("MCP_HEALTH_CHECK_TIMEOUT", "5"))
+MCP_CALL_TIMEOUT = float(os.environ.get("MCP_CALL_TIMEOUT", "300"))
+# Call timeouts per MCP server as JSON, e.g. {"aws-diagram-mcp-server": 120}
+MCP_CALL_TIMEOUTS: dict[str, float] = json.loads(os.environ.get("MCP_CALL_TIMEOUTS", "{}"))
+MCP_RESTART_BACKOFF_BASE = float(os.environ.get("MCP_RESTART_BACKOFF_BASE", "1"))
+MCP_RESTART_BACKOFF_MAX = float(os.environ.get("MCP_RESTART_BACKOFF_MAX", "60"))
+
+# Request size limits
+MAX_REQUEST_BODY_BYTES = int(os.environ.get("MAX_REQUEST_BODY_BYTES", str(100 * 1024 * 1024)))
+MAX_REQUEST_MEDIA_BYTES = int(os.environ.get("MAX_REQUEST_MEDIA_BYTES", str(75 * 1024 * 1024)))
+
+# Decoded media cache (set MEDIA_CACHE_MAX_BYTES=0 to disable)
+MEDIA_CACHE_MAX_BYTES = int(os.environ.get("MEDIA_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+MEDIA_CACHE_MAX_ITEMS = int(os.environ.get("MEDIA_CACHE_MAX_ITEMS", "512"))
+
+# Streaming response settings (STREAM_FLUSH_MAX_MS=0 writes every event immediately)
+STREAM_FLUSH_MAX_BYTES = int(os.environ.get("STREAM_FLUSH_MAX_BYTES", "4096"))
+STREAM_FLUSH_MAX_MS = float(os.environ.get("STREAM_FLUSH_MAX_MS", "50"))
+STREAM_JSON_BACKEND = os.environ.get("STREAM_JSON_BACKEND", "auto")
+
+# Default conversation history strategy (none, sliding_window, token_budget or summarize)
+HISTORY_STRATEGY = os.environ.get("HISTORY_STRATEGY", "none")
+HISTORY_MAX_MESSAGES = int(os.environ.get("HISTORY_MAX_MESSAGES", "40"))
+HISTORY_MAX_TOKENS = int(os.environ.get("HISTORY_MAX_TOKENS", "100000"))
+HISTORY_STEP_TURNS = int(os.environ.get("HISTORY_STEP_TURNS", "4"))
+
+# boto3 client settings
+CLIENT_CACHE_SIZE = int(os.environ.get("CLIENT_CACHE_SIZE", "32"))
+BOTO_MAX_POOL_CONNECTIONS = int(os.environ.get("BOTO_MAX_POOL_CONNECTIONS", "50"))
+BOTO_TCP_KEEPALIVE = os.environ.get("BOTO_TCP_KEEPALIVE", "true").lower() == "true"
+
+# Model routing: MODEL_ROUTES lists equivalent (model, region) targets per requested model id as JSON,
+# e.g. {"us.anthropic.claude-sonnet-4-20250514-v1:0": [{"modelId": "us.anthropic.claude-sonnet-4-20250514-v1:0", "region": "us-west-2"}]}.
+# Calls go to the target with the lowest time to first token, penalized by its throttle rate, and move to
+# the next target when throttled before the first token.
+MODEL_ROUTES: dict[str, list[dict[str, str]]] = json.loads(os.environ.get("MODEL_ROUTES", "{}"))
+ROUTING_EWMA_ALPHA = float(os.environ.get("ROUTING_EWMA_ALPHA", "0.2"))
+# Targets within this share of the fastest one are taken in the configured order
+ROUTING_LATENCY_TOLERANCE = float(os.environ.get("ROUTING_LATENCY_TOLERANCE", "0.2"))
+ROUTING_THROTTLE_PENALTY = float(os.environ.get("ROUTING_THROTTLE_PENALTY", "4"))
+ROUTING_THROTTLE_COOLDOWN_SECONDS = float(os.environ.get("ROUTING_THROTTLE_COOLDOWN_SECONDS", "30"))
+ROUTING_THROTTLE_HALF_LIFE_SECONDS = float(os.environ.get("ROUTING_THROTTLE_HALF_LIFE_SECONDS", "60"))
+
+# Built-in tools (mcp-api disables the code interpreter and keys uploads under mcp/)
+CODE_INTERPRETER_ENABLED = os.environ.get("CODE_INTERPRETER_ENABLED", "true").lower() == "true"
+UPLOAD_KEY_PREFIX = os.environ.get("UPLOAD_KEY_PREFIX", "agentcore")
+
+# S3 upload settings
+UPLOAD_MULTIPART_THRESHOLD = int(os.environ.get("UPLOAD_MULTIPART_THRESHOLD", str(16 * 1024 * 1024)))
+UPLOAD_MULTIPART_CHUNKSIZE = int(os.environ.get("UPLOAD_MULTIPART_CHUNKSIZE", str(16 * 1024 * 1024)))
+UPLOAD_MAX_CONCURRENCY = int(os.environ.get("UPLOAD_MAX_CONCURRENCY", "10"))
+UPLOAD_BATCH_CONCURRENCY = int(os.environ.get("UPLOAD_BATCH_CONCURRENCY", "8"))
+UPLOAD_MAX_FILES = int(os.environ.get("UPLOAD_MAX_FILES", "100"))
+UPLOAD_HASH_CACHE_SIZE = int(os.environ.get("UPLOAD_HASH_CACHE_SIZE", "4096"))
+
+# Response cache of deterministic requests (none, memory or sqlite)
+RESPONSE_CACHE_BACKEND = os.environ.get("RESPONSE_CACHE_BACKEND", "none")
+RESPONSE_CACHE_TTL_SECONDS = float(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+RESPONSE_CACHE_MAX_ITEMS = int(os.environ.get("RESPONSE_CACHE_MAX_ITEMS", "256"))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_PATH = os.environ.get("RESPONSE_CACHE_PATH", "/tmp/cache/responses.sqlite3")
+# Comma separated names of tools without side effects, whose use does not prevent caching
+RESPONSE_CACHE_PURE_TOOLS = {name.strip() for name in os.environ.get("RESPONSE_CACHE_PURE_TOOLS", "").split(",") if name.strip()}
+
+# Warm agents kept per AgentCore session between turns (SESSION_CACHE_MAX_SESSIONS=0 disables it).
+# The size of an agent is the size of the text and media of its conversation.
+SESSION_CACHE_MAX_SESSIONS = int(os.environ.get("SESSION_CACHE_MAX_SESSIONS", "0"))
+SESSION_CACHE_MAX_BYTES = int(os.environ.get("SESSION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+SESSION_CACHE_TTL_SECONDS = float(os.environ.get("SESSION_CACHE_TTL_SECONDS", "900"))
+
+# Admission control of agent runs (ADMISSION_MAX_CONCURRENT=0 disables it)
+ADMISSION_MAX_CONCURRENT = int(os.environ.get("ADMISSION_MAX_CONCURRENT", "8"))
+ADMISSION_MAX_QUEUE = int(os.environ.get("ADMISSION_MAX_QUEUE", "16"))
+ADMISSION_MAX_WAIT_SECONDS = float(os.environ.get("ADMISSION_MAX_WAIT_SECONDS", "30"))
+
+# Batch invocation settings
+BATCH_DEFAULT_CONCURRENCY = int(os.environ.get("BATCH_DEFAULT_CONCURRENCY", "4"))
+BATCH_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", "16"))
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "1000"))
+
+# Tool result size policy: larger text results are cut to an excerpt before they reach
+# the model (0 disables a limit). TOOL_RESULT_LIMITS overrides the limits per tool as JSON,
+# e.g. {"search_documentation": {"max_bytes": 131072, "max_tokens": 32000}}
+TOOL_RESULT_MAX_BYTES = int(os.environ.get("TOOL_RESULT_MAX_BYTES", str(64 * 1024)))
+TOOL_RESULT_MAX_TOKENS = int(os.environ.get("TOOL_RESULT_MAX_TOKENS", "16000"))
+TOOL_RESULT_LIMITS: dict[str, dict[str, int]] = json.loads(os.environ.get("TOOL_RESULT_LIMITS", "{}"))
+# Keep the full text of cut results in the workspace, readable in parts with read_tool_result
+TOOL_RESULT_SPILL = os.environ.get("TOOL_RESULT_SPILL", "true").lower() == "true"
+
+# Tool calls: at most TOOL_MAX_CONCURRENCY tool calls of a request run at once (0 = no limit) and every call
+# is cut off after TOOL_TIMEOUT_SECONDS (0 disables it). TOOL_TIMEOUTS overrides the timeout per tool as JSON,
+# e.g. {"code_interpreter": 900}. A toolLatency event is streamed after every call with TOOL_LATENCY_EVENTS.
+# A timeout only ends the wait: a synchronous tool keeps its thread of the tools pool (EXECUTOR_TOOLS_WORKERS)
+# until its function returns. Such runs are counted in the tool_abandoned_runs gauge.
+TOOL_MAX_CONCURRENCY = int(os.environ.get("TOOL_MAX_CONCURRENCY", "4"))
+TOOL_TIMEOUT_SECONDS = float(os.environ.get("TOOL_TIMEOUT_SECONDS", "600"))
+TOOL_TIMEOUTS: dict[str, float] = json.loads(os.environ.get("TOOL_TIMEOUTS", "{}"))
+TOOL_LATENCY_EVENTS = os.environ.get("TOOL_LATENCY_EVENTS", "true").lower() == "true"
+
+# Tracing spans for the phases of agent runs (phase histograms are always recorded)
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "true").lower() == "true"
+
+# Thread pools for blocking work, per kind of work
+EXECUTOR_WORKERS = {
+    "workspace": int(os.environ.get("EXECUTOR_WORKSPACE_WORKERS", "4")),
+    "mcp": int(os.environ.get("EXECUTOR_MCP_WORKERS", "8")),
+    "upload": int(os.environ.get("EXECUTOR_UPLOAD_WORKERS", "8")),
+    "parse": int(os.environ.get("EXECUTOR_PARSE_WORKERS", "2")),
+    "model": int(os.environ.get("EXECUTOR_MODEL_WORKERS", "2")),
+    "cache": int(os.environ.get("EXECUTOR_CACHE_WORKERS", "2")),
+    "tools": int(os.environ.get("EXECUTOR_TOOLS_WORKERS", "8")),
+}
+
+# Event loop lag monitoring (LOOP_LAG_THRESHOLD_MS=0 disables it)
+LOOP_LAG_INTERVAL_MS = float(os.environ.get("LOOP_LAG_INTERVAL_MS", "100"))
+LOOP_LAG_THRESHOLD_MS = float(os.environ.get("LOOP_LAG_THRESHOLD_MS", "200"))
+
+# Startup time targets, checked by bench/startup.py: importing app and
+# answering the first /ping (MCP servers keep starting in the background)
+STARTUP_IMPORT_BUDGET_SECONDS = float(os.environ.get("STARTUP_IMPORT_BUDGET_SECONDS", "1.5"))
+STARTUP_PING_BUDGET_SECONDS = float(os.environ.get("STARTUP_PING_BUDGET_SECONDS", "3"))
+
+# Debug endpoints such as /debug/importtime (disabled by default)
+DEBUG_ENDPOINTS = os.environ.get("DEBUG_ENDPOINTS", "false").lower() == "true"
+
+# The system prompt does not contain any per-request value so that it is byte-stable and read
+# from the prompt cache. The workspace directory is given in the user turn (see get_workspace_prompt).
+FIXED_SYSTEM_PROMPT = """## About File Output
+- You are running on AWS Bedrock AgentCore. Therefore, when writing files, always write them under the workspace directory given in the latest user message.
+- Similarly, if you need a workspace, please use the workspace directory. Do not ask the user about their current workspace. It's always the workspace directory.
+- Also, users cannot directly access files written under the workspace directory. So when submitting these files to users, *always upload them to S3 using the `upload_file_to_s3_and_retrieve_s3_url` tool and provide the S3 URL*. To upload several files at once, use the `upload_files_to_s3_and_retrieve_s3_urls` tool with a directory or glob pattern. The S3 URL must be included in the final output.
 - If the output file is an image file, the S3 URL output must be in Markdown format.
 """
 
+# Fixed system prompt of the MCP chat API (mcp-api), which runs on AWS Lambda and only offers the single file upload tool
+MCP_API_FIXED_SYSTEM_PROMPT = """## About File Output
+- You are running on AWS Lambda. Therefore, when writing files, always write them under the workspace directory given in the latest user message.
+- Similarly, if you need a workspace, please use the workspace directory. Do not ask the user about their current workspace. It's always the workspace directory.
+- Also, users cannot directly access files written under the workspace directory. So when submitting these files to users, *always upload them to S3 using the `upload_file_to_s3_and_retrieve_s3_url` tool and provide the S3 URL*. The S3 URL must be included in the final output.
+- If the output file is an image file, the S3 URL output must be in Markdown format.
+"""
+
+WORKSPACE_PROMPT_TEMPLATE = """## Workspace Directory
+`{workspace_dir}`
+"""
+
+RETAINED_WORKSPACE_PROMPT = """- Files written in earlier turns of this conversation are kept in the workspace directory. Reuse them (e.g. cloned repositories or generated files) instead of creating them again.
+"""
+
 
 def get_aws_credentials() -> dict[str, str]:
     """Get AWS credentials from environment or IAM role"""
@@ -51,12 +215,26 @@ def get_uv_environment() -> dict[str, str]:
     }
 
 
-def get_system_prompt(user_system_prompt: str = None) -> str:
-    """Combine user system prompt with fixed system prompt"""
+def get_system_prompt(user_system_prompt: str = None, fixed_system_prompt: str = FIXED_SYSTEM_PROMPT) -> str:
+    """Combine fixed system prompt with user system prompt
+
+    The system prompt holds no per-request value, so it is identical for
+    every request with the same user system prompt and stays in the
+    prompt cache. Each entry point passes the fixed prompt describing
+    where it runs.
+    """
     if user_system_prompt:
-        return f"{user_system_prompt}\n{FIXED_SYSTEM_PROMPT}"
+        return f"{fixed_system_prompt}\n{user_system_prompt}"
     else:
-        return FIXED_SYSTEM_PROMPT
+        return fixed_system_prompt
+
+
+def get_workspace_prompt(workspace_dir: str = WORKSPACE_DIR, workspace_retained: bool = False) -> str:
+    """Describe the workspace directory of a request, sent in front of the user's prompt"""
+    workspace_prompt = WORKSPACE_PROMPT_TEMPLATE.format(workspace_dir=workspace_dir)
+    if workspace_retained:
+        workspace_prompt += RETAINED_WORKSPACE_PROMPT
+    return workspace_prompt
 
 
 def extract_model_info(model_info: Any) -> tuple[str, str]:
@@ -71,3 +249,20 @@ def extract_model_info(model_info: Any) -> tuple[str, str]:
         region = model_info.get("region", aws_creds.get("AWS_REGION", "us-east-1"))
 
     return model_id, region
+
+
+def extract_model_targets(model_info: Any) -> list[tuple[str, str]]:
+    """Extract the equivalent (model ID, region) targets of a request in order of preference
+
+    The requested model comes first, followed by the fallbacks of the
+    request and the routes configured for the model in MODEL_ROUTES.
+    """
+    model_id, region = extract_model_info(model_info)
+    fallbacks = (model_info.get("fallbacks") or []) if isinstance(model_info, dict) else []
+
+    targets = [(model_id, region)]
+    for target in [*fallbacks, *MODEL_ROUTES.get(model_id, [])]:
+        target = (target.get("modelId") or model_id, target.get("region") or region)
+        if target not in targets:
+            targets.append(target)
+    return targets
@@ -0,0 +1,41 @@
+"""Per-request context for the agent core runtime."""
+
+import asyncio
+import contextvars
+import os
+from uuid import uuid4
+
+from .config import TOOL_MAX_CONCURRENCY, WORKSPACE_DIR
+
+
+class RequestContext:
+    """Session specific state of a single invocation.
+
+    Every invocation gets its own workspace directory so that concurrent
+    requests never see or delete each other's files, unless the workspace
+    manager retains the workspace of its session (see WorkspaceManager).
+    """
+
+    def __init__(self, session_id: str | None, trace_id: str | None, request_id: str | None = None):
+        self.session_id = session_id
+        self.trace_id = trace_id
+        self.request_id = request_id or str(uuid4())
+        self.workspace_dir = os.path.join(WORKSPACE_DIR, self.request_id)
+        self.workspace_retained = False
+        # The (model_id, region) target that served the last model call of a routed model (see RoutedModel)
+        self.model_target: tuple[str, str] | None = None
+        # Limits the tool calls of the request that run at once
+        self.tool_semaphore = asyncio.Semaphore(TOOL_MAX_CONCURRENCY) if TOOL_MAX_CONCURRENCY > 0 else None
+
+
+_current_request: contextvars.ContextVar[RequestContext | None] = contextvars.ContextVar("current_request", default=None)
+
+
+def set_request_context(context: RequestContext) -> contextvars.Token:
+    """Bind the request context to the current task"""
+    return _current_request.set(context)
+
+
+def get_request_context() -> RequestContext | None:
+    """Get the request context bound to the current task"""
+    return _current_request.get()
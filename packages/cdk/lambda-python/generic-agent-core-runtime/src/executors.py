@@ -0,0 +1,76 @@
+"""Bounded thread pools for blocking work of the agent core runtime."""
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from .config import EXECUTOR_WORKERS
+from .metrics import metrics
+
+
+class ExecutorRegistry:
+    """Named thread pools, one per kind of blocking work.
+
+    Each kind of work (workspace file operations, MCP tool loading, S3
+    uploads, request parsing) gets its own bounded pool, so a burst of one
+    kind, such as many large workspace cleanups, can never take the threads
+    needed by another, and none of them run on the event loop.
+    """
+
+    def __init__(self, workers: dict[str, int] = EXECUTOR_WORKERS):
+        self.workers = workers
+        self._executors: dict[str, ThreadPoolExecutor] = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind: str) -> ThreadPoolExecutor:
+        """Get the pool of a kind of work, creating it on first use"""
+        with self._lock:
+            executor = self._executors.get(kind)
+            if executor is None:
+                if kind not in self.workers:
+                    raise ValueError(f"Unknown executor kind: {kind}")
+                executor = self._executors[kind] = ThreadPoolExecutor(max_workers=self.workers[kind], thread_name_prefix=f"{kind}-worker")
+            return executor
+
+    async def run(self, kind: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run a blocking function in the pool of its kind
+
+        The function sees the caller's context variables (such as the
+        request context), like with asyncio.to_thread. Time spent waiting for
+        a free thread and running are recorded per kind.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        submitted = time.monotonic()
+
+        def call() -> Any:
+            started = time.monotonic()
+            metrics.observe("executor_queue_seconds", started - submitted, kind=kind)
+            try:
+                return context.run(functools.partial(func, *args, **kwargs))
+            finally:
+                metrics.observe("executor_run_seconds", time.monotonic() - started, kind=kind)
+
+        return await loop.run_in_executor(self.get(kind), call)
+
+    def shutdown(self, wait: bool = False):
+        """Shut down all pools"""
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+# Shared executors
+executors = ExecutorRegistry()
+
+
+async def run_blocking(kind: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking function in the shared pool of its kind"""
+    return await executors.run(kind, func, *args, **kwargs)
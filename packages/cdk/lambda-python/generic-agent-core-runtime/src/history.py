@@ -0,0 +1,222 @@
+"""Conversation history compaction for the agent core runtime."""
+
+import hashlib
+import json
+import logging
+import math
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from strands import Agent as StrandsAgent
+
+from .metrics import metrics
+from .routing import get_served_target
+from .types import HistoryConfig
+
+logger = logging.getLogger(__name__)
+
+# Rough token costs of non-text content
+IMAGE_TOKENS = 1600
+VIDEO_TOKENS = 10000
+
+SUMMARY_SYSTEM_PROMPT = """You summarize conversations between a user and an AI assistant.
+Write a concise summary of the conversation below that keeps every fact, decision, file path, URL and open task needed to continue it.
+Answer with the summary only."""
+
+SUMMARY_CACHE_SIZE = 128
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Estimate tokens of a text (about 4 ASCII characters or 1 non-ASCII character per token)"""
+    if text.isascii():
+        return math.ceil(len(text) / 4)
+    # Non-ASCII characters take 2 to 4 bytes in UTF-8 (3 for Japanese), so their number follows from the lengths
+    non_ascii = min((len(text.encode("utf-8", "surrogatepass")) - len(text)) // 2, len(text))
+    return math.ceil((len(text) - non_ascii) / 4) + non_ascii
+
+
+def estimate_block_tokens(block: dict[str, Any]) -> int:
+    """Estimate tokens of a content block"""
+    if "text" in block:
+        return estimate_text_tokens(block["text"])
+    if "image" in block:
+        return IMAGE_TOKENS
+    if "video" in block:
+        return VIDEO_TOKENS
+    if "document" in block:
+        data = block["document"].get("source", {}).get("bytes", b"")
+        return math.ceil(len(data) / 4)
+    if "toolUse" in block:
+        return estimate_text_tokens(json.dumps(block["toolUse"].get("input", {}), ensure_ascii=False)) + 10
+    if "toolResult" in block:
+        return sum(estimate_block_tokens(b) for b in block["toolResult"].get("content", [])) + 10
+    if "reasoningContent" in block:
+        return estimate_text_tokens(block["reasoningContent"].get("reasoningText", {}).get("text", ""))
+    return 0
+
+
+def estimate_message_tokens(message: dict[str, Any]) -> int:
+    """Estimate tokens of a message"""
+    content = message.get("content", [])
+    if isinstance(content, str):
+        return estimate_text_tokens(content)
+    return sum(estimate_block_tokens(b) for b in content if isinstance(b, dict))
+
+
+def is_turn_start(message: dict[str, Any]) -> bool:
+    """Whether a message starts a new user turn (a user message that is not a tool result)"""
+    if message.get("role") != "user":
+        return False
+    content = message.get("content", [])
+    return not any(isinstance(b, dict) and "toolResult" in b for b in content)
+
+
+def find_cut(messages: list[dict[str, Any]], min_cut: int, step_turns: int) -> int:
+    """Find where to cut the history so that at least min_cut messages are dropped
+
+    Only turn starts are valid cut points, so tool uses and their results
+    are never split. Cut points are further restricted to every
+    step_turns-th turn, counted from the start of the conversation. The cut
+    therefore stays at the same message for several turns, which keeps the
+    remaining history byte-stable and prompt-cache friendly.
+    """
+    if min_cut <= 0:
+        return 0
+
+    turn = 0
+    for i, message in enumerate(messages):
+        if not is_turn_start(message):
+            continue
+        if i >= min_cut and turn % step_turns == 0:
+            return i
+        turn += 1
+
+    # No valid cut point: keep only the last turn
+    for i in range(len(messages) - 1, -1, -1):
+        if is_turn_start(messages[i]):
+            return i
+    return 0
+
+
+def sliding_window_cut(messages: list[dict[str, Any]], config: HistoryConfig) -> int:
+    """Cut index that keeps at most max_messages messages"""
+    return find_cut(messages, len(messages) - config.max_messages, config.step_turns)
+
+
+def token_budget_cut(messages: list[dict[str, Any]], config: HistoryConfig) -> int:
+    """Cut index that keeps the history within max_tokens"""
+    remaining = sum(estimate_message_tokens(m) for m in messages)
+    min_cut = 0
+    while min_cut < len(messages) and remaining > config.max_tokens:
+        remaining -= estimate_message_tokens(messages[min_cut])
+        min_cut += 1
+    return find_cut(messages, min_cut, config.step_turns)
+
+
+def render_messages(messages: list[dict[str, Any]]) -> str:
+    """Render messages as plain text for summarization"""
+    lines = []
+    for message in messages:
+        parts = []
+        for block in message.get("content", []):
+            if "text" in block:
+                parts.append(block["text"])
+            elif "toolUse" in block:
+                parts.append(f"[tool use: {block['toolUse'].get('name')} {json.dumps(block['toolUse'].get('input', {}), ensure_ascii=False)}]")
+            elif "toolResult" in block:
+                texts = [b["text"] for b in block["toolResult"].get("content", []) if "text" in b]
+                parts.append(f"[tool result: {' '.join(texts)}]")
+            else:
+                parts.append(f"[{next(iter(block), 'content')}]")
+        lines.append(f"{message.get('role')}: {' '.join(parts)}")
+    return "\n".join(lines)
+
+
+class HistoryCompactor:
+    """Compacts the conversation history before the agent is constructed.
+
+    Strategies:
+    - none: keep the history as is
+    - sliding_window: keep the last max_messages messages
+    - token_budget: keep the most recent messages within max_tokens (estimated locally)
+    - summarize: like token_budget, but replace the dropped messages with a
+      summary, which is cached so it is only generated once per cut point
+
+    The system prompt and tools are never touched, so their prompt-cache
+    breakpoints stay valid. The summary is added as the first messages.
+    """
+
+    def __init__(self):
+        self._summary_cache: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_cached_summary(self, key: str) -> str | None:
+        with self._lock:
+            summary = self._summary_cache.get(key)
+            if summary is not None:
+                self._summary_cache.move_to_end(key)
+            return summary
+
+    def _put_cached_summary(self, key: str, summary: str):
+        with self._lock:
+            self._summary_cache[key] = summary
+            while len(self._summary_cache) > SUMMARY_CACHE_SIZE:
+                self._summary_cache.popitem(last=False)
+
+    async def summarize(self, messages: list[dict[str, Any]], model: Any, model_id: str) -> str:
+        """Summarize messages, reusing the cached summary of the same messages
+
+        Summaries are cached for the requested model_id, as its targets are
+        equivalent, and their tokens are counted for the target that served
+        the summary.
+        """
+        text = render_messages(messages)
+        key = hashlib.sha256(f"{model_id}\n{text}".encode()).hexdigest()
+
+        summary = self._get_cached_summary(key)
+        if summary is not None:
+            metrics.increment("history_summary_cache_hits_total")
+            return summary
+
+        metrics.increment("history_summary_cache_misses_total")
+        agent = StrandsAgent(model=model, system_prompt=SUMMARY_SYSTEM_PROMPT, callback_handler=None)
+        result = await agent.invoke_async(text)
+        served_model_id = (get_served_target() or (model_id, None))[0]
+        metrics.increment("history_summary_tokens_total", result.metrics.accumulated_usage["totalTokens"], model_id=served_model_id)
+        summary = str(result).strip()
+        self._put_cached_summary(key, summary)
+        return summary
+
+    async def compact(self, messages: list[Any], config: HistoryConfig | None, model: Any = None, model_id: str = "") -> list[Any]:
+        """Apply the history strategy to the processed messages"""
+        if not config or config.strategy == "none" or not messages:
+            return messages
+
+        if config.strategy == "sliding_window":
+            cut = sliding_window_cut(messages, config)
+        else:
+            cut = token_budget_cut(messages, config)
+
+        if cut <= 0:
+            return messages
+
+        kept = messages[cut:]
+        metrics.increment("history_compactions_total", strategy=config.strategy)
+        metrics.observe("history_dropped_messages", cut, strategy=config.strategy)
+        logger.info(f"History compacted with {config.strategy}: dropped {cut} of {len(messages)} messages")
+
+        if config.strategy != "summarize" or model is None:
+            return kept
+
+        try:
+            summary = await self.summarize(messages[:cut], model, model_id)
+        except Exception as e:
+            logger.warning(f"Failed to summarize history, falling back to trimming: {e}")
+            return kept
+
+        return [
+            {"role": "user", "content": [{"text": f"<conversation_summary>\n{summary}\n</conversation_summary>"}]},
+            {"role": "assistant", "content": [{"text": "I understand the earlier conversation from the summary."}]},
+            *kept,
+        ]
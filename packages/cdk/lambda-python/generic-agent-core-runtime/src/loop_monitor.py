@@ -0,0 +1,92 @@
+"""Event loop lag monitoring for the agent core runtime."""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from .config import LOOP_LAG_INTERVAL_MS, LOOP_LAG_THRESHOLD_MS
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop runs its callbacks.
+
+    A heartbeat task sleeps for interval and records how much later than
+    requested it woke up as event_loop_lag_seconds. A watchdog thread checks
+    the heartbeat; when the loop has not run it for longer than threshold,
+    the stack of the event loop thread is logged once per stall, which
+    points at the handler that is blocking it.
+    """
+
+    def __init__(self, interval_ms: float = LOOP_LAG_INTERVAL_MS, threshold_ms: float = LOOP_LAG_THRESHOLD_MS):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.max_lag = 0.0
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._stop = threading.Event()
+        self._watchdog: threading.Thread | None = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether monitoring is enabled (a threshold of 0 disables it)"""
+        return self.interval > 0 and self.threshold > 0
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._last_beat = now
+            self.max_lag = max(self.max_lag, lag)
+            metrics.observe("event_loop_lag_seconds", lag)
+            if lag > self.threshold:
+                metrics.increment("event_loop_stalls_total")
+                logger.warning(f"Event loop was blocked for {lag * 1000:.0f}ms")
+
+    def _watch(self):
+        reported_beat = None
+        while not self._stop.wait(self.threshold / 2):
+            last_beat = self._last_beat
+            stalled = time.monotonic() - last_beat - self.interval
+            if stalled <= self.threshold or reported_beat == last_beat:
+                continue
+
+            # Report each stall once, with the stack of the blocked loop thread
+            reported_beat = last_beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "(unavailable)"
+            logger.warning(f"Event loop blocked for more than {stalled * 1000:.0f}ms in:\n{stack}")
+
+    def start(self):
+        """Start monitoring the running event loop"""
+        if not self.enabled or self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"Event loop lag monitor started (interval {self.interval * 1000:.0f}ms, threshold {self.threshold * 1000:.0f}ms)")
+
+    def stop(self):
+        """Stop monitoring"""
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def get_status(self) -> dict[str, float]:
+        """Current status for the metrics endpoint"""
+        return {
+            "max_lag_seconds": self.max_lag,
+            "seconds_since_heartbeat": time.monotonic() - self._last_beat,
+        }
@@ -0,0 +1,456 @@
+"""MCP server pool for the agent core runtime."""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any
+
+from .config import (
+    MCP_CALL_TIMEOUT,
+    MCP_CALL_TIMEOUTS,
+    MCP_CONFIG_PATH,
+    MCP_HEALTH_CHECK_INTERVAL,
+    MCP_HEALTH_CHECK_TIMEOUT,
+    MCP_PREBAKED_MANIFEST,
+    MCP_RESTART_BACKOFF_BASE,
+    MCP_RESTART_BACKOFF_MAX,
+    MCP_STARTUP_TIMEOUT,
+    get_uv_environment,
+)
+from .executors import executors
+from .mcp_prebake import load_prebaked_manifest, resolve_server_command
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def load_mcp_server_configs(config_path: str = MCP_CONFIG_PATH) -> dict[str, dict[str, Any]]:
+    """Load MCP server definitions from mcp.json"""
+    try:
+        with open(config_path) as f:
+            mcp_json = json.loads(f.read())
+    except Exception as e:
+        logger.error(f"Error loading {config_path}: {e}")
+        return {}
+
+    if "mcpServers" not in mcp_json:
+        logger.warning(f"mcpServers not defined in {config_path}")
+        return {}
+
+    return mcp_json["mcpServers"]
+
+
+def get_restart_delay(attempts: int, base: float = MCP_RESTART_BACKOFF_BASE, maximum: float = MCP_RESTART_BACKOFF_MAX) -> float:
+    """Delay before the next restart of a server that failed to start the given number of times"""
+    if attempts <= 0:
+        return 0.0
+    return min(base * 2 ** (attempts - 1), maximum)
+
+
+def _send_session_ping(client: Any) -> Future | None:
+    """Send an MCP ping on the session and background loop of a strands MCPClient
+
+    This is the only place that touches private attributes of the client
+    (_invoke_on_background_thread and _background_thread_session, as of
+    strands 1.0), because it has no public ping. Returns the future of the
+    ping, or None when this version of strands does not have them.
+    """
+    invoke = getattr(client, "_invoke_on_background_thread", None)
+    session = getattr(client, "_background_thread_session", None)
+    if not callable(invoke) or not callable(getattr(session, "send_ping", None)):
+        return None
+    return invoke(session.send_ping())
+
+
+def ping_client(client: Any, timeout: float) -> None:
+    """Check that an MCP server answers on the session of its client, raising if it does not
+
+    Listing the tools, in the MCP thread pool, serves as the ping when the
+    client's own session cannot be pinged (see _send_session_ping).
+    """
+    future = _send_session_ping(client)
+    if future is None:
+        future = executors.get("mcp").submit(client.list_tools_sync)
+    try:
+        future.result(timeout=timeout or None)
+    except TimeoutError:
+        future.cancel()
+        raise TimeoutError(f"no answer to ping within {timeout}s") from None
+
+
+class SupervisedMCPClient:
+    """Client handle of the MCP tools of one server
+
+    Tool calls go to the current client of the server, so tools created
+    before a restart keep working after it, and are cut off after the call
+    timeout. Calls that time out or find the server dead are reported to
+    the pool, which checks the server and restarts it if needed.
+    """
+
+    def __init__(self, pool: "MCPServerPool", server_name: str):
+        self.pool = pool
+        self.server_name = server_name
+
+    def _error_result(self, tool_use_id: str, message: str) -> dict[str, Any]:
+        return {"status": "error", "toolUseId": tool_use_id, "content": [{"text": message}]}
+
+    async def call_tool_async(self, tool_use_id: str, name: str, arguments: dict[str, Any] | None = None, read_timeout_seconds: Any = None, **kwargs: Any) -> dict[str, Any]:
+        """Call a tool on the current client of the server; other arguments of newer strands versions are passed on"""
+        client = self.pool.get_client(self.server_name)
+        if client is None:
+            return self._error_result(tool_use_id, f"Tool execution failed: MCP server {self.server_name} is not available, it is being restarted")
+
+        call = client.call_tool_async(tool_use_id=tool_use_id, name=name, arguments=arguments, read_timeout_seconds=read_timeout_seconds, **kwargs)
+        call_timeout = self.pool.get_call_timeout(self.server_name)
+        try:
+            return await asyncio.wait_for(call, timeout=call_timeout or None)
+        except TimeoutError:
+            metrics.increment("mcp_tool_call_timeouts_total", server=self.server_name)
+            self.pool.report_failure(self.server_name, f"call of {name} timed out after {call_timeout}s")
+            return self._error_result(tool_use_id, f"Tool execution failed: {name} did not respond within {call_timeout}s")
+        except Exception as e:
+            # The client raises when its background thread (and with it the server) is gone
+            self.pool.report_failure(self.server_name, f"call of {name} failed: {e}")
+            return self._error_result(tool_use_id, f"Tool execution failed: {e}")
+
+
+class MCPServerPool:
+    """Starts all MCP servers concurrently and keeps their clients warm.
+
+    Each server is started in its own thread with an individual timeout, so a
+    slow or broken server only drops its own tools. A server that finishes
+    after the timeout is still added to the pool once it becomes ready.
+    Servers prebaked into the image are started directly from there.
+
+    Once warm, a supervisor thread pings every server periodically and
+    restarts servers that died, hang or failed to start in the background,
+    with exponential backoff. A restarted server's tools replace the old
+    ones in a single step, so requests see either the old or the new set.
+    """
+
+    def __init__(
+        self,
+        config_path: str = MCP_CONFIG_PATH,
+        startup_timeout: float = MCP_STARTUP_TIMEOUT,
+        manifest_path: str = MCP_PREBAKED_MANIFEST,
+        health_check_interval: float = MCP_HEALTH_CHECK_INTERVAL,
+        health_check_timeout: float = MCP_HEALTH_CHECK_TIMEOUT,
+        call_timeout: float = MCP_CALL_TIMEOUT,
+        call_timeouts: dict[str, float] = MCP_CALL_TIMEOUTS,
+    ):
+        self.config_path = config_path
+        self.startup_timeout = startup_timeout
+        self.manifest_path = manifest_path
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self.call_timeout = call_timeout
+        self.call_timeouts = call_timeouts
+        self.prebaked: dict[str, dict[str, Any]] = {}
+        self.server_configs: dict[str, dict[str, Any]] = {}
+        self.clients: dict[str, Any] = {}
+        self.server_tools: dict[str, list[Any]] = {}
+        self.server_status: dict[str, str] = {}
+        self.startup_seconds: dict[str, float] = {}
+        self.spawn_seconds: dict[str, float] = {}
+        self.server_modes: dict[str, str] = {}
+        self.restart_counts: dict[str, int] = {}
+        self.last_errors: dict[str, str] = {}
+        self._start_attempts: dict[str, int] = {}
+        self._next_restart: dict[str, float] = {}
+        self._suspects: set[str] = set()
+        self._restarting: set[str] = set()
+        self._server_order: list[str] = []
+        self._lock = threading.Lock()
+        self._started = False
+        self._ready = threading.Event()
+        self._stopping = threading.Event()
+        self._wake = threading.Event()
+        self._supervisor: threading.Thread | None = None
+        self._restart_executor: ThreadPoolExecutor | None = None
+
+    @property
+    def is_ready(self) -> bool:
+        """Whether every server has either started or timed out"""
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: float | None = None) -> bool:
+        """Block until the pool is warm"""
+        return self._ready.wait(timeout)
+
+    def _start_server(self, server_name: str, server: dict[str, Any]) -> bool:
+        """Start a single MCP server and list its tools, returning whether it is ready"""
+        # mcp is imported on first use since it is the slowest import of the runtime
+        from mcp import StdioServerParameters, stdio_client
+        from strands.tools.mcp import MCPAgentTool, MCPClient
+
+        start_time = time.monotonic()
+        uv_env = get_uv_environment()
+        command, args, mode = resolve_server_command(server_name, server, self.prebaked)
+        with self._lock:
+            self.server_modes[server_name] = mode
+
+        started = False
+        try:
+            client = MCPClient(
+                lambda: stdio_client(
+                    StdioServerParameters(
+                        command=command,
+                        args=args,
+                        env={**uv_env, **server.get("env", {})},
+                    )
+                )
+            )
+            # Starting the client spawns (and for uvx, installs) the server and initializes the session
+            client.start()
+            started = True
+            spawn_elapsed = time.monotonic() - start_time
+            tools = [MCPAgentTool(tool.mcp_tool, SupervisedMCPClient(self, server_name)) for tool in client.list_tools_sync()]
+        except Exception as e:
+            elapsed = time.monotonic() - start_time
+            logger.error(f"Error starting MCP server {server_name} ({mode}) after {elapsed:.2f}s: {e}")
+            # A server that started but could not list its tools is stopped, so its process does not linger
+            if started:
+                self._stop_client(server_name, client)
+            with self._lock:
+                self.server_status[server_name] = "failed"
+                self.last_errors[server_name] = str(e)
+                self._start_attempts[server_name] = self._start_attempts.get(server_name, 0) + 1
+                self._next_restart[server_name] = time.monotonic() + get_restart_delay(self._start_attempts[server_name])
+            metrics.increment("mcp_server_start_failures_total", server=server_name, mode=mode)
+            return False
+
+        if self._stopping.is_set():
+            self._stop_client(server_name, client)
+            return False
+
+        elapsed = time.monotonic() - start_time
+        with self._lock:
+            self.clients[server_name] = client
+            self.server_tools[server_name] = tools
+            self.server_status[server_name] = "ready"
+            self.startup_seconds[server_name] = elapsed
+            self.spawn_seconds[server_name] = spawn_elapsed
+            self._start_attempts[server_name] = 0
+            self._suspects.discard(server_name)
+
+        metrics.observe("mcp_server_spawn_seconds", spawn_elapsed, server=server_name, mode=mode)
+        metrics.observe("mcp_server_startup_seconds", elapsed, server=server_name, mode=mode)
+        logger.info(f"MCP server {server_name} ({mode}) spawned in {spawn_elapsed:.2f}s, ready in {elapsed:.2f}s with {len(tools)} tools")
+        return True
+
+    def start(self) -> None:
+        """Start all configured MCP servers in parallel and wait for them"""
+        with self._lock:
+            already_started = self._started
+            self._started = True
+
+        if already_started:
+            # Another caller is starting the pool; wait until it is warm
+            self._ready.wait()
+            return
+
+        start_time = time.monotonic()
+        mcp_servers = load_mcp_server_configs(self.config_path)
+        self.server_configs = mcp_servers
+        self._server_order = list(mcp_servers.keys())
+        self.prebaked = load_prebaked_manifest(self.manifest_path)
+
+        if not mcp_servers:
+            self._ready.set()
+            metrics.set_gauge("mcp_pool_ready", 1)
+            return
+
+        for server_name in mcp_servers:
+            self.server_status[server_name] = "starting"
+
+        executor = ThreadPoolExecutor(max_workers=len(mcp_servers), thread_name_prefix="mcp-start")
+        futures = {executor.submit(self._start_server, name, server): name for name, server in mcp_servers.items()}
+        _, not_done = wait(futures, timeout=self.startup_timeout)
+        # Do not wait for timed out servers; they join the pool if they finish later
+        executor.shutdown(wait=False)
+
+        with self._lock:
+            for future in not_done:
+                server_name = futures[future]
+                if self.server_status.get(server_name) != "starting":
+                    continue
+                self.server_status[server_name] = "timeout"
+                logger.warning(f"MCP server {server_name} did not start within {self.startup_timeout}s; its tools are unavailable for now")
+                metrics.increment("mcp_server_start_timeouts_total", server=server_name)
+
+        elapsed = time.monotonic() - start_time
+        metrics.observe("mcp_pool_startup_seconds", elapsed)
+        metrics.set_gauge("mcp_pool_ready", 1)
+        self._ready.set()
+        logger.info(f"MCP pool warm in {elapsed:.2f}s: {len(self.get_tools())} tools from {len(self.clients)}/{len(mcp_servers)} servers")
+        self._start_supervisor()
+
+    def get_call_timeout(self, server_name: str) -> float:
+        """Get the tool call timeout of a server (0 for no timeout)"""
+        return self.call_timeouts.get(server_name, self.call_timeout)
+
+    def get_client(self, server_name: str) -> Any | None:
+        """Get the client of a server if it is ready"""
+        with self._lock:
+            return self.clients.get(server_name) if self.server_status.get(server_name) == "ready" else None
+
+    def report_failure(self, server_name: str, reason: str) -> None:
+        """Report a failed tool call, so the supervisor checks the server right away"""
+        logger.warning(f"MCP server {server_name}: {reason}")
+        with self._lock:
+            self._suspects.add(server_name)
+        self._wake.set()
+
+    def check_health(self, server_name: str, client: Any) -> bool:
+        """Ping a server, returning whether it answered within the health check timeout"""
+        start_time = time.monotonic()
+        try:
+            ping_client(client, self.health_check_timeout)
+        except Exception as e:
+            logger.warning(f"Health check of MCP server {server_name} failed: {e}")
+            with self._lock:
+                self.last_errors[server_name] = str(e)
+            metrics.increment("mcp_health_check_failures_total", server=server_name)
+            return False
+
+        metrics.observe("mcp_health_check_seconds", time.monotonic() - start_time, server=server_name)
+        return True
+
+    def run_health_checks(self, force: bool = False) -> None:
+        """Check the ready servers and schedule restarts of the failed ones
+
+        Ready servers are pinged every health check interval, or right away
+        when a tool call reported them. Failed servers are restarted once
+        their backoff delay has passed.
+        """
+        now = time.monotonic()
+        with self._lock:
+            suspects = set(self._suspects)
+            self._suspects.clear()
+            servers = [(name, self.server_status.get(name), self.clients.get(name)) for name in self._server_order]
+
+        for server_name, server_status, client in servers:
+            if self._stopping.is_set():
+                return
+            if server_status == "ready" and (force or server_name in suspects):
+                if not self.check_health(server_name, client):
+                    self._schedule_restart(server_name)
+            elif server_status == "failed" and now >= self._next_restart.get(server_name, 0):
+                self._schedule_restart(server_name)
+
+    def _schedule_restart(self, server_name: str) -> None:
+        """Restart a server in the background unless a restart is already running"""
+        with self._lock:
+            if server_name in self._restarting or self._restart_executor is None:
+                return
+            self._restarting.add(server_name)
+            self.server_status[server_name] = "restarting"
+            # Drop the dead server's tools, so new requests do not offer them to the model
+            client = self.clients.pop(server_name, None)
+            self.server_tools.pop(server_name, None)
+
+        if client is not None:
+            threading.Thread(target=self._stop_client, args=(server_name, client), name=f"mcp-stop-{server_name}", daemon=True).start()
+        self._restart_executor.submit(self._restart_server, server_name)
+
+    def _restart_server(self, server_name: str) -> None:
+        """Start a server again and record the restart"""
+        start_time = time.monotonic()
+        try:
+            logger.info(f"Restarting MCP server {server_name}")
+            ready = self._start_server(server_name, self.server_configs[server_name])
+        finally:
+            with self._lock:
+                self._restarting.discard(server_name)
+
+        elapsed = time.monotonic() - start_time
+        result = "success" if ready else "failure"
+        metrics.increment("mcp_server_restarts_total", server=server_name, result=result)
+        metrics.observe("mcp_server_restart_seconds", elapsed, server=server_name, result=result)
+        if ready:
+            with self._lock:
+                self.restart_counts[server_name] = self.restart_counts.get(server_name, 0) + 1
+            logger.info(f"MCP server {server_name} restarted in {elapsed:.2f}s")
+        else:
+            self._wake.set()
+
+    def _stop_client(self, server_name: str, client: Any) -> None:
+        try:
+            client.stop(None, None, None)
+        except Exception as e:
+            logger.warning(f"Error stopping MCP server {server_name}: {e}")
+
+    def _start_supervisor(self) -> None:
+        """Start the supervisor thread unless health checks are disabled"""
+        if not self.health_check_interval or not self.server_configs or self._supervisor is not None or self._stopping.is_set():
+            return
+        self._restart_executor = ThreadPoolExecutor(max_workers=len(self.server_configs), thread_name_prefix="mcp-restart")
+        self._supervisor = threading.Thread(target=self._supervise, name="mcp-supervisor", daemon=True)
+        self._supervisor.start()
+
+    def _supervise(self) -> None:
+        last_check = time.monotonic()
+        while not self._stopping.is_set():
+            # Wake up for the next health check, the next due restart or a reported failure
+            with self._lock:
+                next_restart = min((self._next_restart.get(name, 0) for name, status in self.server_status.items() if status == "failed"), default=None)
+            timeout = last_check + self.health_check_interval - time.monotonic()
+            if next_restart is not None:
+                timeout = min(timeout, next_restart - time.monotonic())
+            self._wake.wait(max(timeout, 0))
+            self._wake.clear()
+            if self._stopping.is_set():
+                return
+
+            force = time.monotonic() - last_check >= self.health_check_interval
+            if force:
+                last_check = time.monotonic()
+            try:
+                self.run_health_checks(force=force)
+            except Exception as e:
+                logger.error(f"Error supervising MCP servers: {e}")
+
+    def get_tools(self) -> list[Any]:
+        """Get the tools of every ready server in mcp.json order"""
+        with self._lock:
+            return [tool for name in self._server_order for tool in self.server_tools.get(name, [])]
+
+    def get_status(self) -> dict[str, Any]:
+        """Get the pool status for health reporting"""
+        with self._lock:
+            return {
+                "ready": self.is_ready,
+                "servers": {
+                    name: {
+                        "status": status,
+                        "mode": self.server_modes.get(name),
+                        "spawn_seconds": self.spawn_seconds.get(name),
+                        "startup_seconds": self.startup_seconds.get(name),
+                        "tools": len(self.server_tools.get(name, [])),
+                        "restarts": self.restart_counts.get(name, 0),
+                        "last_error": self.last_errors.get(name),
+                        "version": self.prebaked.get(name, {}).get("version") if self.server_modes.get(name) == "prebaked" else None,
+                    }
+                    for name, status in self.server_status.items()
+                },
+            }
+
+    def stop(self) -> None:
+        """Stop the supervisor and all running MCP clients"""
+        self._stopping.set()
+        self._wake.set()
+        if self._supervisor is not None:
+            self._supervisor.join()
+        if self._restart_executor is not None:
+            self._restart_executor.shutdown(wait=False, cancel_futures=True)
+
+        with self._lock:
+            clients = list(self.clients.items())
+            self.clients = {}
+            self.server_tools = {}
+
+        for server_name, client in clients:
+            self._stop_client(server_name, client)
@@ -0,0 +1,156 @@
+"""Prebaked MCP servers for the agent core runtime.
+
+At image build time every `uvx` server of mcp.json is installed into its
+own virtual environment under MCP_PREBAKED_DIR and recorded in a manifest
+with the version that was resolved. At runtime the MCP server pool starts
+those servers directly from the image, so a cold container does not
+download and resolve the server packages again. Servers that are not in
+the manifest, or whose mcp.json entry changed since the build, are still
+started with `uvx`.
+
+Usage (Dockerfile): python -m src.mcp_prebake [--config mcp.json] [--target /opt/mcp]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import sys
+from typing import Any
+
+from .config import MCP_CONFIG_PATH, MCP_PREBAKED_DIR, MCP_PREBAKED_MANIFEST
+
+logger = logging.getLogger(__name__)
+
+# Package name of a requirement such as "awslabs.cdk-mcp-server==1.0.0"
+PACKAGE_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*")
+
+
+def server_fingerprint(server: dict[str, Any]) -> str:
+    """Fingerprint of the parts of a server entry that decide what is installed"""
+    spec = {"command": server.get("command"), "args": server.get("args", [])}
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+def parse_uvx_args(args: list[str]) -> tuple[str, str, list[str]] | None:
+    """Split uvx arguments into the requirement, the executable and the server arguments
+
+    Supports `uvx <package>[@version] [args]` and `uvx --from <package> <executable> [args]`.
+    Returns None for other uvx options, which are left to uvx at runtime.
+    """
+    if not args:
+        return None
+    if args[0] == "--from":
+        if len(args) < 3:
+            return None
+        return to_requirement(args[1]), args[2], args[3:]
+    if args[0].startswith("-"):
+        return None
+    requirement = to_requirement(args[0])
+    return requirement, get_package_name(requirement), args[1:]
+
+
+def to_requirement(spec: str) -> str:
+    """Convert a uvx package spec (name@latest, name@1.2.3 or a requirement) to a pip requirement"""
+    if "@" in spec:
+        name, version = spec.split("@", 1)
+        return name if version == "latest" else f"{name}=={version}"
+    return spec
+
+
+def get_package_name(requirement: str) -> str:
+    """Package name of a requirement"""
+    match = PACKAGE_NAME_PATTERN.match(requirement)
+    return match.group(0) if match else requirement
+
+
+def load_prebaked_manifest(path: str = MCP_PREBAKED_MANIFEST) -> dict[str, dict[str, Any]]:
+    """Load the manifest of prebaked servers, or an empty one if there is none"""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f).get("servers", {})
+    except Exception as e:
+        logger.warning(f"Error loading prebaked MCP manifest {path}: {e}")
+        return {}
+
+
+def resolve_server_command(server_name: str, server: dict[str, Any], manifest: dict[str, dict[str, Any]]) -> tuple[str, list[str], str]:
+    """Get the command, arguments and mode ("prebaked" or "uvx") to start a server with"""
+    entry = manifest.get(server_name)
+    if entry is not None and entry.get("fingerprint") == server_fingerprint(server) and os.access(entry["command"], os.X_OK):
+        return entry["command"], entry["args"], "prebaked"
+    return server["command"], server.get("args", []), "uvx" if server["command"] == "uvx" else "command"
+
+
+def prebake_server(server_name: str, server: dict[str, Any], target: str) -> dict[str, Any] | None:
+    """Install a uvx server into its own virtual environment under the target directory"""
+    if server.get("command") != "uvx":
+        return None
+    parsed = parse_uvx_args(server.get("args", []))
+    if parsed is None:
+        logger.warning(f"Not prebaking {server_name}: unsupported uvx arguments {server.get('args')}")
+        return None
+
+    requirement, executable, args = parsed
+    package = get_package_name(requirement)
+    venv_dir = os.path.join(target, "servers", re.sub(r"[^A-Za-z0-9._-]", "_", server_name))
+    python = os.path.join(venv_dir, "bin", "python")
+    shutil.rmtree(venv_dir, ignore_errors=True)
+
+    subprocess.run(["uv", "venv", "--quiet", venv_dir], check=True)
+    subprocess.run(["uv", "pip", "install", "--quiet", "--python", python, requirement], check=True)
+    command = os.path.join(venv_dir, "bin", executable)
+    if not os.access(command, os.X_OK):
+        raise FileNotFoundError(f"{executable} was not installed by {requirement}")
+
+    # Record the version that was actually resolved, e.g. for @latest
+    version = subprocess.run([python, "-c", f"import importlib.metadata; print(importlib.metadata.version({package!r}))"], check=True, capture_output=True, text=True).stdout.strip()
+    return {
+        "fingerprint": server_fingerprint(server),
+        "package": package,
+        "requirement": requirement,
+        "version": version,
+        "command": command,
+        "args": args,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", default=MCP_CONFIG_PATH)
+    parser.add_argument("--target", default=MCP_PREBAKED_DIR)
+    parser.add_argument("--strict", action="store_true", help="fail the build if a server cannot be prebaked")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        mcp_servers = json.load(f).get("mcpServers", {})
+
+    servers = {}
+    failed = []
+    for server_name, server in mcp_servers.items():
+        try:
+            entry = prebake_server(server_name, server, args.target)
+        except Exception as e:
+            logger.error(f"Error prebaking MCP server {server_name}; it will be started with uvx: {e}")
+            failed.append(server_name)
+            continue
+        if entry is not None:
+            servers[server_name] = entry
+            logger.info(f"Prebaked MCP server {server_name}: {entry['package']} {entry['version']}")
+
+    os.makedirs(args.target, exist_ok=True)
+    with open(os.path.join(args.target, "manifest.json"), "w") as f:
+        json.dump({"servers": servers}, f, indent=2)
+
+    if failed and args.strict:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
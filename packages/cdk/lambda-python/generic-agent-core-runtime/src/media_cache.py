@@ -0,0 +1,68 @@
+"""Content-addressed cache of decoded media for the agent core runtime."""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from .config import MEDIA_CACHE_MAX_BYTES, MEDIA_CACHE_MAX_ITEMS
+from .metrics import metrics
+
+
+class MediaCache:
+    """LRU cache of decoded media bytes keyed by the hash of their base64 form.
+
+    The frontend resends the whole conversation on every turn, so the same
+    images and documents arrive again and again. Looking them up by hash
+    skips decoding them and lets every request share one buffer per
+    attachment. The total size of cached buffers is capped at max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = MEDIA_CACHE_MAX_BYTES, max_items: int = MEDIA_CACHE_MAX_ITEMS):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.current_bytes = 0
+        self._entries: OrderedDict[bytes, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache can hold any entry"""
+        return self.max_bytes > 0 and self.max_items > 0
+
+    @staticmethod
+    def key(encoded: bytes | memoryview) -> bytes:
+        """Compute the cache key of a base64 encoded value"""
+        return hashlib.sha256(encoded).digest()
+
+    def get(self, key: bytes) -> bytes | None:
+        """Get decoded media and mark it as recently used"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+        metrics.increment("media_cache_hits_total" if data is not None else "media_cache_misses_total")
+        return data
+
+    def put(self, key: bytes, data: bytes):
+        """Store decoded media, evicting the least recently used entries"""
+        if not self.enabled or len(data) > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+
+            self._entries[key] = data
+            self.current_bytes += len(data)
+            while self.current_bytes > self.max_bytes or len(self._entries) > self.max_items:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+                metrics.increment("media_cache_evictions_total")
+
+            metrics.set_gauge("media_cache_bytes", self.current_bytes)
+            metrics.set_gauge("media_cache_items", len(self._entries))
+
+
+# Shared media cache
+media_cache = MediaCache()
@@ -0,0 +1,101 @@
+"""In-process metrics for the agent core runtime."""
+
+import threading
+from collections import deque
+from typing import Any
+
+# Number of recent observations kept per histogram for percentile calculation
+HISTOGRAM_WINDOW = 1024
+
+
+def _metric_key(name: str, labels: dict[str, Any]) -> str:
+    """Build a metric key such as name{label="value"}"""
+    if not labels:
+        return name
+    label_str = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+    return f"{name}{{{label_str}}}"
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Return the p-th percentile (0-100) of the values using nearest rank"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Histogram:
+    """Keeps count, sum, min, max and a window of recent observations."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.recent = deque(maxlen=HISTOGRAM_WINDOW)
+
+    def observe(self, value: float):
+        """Record an observation"""
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.recent.append(value)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Summarize the histogram"""
+        recent = list(self.recent)
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min,
+            "max": self.max,
+            "p50": percentile(recent, 50),
+            "p90": percentile(recent, 90),
+            "p99": percentile(recent, 99),
+        }
+
+
+class Metrics:
+    """Thread-safe registry of counters, gauges and histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+        self._histograms: dict[str, Histogram] = {}
+
+    def increment(self, name: str, value: float = 1, **labels):
+        """Increment a counter"""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Set a gauge to the given value"""
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a histogram observation"""
+        key = _metric_key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return all metrics as a JSON serializable dict"""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "histograms": {k: v.snapshot() for k, v in self._histograms.items()},
+            }
+
+
+# Shared metrics registry
+metrics = Metrics()
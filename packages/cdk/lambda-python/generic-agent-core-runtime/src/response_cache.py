@@ -0,0 +1,207 @@
+"""Cache of recorded agent responses for the agent core runtime."""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from typing import Any
+
+from strands.tools.registry import ToolRegistry
+from strands.tools.tools import normalize_tool_spec as normalize_strands_tool_spec
+
+from .config import RESPONSE_CACHE_BACKEND, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_MAX_ITEMS, RESPONSE_CACHE_PATH, RESPONSE_CACHE_PURE_TOOLS, RESPONSE_CACHE_TTL_SECONDS
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Size of the chunks a cached stream is replayed in
+REPLAY_CHUNK_BYTES = 64 * 1024
+
+
+def compute_cache_key(**parts: Any) -> str | None:
+    """Compute the canonical hash of the parts that determine a response
+
+    Returns None if the parts contain media (bytes), which are never cached.
+    """
+
+    def reject(value: Any):
+        raise TypeError(f"Not cacheable: {type(value).__name__}")
+
+    try:
+        canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=reject)
+    except TypeError:
+        return None
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def normalize_tool_spec(tool_spec: dict[str, Any]) -> dict[str, Any]:
+    """Copy of a tool spec as the agent sends it to the model
+
+    The tool registry normalizes specs in place on the first run of an
+    agent, so the raw spec of a tool changes after its first use.
+    """
+    spec = normalize_strands_tool_spec(copy.deepcopy(tool_spec))
+    ToolRegistry().validate_tool_spec(spec)
+    return spec
+
+
+def get_tool_set_version(tools: list[Any]) -> str:
+    """Hash of the names and specs of the tools, which changes when any tool changes"""
+    specs = [normalize_tool_spec(t.tool_spec) if getattr(t, "tool_spec", None) else getattr(t, "__name__", "") for t in tools]
+    return hashlib.sha256(json.dumps(specs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def get_side_effect_tools(tool_names: set[str], pure_tools: set[str] = RESPONSE_CACHE_PURE_TOOLS) -> set[str]:
+    """Tools that may have side effects. Only tools configured as pure are considered safe."""
+    return tool_names - pure_tools
+
+
+def iter_replay_chunks(data: bytes, chunk_bytes: int = REPLAY_CHUNK_BYTES) -> Iterator[bytes]:
+    """Split a recorded NDJSON stream into chunks that end on line boundaries"""
+    start = 0
+    while start < len(data):
+        end = data.rfind(b"\n", start, start + chunk_bytes) + 1
+        if end <= start:
+            # A single line longer than the chunk size
+            end = data.find(b"\n", start + chunk_bytes) + 1 or len(data)
+        yield data[start:end]
+        start = end
+
+
+class MemoryResponseCache:
+    """In-memory LRU of recorded responses with a TTL per entry."""
+
+    def __init__(self, max_items: int = RESPONSE_CACHE_MAX_ITEMS, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        """Get a response that has not expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                self.current_bytes -= len(data)
+                return None
+            self._entries.move_to_end(key)
+            return data
+
+    def put(self, key: str, data: bytes, ttl_seconds: float):
+        """Store a response, evicting the least recently used entries"""
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous[1])
+            self._entries[key] = (time.time() + ttl_seconds, data)
+            self.current_bytes += len(data)
+            while self.current_bytes > self.max_bytes or len(self._entries) > self.max_items:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+
+class SQLiteResponseCache:
+    """Recorded responses stored in a SQLite database, shared by all workers of a host.
+
+    Expired entries are ignored on read and deleted when new entries are
+    written. The total size is capped at max_bytes by deleting the entries
+    that expire first.
+    """
+
+    def __init__(self, path: str = RESPONSE_CACHE_PATH, max_bytes: int = RESPONSE_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, expires_at REAL NOT NULL, data BLOB NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_expires_at ON responses (expires_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+        return connection
+
+    def get(self, key: str) -> bytes | None:
+        """Get a response that has not expired"""
+        row = self._connect().execute("SELECT data FROM responses WHERE key = ? AND expires_at >= ?", (key, time.time())).fetchone()
+        return bytes(row[0]) if row else None
+
+    def put(self, key: str, data: bytes, ttl_seconds: float):
+        """Store a response and drop expired or excess entries"""
+        if len(data) > self.max_bytes:
+            return
+        connection = self._connect()
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO responses (key, expires_at, data) VALUES (?, ?, ?)", (key, time.time() + ttl_seconds, data))
+            connection.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+            total = connection.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM responses").fetchone()[0]
+            while total > self.max_bytes:
+                row = connection.execute("SELECT key, LENGTH(data) FROM responses ORDER BY expires_at LIMIT 1").fetchone()
+                if row is None:
+                    break
+                connection.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+                total -= row[1]
+
+
+class ResponseCache:
+    """Records agent responses and replays them for identical requests.
+
+    Only complete, error-free runs that used no tool with possible side
+    effects are stored, so replaying a response never skips an upload or
+    code execution the user expects to happen.
+    """
+
+    def __init__(self, backend: str = RESPONSE_CACHE_BACKEND, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.backend_name = backend
+        self.ttl_seconds = ttl_seconds
+        if backend == "memory":
+            self.backend = MemoryResponseCache()
+        elif backend == "sqlite":
+            self.backend = SQLiteResponseCache()
+        else:
+            if backend != "none":
+                logger.warning(f"Unknown response cache backend {backend}. The response cache is disabled.")
+            self.backend = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether a backend is configured"""
+        return self.backend is not None
+
+    def get(self, key: str) -> bytes | None:
+        """Get the recorded response of a request"""
+        try:
+            data = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Failed to read the response cache: {e}")
+            data = None
+        metrics.increment("response_cache_hits_total" if data is not None else "response_cache_misses_total", backend=self.backend_name)
+        return data
+
+    def put(self, key: str, data: bytes, ttl_seconds: float | None = None):
+        """Record the response of a request (a TTL of 0 records nothing)"""
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl_seconds <= 0:
+            return
+        try:
+            self.backend.put(key, data, ttl_seconds)
+            metrics.increment("response_cache_stores_total", backend=self.backend_name)
+        except Exception as e:
+            logger.warning(f"Failed to write the response cache: {e}")
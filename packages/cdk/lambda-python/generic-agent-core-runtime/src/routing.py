@@ -0,0 +1,248 @@
+"""Latency and throttle aware routing of model calls for the agent core runtime."""
+
+import logging
+import threading
+import time
+from collections.abc import AsyncGenerator, Callable
+from typing import Any
+
+from botocore.exceptions import ClientError
+from strands.models.model import Model
+from strands.types.exceptions import ModelThrottledException
+
+from .config import ROUTING_EWMA_ALPHA, ROUTING_LATENCY_TOLERANCE, ROUTING_THROTTLE_COOLDOWN_SECONDS, ROUTING_THROTTLE_HALF_LIFE_SECONDS, ROUTING_THROTTLE_PENALTY
+from .context import get_request_context
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Error codes of Bedrock (also as event stream errors) after which another target is tried
+RETRYABLE_ERROR_CODES = {"ThrottlingException", "throttlingException", "ServiceUnavailableException", "serviceUnavailableException", "ModelNotReadyException"}
+
+# Events after which the answer has started and the call can no longer move to another target
+FIRST_TOKEN_EVENTS = ("contentBlockStart", "contentBlockDelta")
+
+ModelTarget = tuple[str, str]
+
+
+def is_throttle_error(error: Exception) -> bool:
+    """Whether a model call failed because the target is throttling or unavailable"""
+    if isinstance(error, ModelThrottledException):
+        return True
+    return isinstance(error, ClientError) and error.response.get("Error", {}).get("Code") in RETRYABLE_ERROR_CODES
+
+
+def set_served_target(target: ModelTarget):
+    """Record the target that serves the current model call of the request"""
+    context = get_request_context()
+    if context is not None:
+        context.model_target = target
+
+
+def get_served_target() -> ModelTarget | None:
+    """Get the target that served the last model call of the request, None if no call was routed"""
+    context = get_request_context()
+    return context.model_target if context is not None else None
+
+
+class TargetHealth:
+    """Rolling latency and throttle rate of a (model_id, region) target
+
+    The time to first token is an exponentially weighted moving average of
+    the calls, so recent calls count the most. The throttle rate is one as
+    well and also decays with time, so a target that is no longer called
+    recovers. A throttled target is put in a cooldown.
+    """
+
+    def __init__(self):
+        self.first_token_seconds: float | None = None
+        self.throttle_rate = 0.0
+        self.throttle_updated_at = time.monotonic()
+        self.cooldown_until = 0.0
+        self.calls = 0
+        self.throttles = 0
+
+    def get_throttle_rate(self, now: float) -> float:
+        """Throttle rate decayed to now"""
+        return self.throttle_rate * 0.5 ** ((now - self.throttle_updated_at) / ROUTING_THROTTLE_HALF_LIFE_SECONDS)
+
+    def update_throttle_rate(self, now: float, throttled: bool, alpha: float):
+        """Add the outcome of a call to the throttle rate"""
+        rate = self.get_throttle_rate(now)
+        self.throttle_rate = rate + alpha * (float(throttled) - rate)
+        self.throttle_updated_at = now
+
+    def score(self, now: float, default_seconds: float) -> tuple[bool, float]:
+        """Sort key of the target: targets in cooldown last, then by penalized latency
+
+        Targets without a measured latency are given default_seconds.
+        """
+        latency = self.first_token_seconds if self.first_token_seconds is not None else default_seconds
+        return self.cooldown_until > now, latency * (1 + ROUTING_THROTTLE_PENALTY * self.get_throttle_rate(now))
+
+
+class ModelRouter:
+    """Routes model calls over equivalent (model_id, region) targets.
+
+    Each call goes to the healthiest target: the one with the lowest time
+    to first token, penalized by its recent throttle rate, skipping targets
+    in a cooldown after a throttle. Targets within latency_tolerance of the
+    healthiest are taken in the configured order, and a target that was
+    never measured is taken to be as fast as the fastest one, so traffic
+    stays on the first target until there is a reason to move and does
+    not flap between targets of similar latency. The health of every
+    target is shared by all requests.
+    """
+
+    def __init__(self, ewma_alpha: float = ROUTING_EWMA_ALPHA, cooldown_seconds: float = ROUTING_THROTTLE_COOLDOWN_SECONDS, latency_tolerance: float = ROUTING_LATENCY_TOLERANCE):
+        self.ewma_alpha = ewma_alpha
+        self.cooldown_seconds = cooldown_seconds
+        self.latency_tolerance = latency_tolerance
+        self._health: dict[ModelTarget, TargetHealth] = {}
+        self._models: dict[tuple[ModelTarget, ...], RoutedModel] = {}
+        self._lock = threading.Lock()
+
+    def _get_health(self, target: ModelTarget) -> TargetHealth:
+        health = self._health.get(target)
+        if health is None:
+            health = self._health[target] = TargetHealth()
+        return health
+
+    def rank(self, targets: list[ModelTarget]) -> list[ModelTarget]:
+        """Order the targets from the healthiest to the least healthy"""
+        now = time.monotonic()
+        with self._lock:
+            healths = [self._get_health(target) for target in targets]
+            default_seconds = min((health.first_token_seconds for health in healths if health.first_token_seconds is not None), default=0.0)
+            scores = {target: health.score(now, default_seconds) for target, health in zip(targets, healths, strict=True)}
+        ranked = sorted(targets, key=lambda target: (*scores[target], targets.index(target)))
+        in_cooldown, best_seconds = scores[ranked[0]]
+        preferred = next(target for target in targets if scores[target] <= (in_cooldown, best_seconds * (1 + self.latency_tolerance)))
+        return [preferred, *(target for target in ranked if target != preferred)]
+
+    def record_success(self, target: ModelTarget, first_token_seconds: float):
+        """Record a call that reached its first token"""
+        with self._lock:
+            health = self._get_health(target)
+            health.calls += 1
+            if health.first_token_seconds is None:
+                health.first_token_seconds = first_token_seconds
+            else:
+                health.first_token_seconds += self.ewma_alpha * (first_token_seconds - health.first_token_seconds)
+            health.update_throttle_rate(time.monotonic(), False, self.ewma_alpha)
+        metrics.observe("model_route_first_token_seconds", first_token_seconds, model_id=target[0], region=target[1])
+
+    def record_throttle(self, target: ModelTarget):
+        """Record a throttled call and put the target in a cooldown"""
+        now = time.monotonic()
+        with self._lock:
+            health = self._get_health(target)
+            health.calls += 1
+            health.throttles += 1
+            health.update_throttle_rate(now, True, self.ewma_alpha)
+            health.cooldown_until = now + self.cooldown_seconds
+        metrics.increment("model_route_throttles_total", model_id=target[0], region=target[1])
+
+    def get_model(self, targets: list[ModelTarget], model_factory: Callable[[str, str], Model]) -> Model:
+        """Get the model of a list of equivalent targets, reused across requests
+
+        A single target is returned as its plain model.
+        """
+        if len(targets) == 1:
+            return model_factory(*targets[0])
+        key = tuple(targets)
+        with self._lock:
+            model = self._models.get(key)
+        if model is None:
+            model = RoutedModel(self, {target: model_factory(*target) for target in targets})
+            with self._lock:
+                model = self._models.setdefault(key, model)
+        return model
+
+    def get_status(self) -> dict[str, Any]:
+        """Get the health of every target for the metrics endpoint"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                f"{model_id}@{region}": {
+                    "first_token_seconds": health.first_token_seconds,
+                    "throttle_rate": health.get_throttle_rate(now),
+                    "cooldown_seconds": max(health.cooldown_until - now, 0),
+                    "calls": health.calls,
+                    "throttles": health.throttles,
+                }
+                for (model_id, region), health in self._health.items()
+            }
+
+
+class RoutedModel(Model):
+    """A model that sends every call to the healthiest of equivalent targets
+
+    Events are held back until the first token, so a call throttled
+    before that moves to the next target without the agent noticing. Once
+    the answer has started, errors are raised as usual, and when every
+    target is throttled the last throttle is raised, so the agent's own
+    retries still apply. The target that serves a call is recorded on the
+    request context before its first event, so that metrics are labelled
+    with it (see get_served_target).
+    """
+
+    def __init__(self, router: ModelRouter, models: dict[ModelTarget, Model]):
+        self.router = router
+        self.models = models
+        self.targets = list(models)
+
+    def update_config(self, **model_config: Any):
+        for model in self.models.values():
+            model.update_config(**model_config)
+
+    def get_config(self) -> Any:
+        return self.models[self.targets[0]].get_config()
+
+    async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs):
+        target = self.router.rank(self.targets)[0]
+        set_served_target(target)
+        model = self.models[target]
+        async for event in model.structured_output(output_model, prompt, system_prompt=system_prompt, **kwargs):
+            yield event
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs) -> AsyncGenerator[Any]:
+        ranked = self.router.rank(self.targets)
+        last_error: Exception | None = None
+        for attempt, target in enumerate(ranked):
+            if attempt:
+                logger.warning(f"Failing over from {ranked[attempt - 1]} to {target}: {last_error}")
+                metrics.increment("model_route_failovers_total", model_id=target[0], region=target[1])
+            start_time = time.monotonic()
+            held: list[Any] | None = []
+            try:
+                async for event in self.models[target].stream(messages, tool_specs, system_prompt, **kwargs):
+                    if held is None:
+                        yield event
+                        continue
+                    held.append(event)
+                    if any(key in event for key in FIRST_TOKEN_EVENTS):
+                        self.router.record_success(target, time.monotonic() - start_time)
+                        set_served_target(target)
+                        for held_event in held:
+                            yield held_event
+                        held = None
+                if held is not None:
+                    # An answer without any content block
+                    self.router.record_success(target, time.monotonic() - start_time)
+                    set_served_target(target)
+                    for held_event in held:
+                        yield held_event
+                return
+            except Exception as e:
+                if not is_throttle_error(e):
+                    raise
+                self.router.record_throttle(target)
+                if held is None:
+                    raise
+                last_error = e
+
+        metrics.increment("model_route_exhausted_total", model_id=self.targets[0][0])
+        if isinstance(last_error, ModelThrottledException):
+            raise last_error
+        raise ModelThrottledException(str(last_error)) from last_error
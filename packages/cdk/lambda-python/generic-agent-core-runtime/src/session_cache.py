@@ -0,0 +1,177 @@
+"""Warm per-session agents for the agent core runtime."""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from strands import Agent as StrandsAgent
+from strands.telemetry.metrics import EventLoopMetrics
+
+from .config import SESSION_CACHE_MAX_BYTES, SESSION_CACHE_MAX_SESSIONS, SESSION_CACHE_TTL_SECONDS
+from .metrics import metrics
+from .tool_results import ToolResultLimitHook
+from .tracing import Phase, ToolTracingHook, payload_size
+
+logger = logging.getLogger(__name__)
+
+
+def _hash_media(value: Any) -> str:
+    if isinstance(value, bytes | bytearray | memoryview):
+        return hashlib.sha256(value).hexdigest()
+    raise TypeError(f"Not serializable: {type(value).__name__}")
+
+
+def fingerprint_message(message: dict[str, Any]) -> str:
+    """Hash of a client message, with media represented by the hash of their bytes"""
+    canonical = json.dumps(message, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_hash_media)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def fingerprint_messages(messages: list[dict[str, Any]]) -> list[str]:
+    """Fingerprints of the messages of a client history"""
+    return [fingerprint_message(message) for message in messages]
+
+
+def fingerprint_text(content: str | list[dict[str, Any]]) -> str:
+    """Hash of the text of a prompt or message content
+
+    The client records a prompt as a message of its own, which may not
+    repeat the attachments of the prompt, so only the text is compared.
+    """
+    text = content if isinstance(content, str) else "".join(block["text"] for block in content if isinstance(block, dict) and isinstance(block.get("text"), str))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class SessionAgent:
+    """A live agent of a session and the client history it holds
+
+    The hooks are kept so that each turn can point them at its own
+    request phase and workspace.
+    """
+
+    def __init__(self, agent: StrandsAgent, signature: str, tracing_hook: ToolTracingHook, result_hook: ToolResultLimitHook):
+        self.agent = agent
+        self.signature = signature
+        self.tracing_hook = tracing_hook
+        self.result_hook = result_hook
+        self.history: list[str] = []
+        self.prompt_fingerprint = ""
+        self.size_bytes = 0
+        self.expires_at = 0.0
+
+    def follows(self, history: list[str], messages: list[dict[str, Any]]) -> bool:
+        """Whether a client history is the history of the agent plus its last turn
+
+        The client sends back the previous history, the previous prompt and
+        its own record of the answer, which is taken as is: the agent holds
+        the full answer including its tool calls.
+        """
+        n = len(self.history)
+        return len(history) == n + 2 and history[:n] == self.history and messages[n].get("role") == "user" and fingerprint_text(messages[n].get("content", [])) == self.prompt_fingerprint and messages[n + 1].get("role") == "assistant"
+
+    def prepare(self, system_prompt: str, workspace_dir: str, request_phase: Phase):
+        """Bind the agent to a new request"""
+        self.agent.system_prompt = system_prompt
+        # Per-run metrics and traces of the agent would otherwise grow with every turn
+        self.agent.event_loop_metrics = EventLoopMetrics()
+        self.tracing_hook.parent = request_phase
+        self.result_hook.workspace_dir = workspace_dir
+
+
+class SessionAgentCache:
+    """LRU cache of live agents keyed by the AgentCore session id.
+
+    AgentCore routes every turn of a session to the same container, while
+    the client sends the whole conversation again on every turn. When the
+    conversation continues the one a cached agent holds, the agent is
+    reused and only the new prompt is run, which skips building the agent
+    and converting and compacting the history again. Entries expire after
+    ttl_seconds and the total size of the cached conversations is capped
+    at max_bytes.
+
+    An agent is taken out of the cache while it runs, so concurrent
+    requests of one session never share it; it is put back only after a
+    complete run.
+    """
+
+    def __init__(self, max_sessions: int = SESSION_CACHE_MAX_SESSIONS, max_bytes: int = SESSION_CACHE_MAX_BYTES, ttl_seconds: float = SESSION_CACHE_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.current_bytes = 0
+        self._entries: OrderedDict[str, SessionAgent] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache can hold any session"""
+        return self.max_sessions > 0 and self.max_bytes > 0
+
+    def _remove(self, session_id: str, reason: str | None = None) -> SessionAgent | None:
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self.current_bytes -= entry.size_bytes
+            if reason:
+                metrics.increment("session_cache_evictions_total", reason=reason)
+        return entry
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        for session_id in [session_id for session_id, entry in self._entries.items() if entry.expires_at < now]:
+            self._remove(session_id, "expired")
+
+    def _update_gauges(self):
+        metrics.set_gauge("session_cache_sessions", len(self._entries))
+        metrics.set_gauge("session_cache_bytes", self.current_bytes)
+
+    def checkout(self, session_id: str, signature: str, history: list[str], messages: list[dict[str, Any]]) -> SessionAgent | None:
+        """Take the agent of a session out of the cache if the request continues its conversation"""
+        with self._lock:
+            self._purge_expired()
+            entry = self._remove(session_id)
+            self._update_gauges()
+
+        if entry is None:
+            reason = "missing"
+        elif entry.signature != signature:
+            reason = "changed"
+        elif not entry.follows(history, messages):
+            reason = "diverged"
+        else:
+            metrics.increment("session_cache_hits_total")
+            return entry
+
+        metrics.increment("session_cache_misses_total", reason=reason)
+        if entry is not None:
+            logger.info(f"Not reusing the agent of session {session_id}: {reason}")
+        return None
+
+    def checkin(self, session_id: str, entry: SessionAgent, history: list[str], prompt: str | list[dict[str, Any]]):
+        """Put the agent of a session back after a complete run"""
+        entry.history = history
+        entry.prompt_fingerprint = fingerprint_text(prompt)
+        entry.size_bytes = payload_size(entry.agent.messages)
+        entry.expires_at = time.monotonic() + self.ttl_seconds
+        if entry.size_bytes > self.max_bytes:
+            metrics.increment("session_cache_evictions_total", reason="too_large")
+            return
+
+        with self._lock:
+            self._remove(session_id)
+            self._entries[session_id] = entry
+            self.current_bytes += entry.size_bytes
+            self._purge_expired()
+            while self.current_bytes > self.max_bytes or len(self._entries) > self.max_sessions:
+                self._remove(next(iter(self._entries)), "lru")
+            self._update_gauges()
+
+    def get_status(self) -> dict[str, Any]:
+        """Get the cache status for the metrics endpoint"""
+        with self._lock:
+            self._purge_expired()
+            self._update_gauges()
+            return {"enabled": self.enabled, "sessions": len(self._entries), "bytes": self.current_bytes, "max_sessions": self.max_sessions, "max_bytes": self.max_bytes}
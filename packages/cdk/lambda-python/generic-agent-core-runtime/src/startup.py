@@ -0,0 +1,55 @@
+"""Import time reports for the startup of the agent core runtime."""
+
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Any
+
+RUNTIME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULE_NAME_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*")
+
+
+def parse_importtime(output: str, top: int = 20) -> dict[str, Any]:
+    """Summarize the stderr of `python -X importtime`
+
+    Returns the total import time, the slowest modules by cumulative time
+    and the self time aggregated per top-level package.
+    """
+    modules = []
+    packages: dict[str, int] = defaultdict(int)
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        modules.append({"module": name, "depth": depth, "self_seconds": int(self_us) / 1e6, "cumulative_seconds": int(cumulative_us) / 1e6})
+        packages[name.split(".")[0]] += int(self_us)
+
+    # Modules at the lowest depth were imported directly by the measured statement
+    total = sum(m["cumulative_seconds"] for m in modules if m["depth"] == min((m["depth"] for m in modules), default=0))
+    slowest = sorted(modules, key=lambda m: m["cumulative_seconds"], reverse=True)[:top]
+    return {
+        "total_seconds": total,
+        "modules": [{k: v for k, v in m.items() if k != "depth"} for m in slowest],
+        "packages": {name: us / 1e6 for name, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]},
+    }
+
+
+def measure_import_time(module: str = "app", top: int = 20, timeout: float = 60) -> dict[str, Any]:
+    """Import a module in a fresh interpreter and report its import time"""
+    if not MODULE_NAME_PATTERN.fullmatch(module):
+        raise ValueError(f"Invalid module name: {module}")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=RUNTIME_DIR,
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to import {module}: {result.stderr.strip().splitlines()[-1:]}")
+    return {"module": module, "python": sys.version.split()[0], **parse_importtime(result.stderr, top)}
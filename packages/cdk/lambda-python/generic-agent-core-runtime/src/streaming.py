@@ -0,0 +1,232 @@
+"""NDJSON stream encoding for the agent core runtime."""
+
+import asyncio
+import json
+import logging
+import time
+from collections.abc import AsyncGenerator, AsyncIterator, Callable
+from typing import Any
+
+from .config import STREAM_FLUSH_MAX_BYTES, STREAM_FLUSH_MAX_MS, STREAM_JSON_BACKEND
+
+logger = logging.getLogger(__name__)
+
+# Optional faster JSON backend
+try:
+    import orjson
+
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def _dumps_json(event: dict[str, Any]) -> bytes:
+    """Serialize an event with the standard library"""
+    return json.dumps(event, ensure_ascii=False).encode()
+
+
+def _dumps_orjson(event: dict[str, Any]) -> bytes:
+    """Serialize an event with orjson, falling back to json for unsupported types"""
+    try:
+        return orjson.dumps(event)
+    except TypeError:
+        return _dumps_json(event)
+
+
+def get_event_serializer(backend: str = STREAM_JSON_BACKEND):
+    """Get the event serializer for the backend ("auto", "json" or "orjson")"""
+    if backend == "orjson" and not ORJSON_AVAILABLE:
+        logger.warning("orjson is not installed. Falling back to json.")
+    if backend in ("auto", "orjson") and ORJSON_AVAILABLE:
+        return _dumps_orjson
+    return _dumps_json
+
+
+def is_coalescable(event: dict[str, Any]) -> bool:
+    """Whether an event is a content delta that can be packed with its neighbours"""
+    return "contentBlockDelta" in event.get("event", {})
+
+
+class NDJSONStreamEncoder:
+    """Packs streaming events into fewer, larger NDJSON writes.
+
+    Content deltas are buffered until max_bytes are buffered or the oldest
+    buffered delta is older than max_ms; the streaming generator flushes a
+    buffer that is due even when no further event arrives (see
+    iter_with_deadline and flush_deadline). Any other event (content block
+    start/stop, message stop, metadata, errors) flushes the buffer together
+    with itself, so tool and stop events are never delayed. The first delta
+    is always sent immediately to keep the time to first token unchanged.
+    """
+
+    # Output format, part of the response cache key
+    format = "raw"
+
+    def __init__(self, max_bytes: int = STREAM_FLUSH_MAX_BYTES, max_ms: float = STREAM_FLUSH_MAX_MS, backend: str = STREAM_JSON_BACKEND):
+        self.max_bytes = max_bytes
+        self.max_seconds = max_ms / 1000
+        self.dumps = get_event_serializer(backend)
+        self.events = 0
+        self.writes = 0
+        self._buffer = bytearray()
+        self._buffer_start = 0.0
+        self._first_delta_sent = False
+
+    def encode(self, event: dict[str, Any]) -> bytes | None:
+        """Add an event and return the bytes to write, if a flush is due"""
+        self.events += 1
+        if not self._buffer:
+            self._buffer_start = time.monotonic()
+        self._buffer += self.dumps(event)
+        self._buffer += b"\n"
+
+        if not is_coalescable(event) or not self._first_delta_sent:
+            self._first_delta_sent = self._first_delta_sent or is_coalescable(event)
+            return self.flush()
+        if len(self._buffer) >= self.max_bytes or time.monotonic() - self._buffer_start >= self.max_seconds:
+            return self.flush()
+        return None
+
+    def encode_agent_event(self, event: dict[str, Any]) -> bytes | None:
+        """Add an event of Agent.stream_async (only raw model stream events are sent)"""
+        return self.encode(event) if "event" in event else None
+
+    def encode_error(self, message: str) -> bytes:
+        """Return the buffered events together with an error event"""
+        # Error events are never buffered, so this always flushes
+        return self.encode({"event": {"internalServerException": {"message": message}}})
+
+    def flush_deadline(self) -> float | None:
+        """Monotonic time by which the buffered deltas must be flushed, if any are buffered"""
+        return self._buffer_start + self.max_seconds if self._buffer else None
+
+    def flush(self) -> bytes | None:
+        """Return all buffered bytes, if any"""
+        if not self._buffer:
+            return None
+        chunk = bytes(self._buffer)
+        self._buffer.clear()
+        self.writes += 1
+        return chunk
+
+
+def format_tool_result_preview(content: list[dict[str, Any]], max_chars: int) -> str:
+    """Join the text of a tool result, cut to max_chars (with "...") without joining the rest"""
+    texts = []
+    length = 0
+    for block in content:
+        if "text" in block:
+            texts.append(block["text"])
+            length += len(block["text"])
+            if length > max_chars:
+                texts[-1] = texts[-1][: max_chars - (length - len(block["text"]))]
+                return "".join(texts) + "..."
+    return "".join(texts)
+
+
+class TextTraceStreamEncoder:
+    """Encodes agent messages in the {"text", "trace"} NDJSON format of mcp-api /streaming.
+
+    Assistant text is sent as text. Tool uses and the start of tool results
+    are sent as code blocks in trace. Only complete messages are encoded, so
+    nothing is buffered. Lines are serialized with the standard library to
+    keep the output byte-identical to the original mcp-api.
+    """
+
+    format = "text-trace"
+
+    # Characters of a tool result shown in the trace
+    TOOL_RESULT_PREVIEW_CHARS = 200
+
+    def __init__(self):
+        self.events = 0
+        self.writes = 0
+
+    def _line(self, text: str, trace: str | None) -> bytes:
+        return (json.dumps({"text": text, "trace": trace}, ensure_ascii=False) + "\n").encode()
+
+    def encode_agent_event(self, event: dict[str, Any]) -> bytes | None:
+        """Encode a complete message of Agent.stream_async"""
+        message = event.get("message")
+        if message is None:
+            return None
+        self.events += 1
+
+        if message["role"] == "assistant":
+            text = next((c["text"] for c in message["content"] if "text" in c), None)
+            tool_use = next((c["toolUse"] for c in message["content"] if "toolUse" in c), None)
+            tool_trace = f"```\n{tool_use['name']}: {tool_use['input']}\n```\n" if tool_use is not None else None
+            if text is not None and tool_trace is not None:
+                lines = [self._line("", f"{text}\n"), self._line("", tool_trace)]
+            elif text is not None:
+                lines = [self._line(text, None)]
+            elif tool_trace is not None:
+                lines = [self._line("", tool_trace)]
+            else:
+                return None
+        else:
+            content = [b for c in message["content"] if "toolResult" in c for b in c["toolResult"]["content"]]
+            lines = [self._line("", f"```\n{format_tool_result_preview(content, self.TOOL_RESULT_PREVIEW_CHARS)}\n```\n")]
+
+        self.writes += 1
+        return b"".join(lines)
+
+    def encode_error(self, message: str) -> bytes:
+        """Encode an error as text, so it is shown in the chat"""
+        self.writes += 1
+        return self._line(message, None)
+
+    def flush_deadline(self) -> float | None:
+        return None
+
+    def flush(self) -> bytes | None:
+        return None
+
+
+class _StreamFailure:
+    """An exception raised by the iterator of iter_with_deadline"""
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+_STREAM_END = object()
+
+
+async def iter_with_deadline(events: AsyncIterator[Any], get_deadline: Callable[[], float | None]) -> AsyncGenerator[Any]:
+    """Iterate over events, yielding None whenever the deadline passes before the next event
+
+    The events are read by a task of their own, so the iterator always
+    runs in the same task (and context) while the caller waits for each
+    event with a timeout. get_deadline returns a monotonic time, or None
+    to wait without a timeout.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+    async def produce():
+        try:
+            async for event in events:
+                await queue.put(event)
+        except Exception as e:
+            await queue.put(_StreamFailure(e))
+        else:
+            await queue.put(_STREAM_END)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            deadline = get_deadline()
+            try:
+                event = await asyncio.wait_for(queue.get(), None if deadline is None else max(deadline - time.monotonic(), 0))
+            except TimeoutError:
+                yield None
+                continue
+            if event is _STREAM_END:
+                return
+            if isinstance(event, _StreamFailure):
+                raise event.error
+            yield event
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
@@ -0,0 +1,165 @@
+"""Bounded, time-limited execution of tool calls for the agent core runtime."""
+
+import asyncio
+import functools
+import inspect
+import logging
+import time
+from typing import Any
+
+from strands.tools.decorator import DecoratedFunctionTool
+from strands.types.tools import AgentTool
+
+from .config import TOOL_LATENCY_EVENTS, TOOL_TIMEOUT_SECONDS, TOOL_TIMEOUTS
+from .context import get_request_context
+from .executors import run_blocking
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class AbandonedToolRuns:
+    """Runs of synchronous tools that timed out but still hold a thread of the tools pool
+
+    A thread cannot be stopped, so a timed out call of a synchronous tool
+    keeps running until the function returns. Such runs are counted in the
+    tool_abandoned_runs gauge until they finish, which shows when hung
+    tools are using up the pool. Everything runs on the event loop.
+    """
+
+    def __init__(self):
+        self.running = 0
+
+    def add(self, tool_name: str, task: asyncio.Future):
+        """Track the run of a tool whose caller gave up on it"""
+        abandoned_at = time.monotonic()
+        self.running += 1
+        metrics.increment("tool_abandoned_runs_total", tool=tool_name)
+        metrics.set_gauge("tool_abandoned_runs", self.running)
+
+        def finished(task: asyncio.Future):
+            self.running -= 1
+            metrics.set_gauge("tool_abandoned_runs", self.running)
+            # Retrieve the error of the run, which nobody awaits anymore
+            error = None if task.cancelled() else task.exception()
+            logger.info(f"Abandoned run of {tool_name} finished {time.monotonic() - abandoned_at:.1f}s after its timeout" + (f": {error}" if error else ""))
+
+        task.add_done_callback(finished)
+
+
+# Shared tracker of abandoned tool runs
+abandoned_tool_runs = AbandonedToolRuns()
+
+
+def offload_sync_tool(agent_tool: Any) -> Any:
+    """Run a tool function that blocks in the tools thread pool
+
+    Strands runs synchronous tool functions with asyncio.to_thread, in the
+    default executor shared with the model streams. The returned tool keeps
+    the name, spec and input validation of the original. A run whose call
+    is cancelled (e.g. by its timeout) is tracked by abandoned_tool_runs.
+    """
+    func = getattr(agent_tool, "_tool_func", None)
+    if not isinstance(agent_tool, DecoratedFunctionTool) or func is None or inspect.iscoroutinefunction(func):
+        return agent_tool
+
+    @functools.wraps(func)
+    async def run(**kwargs: Any) -> Any:
+        task = asyncio.ensure_future(run_blocking("tools", func, **kwargs))
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done():
+                abandoned_tool_runs.add(agent_tool.tool_name, task)
+            raise
+
+    return DecoratedFunctionTool(agent_tool.tool_name, agent_tool.tool_spec, run, agent_tool._metadata)
+
+
+def get_tool_timeout(tool_name: str) -> float:
+    """Get the timeout of a tool (0 for no timeout)"""
+    return TOOL_TIMEOUTS.get(tool_name, TOOL_TIMEOUT_SECONDS)
+
+
+class ManagedTool(AgentTool):
+    """A tool whose calls are bounded per request, time limited and timed.
+
+    Strands starts all tool calls of a model turn at once. A call first
+    waits for a slot of the request (TOOL_MAX_CONCURRENCY), then runs with
+    the timeout of its tool; a call that times out is cancelled and
+    answered with an error result, so a hung tool cannot stall the
+    invocation. The thread of a synchronous tool cannot be stopped, so it
+    keeps running after the timeout (see AbandonedToolRuns). After each
+    call a toolLatency event with the time spent
+    waiting and running is streamed before the result.
+
+    The events of the wrapped tool are collected inside the timeout and
+    yielded afterwards, so the timeout never fires while the agent is
+    consuming an event. Tools only yield their result, so nothing is
+    delayed.
+    """
+
+    def __init__(self, agent_tool: Any):
+        super().__init__()
+        self.wrapped = agent_tool
+        self.tool = offload_sync_tool(agent_tool)
+
+    @property
+    def tool_name(self) -> str:
+        return self.tool.tool_name
+
+    @property
+    def tool_spec(self) -> Any:
+        return self.tool.tool_spec
+
+    @property
+    def tool_type(self) -> str:
+        return self.tool.tool_type
+
+    def _timeout_result(self, tool_use_id: str, timeout: float) -> dict[str, Any]:
+        return {"toolUseId": tool_use_id, "status": "error", "content": [{"text": f"Tool execution failed: {self.tool_name} did not finish within {timeout}s"}]}
+
+    async def stream(self, tool_use: Any, invocation_state: dict[str, Any], **kwargs: Any):
+        context = get_request_context()
+        semaphore = context.tool_semaphore if context else None
+        timeout = get_tool_timeout(self.tool_name)
+        submitted = time.monotonic()
+
+        if semaphore is not None:
+            await semaphore.acquire()
+        started = time.monotonic()
+        timed_out = False
+        try:
+            events = []
+            async with asyncio.timeout(timeout or None):
+                async for event in self.tool.stream(tool_use, invocation_state, **kwargs):
+                    events.append(event)
+        except TimeoutError:
+            timed_out = True
+            logger.warning(f"Tool {self.tool_name} timed out after {timeout}s")
+            metrics.increment("tool_call_timeouts_total", tool=self.tool_name)
+            events = [self._timeout_result(tool_use["toolUseId"], timeout)]
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+        finished = time.monotonic()
+        metrics.observe("tool_queue_seconds", started - submitted, tool=self.tool_name)
+        if TOOL_LATENCY_EVENTS:
+            result = events[-1] if events and isinstance(events[-1], dict) else {}
+            yield {
+                "callback": {
+                    "event": {
+                        "toolLatency": {
+                            "toolUseId": tool_use["toolUseId"],
+                            "name": self.tool_name,
+                            "status": result.get("status"),
+                            "timedOut": timed_out,
+                            "queueMs": round((started - submitted) * 1000),
+                            "latencyMs": round((finished - started) * 1000),
+                        }
+                    }
+                }
+            }
+        for event in events:
+            yield event
@@ -0,0 +1,182 @@
+"""Tool result size policy for the agent core runtime."""
+
+import logging
+import os
+import re
+import threading
+from concurrent.futures import Future
+from typing import Any
+
+from strands.experimental.hooks import AfterToolInvocationEvent
+from strands.hooks import HookRegistry
+
+from .config import TOOL_RESULT_LIMITS, TOOL_RESULT_MAX_BYTES, TOOL_RESULT_MAX_TOKENS, TOOL_RESULT_SPILL
+from .executors import executors
+from .history import estimate_text_tokens
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Directory in the workspace holding the full text of cut results
+TOOL_RESULTS_DIR = ".tool-results"
+
+# Name of the built-in tool that reads stored results (its own results are never stored)
+READ_TOOL_RESULT_NAME = "read_tool_result"
+
+HANDLE_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+
+
+def get_tool_result_path(workspace_dir: str, handle: str) -> str:
+    """Path of the stored full text of a result"""
+    if not HANDLE_PATTERN.fullmatch(handle):
+        raise ValueError(f"Invalid tool result handle: {handle}")
+    return os.path.join(workspace_dir, TOOL_RESULTS_DIR, f"{handle}.txt")
+
+
+def store_result(workspace_dir: str, path: str, text: str) -> None:
+    """Write the full text of a cut result"""
+    try:
+        # The workspace of a request that has ended may already be deleted; it is not created again
+        if not os.path.isdir(workspace_dir):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    except Exception as e:
+        logger.warning(f"Error storing tool result {path}: {e}")
+
+
+def cut_text(text: str, max_bytes: int, max_tokens: int) -> str:
+    """Cut a text to at most max_bytes of UTF-8 and about max_tokens tokens
+
+    The cut is moved back to the last line break if one is close, so the
+    excerpt does not end in the middle of a line.
+    """
+    excerpt = text
+    if max_bytes and len(excerpt) > max_bytes // 4:
+        encoded = excerpt.encode()
+        if len(encoded) > max_bytes:
+            excerpt = encoded[:max_bytes].decode(errors="ignore")
+    if max_tokens:
+        tokens = estimate_text_tokens(excerpt)
+        if tokens > max_tokens:
+            excerpt = excerpt[: int(len(excerpt) * max_tokens / tokens)]
+    if len(excerpt) < len(text):
+        line_end = excerpt.rfind("\n")
+        if line_end > len(excerpt) * 0.8:
+            excerpt = excerpt[: line_end + 1]
+    return excerpt
+
+
+class ToolResultPolicy:
+    """Per-tool byte and token limits of the text results passed to the model"""
+
+    def __init__(self, max_bytes: int = TOOL_RESULT_MAX_BYTES, max_tokens: int = TOOL_RESULT_MAX_TOKENS, limits: dict[str, dict[str, int]] | None = None, spill: bool = TOOL_RESULT_SPILL):
+        self.max_bytes = max_bytes
+        self.max_tokens = max_tokens
+        self.limits = TOOL_RESULT_LIMITS if limits is None else limits
+        self.spill = spill
+        # Writes of full texts that have not finished yet, by path
+        self._pending_stores: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_bytes or self.max_tokens or self.limits)
+
+    def get_limits(self, tool_name: str) -> tuple[int, int]:
+        """Get the byte and token limits of a tool"""
+        limits = self.limits.get(tool_name, {})
+        return limits.get("max_bytes", self.max_bytes), limits.get("max_tokens", self.max_tokens)
+
+    def _store(self, workspace_dir: str, path: str, text: str) -> None:
+        """Write a full text in the workspace thread pool, off the event loop"""
+        future = executors.get("workspace").submit(store_result, workspace_dir, path, text)
+        with self._lock:
+            self._pending_stores[path] = future
+        # Registered after the future is recorded, so that it is always removed again
+        future.add_done_callback(lambda done: self._forget_store(path, done))
+
+    def _forget_store(self, path: str, future: Future) -> None:
+        with self._lock:
+            if self._pending_stores.get(path) is future:
+                del self._pending_stores[path]
+
+    def get_pending_store(self, workspace_dir: str, handle: str) -> Future | None:
+        """Get the write of a stored result if it has not finished yet"""
+        with self._lock:
+            return self._pending_stores.get(get_tool_result_path(workspace_dir, handle))
+
+    def apply(self, tool_name: str, tool_use_id: str, result: dict[str, Any], workspace_dir: str | None) -> dict[str, Any]:
+        """Return the result with its text cut to the limits of the tool
+
+        The text blocks share the limits in order. With spilling enabled the
+        full text is written to the workspace and the model is given a
+        handle to read the rest with read_tool_result. The write runs in the
+        workspace thread pool, since this is called on the event loop;
+        read_tool_result waits for it.
+        """
+        max_bytes, max_tokens = self.get_limits(tool_name)
+        content = result.get("content") or []
+        texts = [block["text"] for block in content if isinstance(block.get("text"), str)]
+        if not texts or (not max_bytes and not max_tokens):
+            return result
+
+        # Most results are far below the limits; check them without encoding
+        total_chars = sum(len(text) for text in texts)
+        if (not max_bytes or total_chars * 4 <= max_bytes) and (not max_tokens or total_chars <= max_tokens):
+            return result
+        full_text = "\n".join(texts)
+        full_bytes = len(full_text.encode())
+        if (not max_bytes or full_bytes <= max_bytes) and (not max_tokens or estimate_text_tokens(full_text) <= max_tokens):
+            return result
+
+        excerpt = cut_text(full_text, max_bytes, max_tokens)
+        omitted_bytes = full_bytes - len(excerpt.encode())
+        notice = f"\n[Result truncated: {omitted_bytes} of {full_bytes} bytes omitted.]"
+        if self.spill and workspace_dir and tool_name != READ_TOOL_RESULT_NAME:
+            try:
+                self._store(workspace_dir, get_tool_result_path(workspace_dir, tool_use_id), full_text)
+                notice = f"\n[Result truncated: {omitted_bytes} of {full_bytes} bytes omitted. Call {READ_TOOL_RESULT_NAME} with handle {tool_use_id!r} and offset {len(excerpt)} to read the rest.]"
+            except Exception as e:
+                logger.warning(f"Error storing the result of {tool_name}: {e}")
+
+        metrics.increment("tool_result_truncated_total", tool=tool_name)
+        metrics.observe("tool_result_omitted_bytes", omitted_bytes, tool=tool_name)
+        other_blocks = [block for block in content if not isinstance(block.get("text"), str)]
+        return {**result, "content": [{"text": excerpt + notice}, *other_blocks]}
+
+
+class ToolResultLimitHook:
+    """Agent hook applying the tool result policy before results are added to the conversation"""
+
+    def __init__(self, policy: ToolResultPolicy, workspace_dir: str | None = None):
+        self.policy = policy
+        self.workspace_dir = workspace_dir
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: Any):
+        if self.policy.enabled:
+            registry.add_callback(AfterToolInvocationEvent, self.after_tool)
+
+    def after_tool(self, event: AfterToolInvocationEvent):
+        if event.result:
+            event.result = self.policy.apply(event.tool_use["name"], event.tool_use["toolUseId"], event.result, self.workspace_dir)
+
+
+def read_stored_result(workspace_dir: str, handle: str, offset: int, max_bytes: int, max_tokens: int) -> str:
+    """Read the part of a stored result that starts at a character offset, within the limits"""
+    with open(get_tool_result_path(workspace_dir, handle), encoding="utf-8") as f:
+        text = f.read()
+    if offset < 0 or offset >= len(text):
+        raise ValueError(f"Offset {offset} is outside the result of {len(text)} characters")
+
+    # Leave room for the notice, so the part itself is not cut again by the policy
+    part = cut_text(text[offset:], max_bytes - 256 if max_bytes > 512 else max_bytes, max_tokens - 64 if max_tokens > 128 else max_tokens)
+    end = offset + len(part)
+    if end < len(text):
+        return f"{part}\n[Characters {offset}-{end} of {len(text)}. Call {READ_TOOL_RESULT_NAME} with handle {handle!r} and offset {end} to read more.]"
+    return f"{part}\n[End of result: characters {offset}-{end} of {len(text)}.]"
+
+
+# Policy shared by all requests
+tool_result_policy = ToolResultPolicy()
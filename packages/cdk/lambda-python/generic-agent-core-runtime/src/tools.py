@@ -1,130 +1,179 @@
 """Tool management for the agent core runtime."""
 
-import json
+import asyncio
 import logging
 import os
+import threading
+import weakref
 from typing import Any
 
-import boto3
-from mcp import StdioServerParameters, stdio_client
 from strands import tool
-from strands.tools.mcp import MCPClient
 
-from .config import WORKSPACE_DIR, get_aws_credentials, get_uv_environment
+from .config import CODE_INTERPRETER_ENABLED, UPLOAD_KEY_PREFIX, WORKSPACE_DIR, get_aws_credentials
+from .context import get_request_context
+from .executors import run_blocking
+from .mcp_pool import MCPServerPool
+from .response_cache import get_tool_set_version
+from .tool_execution import ManagedTool
+from .tool_results import READ_TOOL_RESULT_NAME, read_stored_result, tool_result_policy
+from .uploads import is_under_directory, limit_upload_paths, resolve_upload_paths, s3_uploader
 
-# Import strands-agents code interpreter tool
-try:
-    from strands_tools.code_interpreter import AgentCoreCodeInterpreter
+logger = logging.getLogger(__name__)
 
-    CODE_INTERPRETER_AVAILABLE = True
-except ImportError as e:
-    CODE_INTERPRETER_AVAILABLE = False
-    logger = logging.getLogger(__name__)
-    logger.warning(f"Strands code interpreter tool not available: {e}")
-    AgentCoreCodeInterpreter = None
 
-logger = logging.getLogger(__name__)
+def get_upload_target() -> tuple[str | None, str, str]:
+    """Get the bucket, region and S3 key prefix of the current request"""
+    # The tools are built once; session specific values come from the request context
+    context = get_request_context()
+    trace_id = context.trace_id if context else None
+    aws_creds = get_aws_credentials()
+    region = aws_creds.get("AWS_REGION", "us-east-1")
+    return os.environ.get("FILE_BUCKET"), region, f"{UPLOAD_KEY_PREFIX}/{trace_id}"
 
 
-class ToolManager:
-    """Manages tools including MCP tools and built-in tools."""
+def get_upload_workspace_dir() -> str:
+    """Get the workspace directory of the current request"""
+    context = get_request_context()
+    return context.workspace_dir if context else WORKSPACE_DIR
 
-    def __init__(self):
-        self.mcp_tools = None
-        self.session_id = None
-        self.trace_id = None
 
-    def set_session_info(self, session_id: str, trace_id: str):
-        """Set session and trace IDs for tool operations"""
-        self.session_id = session_id
-        self.trace_id = trace_id
+@tool
+async def upload_file_to_s3_and_retrieve_s3_url(filepath: str) -> str:
+    """Upload the file in the workspace directory and retrieve the s3 path
 
-    def load_mcp_tools(self) -> list[Any]:
-        """Load MCP tools from mcp.json"""
-        if self.mcp_tools is not None:
-            return self.mcp_tools
+    Args:
+        filepath: The path to the uploading file
+    """
+    workspace_dir = get_upload_workspace_dir()
+    bucket, region, prefix = get_upload_target()
 
-        try:
-            with open("mcp.json") as f:
-                mcp_json = json.loads(f.read())
-
-                if "mcpServers" not in mcp_json:
-                    logger.warning("mcpServers not defined in mcp.json")
-                    self.mcp_tools = []
-                    return self.mcp_tools
-
-                mcp_servers = mcp_json["mcpServers"]
-                mcp_clients = []
-                uv_env = get_uv_environment()
-
-                for server_name, server in mcp_servers.items():
-                    try:
-                        client = MCPClient(
-                            lambda server=server: stdio_client(
-                                StdioServerParameters(
-                                    command=server["command"],
-                                    args=server.get("args", []),
-                                    env={**uv_env, **server.get("env", {})},
-                                )
-                            )
-                        )
-                        client.start()
-                        mcp_clients.append(client)
-                    except Exception as e:
-                        logger.error(f"Error creating MCP client for {server_name}: {e}")
-
-                # Flatten the tools
-                self.mcp_tools = sum([c.list_tools_sync() for c in mcp_clients], [])
-                logger.info(f"Loaded {len(self.mcp_tools)} MCP tools")
-                return self.mcp_tools
-        except Exception as e:
-            logger.error(f"Error loading MCP tools: {e}")
-            self.mcp_tools = []
-            return self.mcp_tools
-
-    def get_upload_tool(self):
-        """Get the S3 upload tool with session context"""
-        trace_id = self.trace_id
-
-        @tool
-        def upload_file_to_s3_and_retrieve_s3_url(filepath: str) -> str:
-            """Upload the file at /tmp/ws/* and retrieve the s3 path
-
-            Args:
-                filepath: The path to the uploading file
-            """
-            bucket = os.environ.get("FILE_BUCKET")
-            if not bucket:
-                # For local testing, provide a fallback message
-                logger.warning("FILE_BUCKET environment variable not set. Using local file path for testing.")
-                return f"Local file path (S3 upload skipped): {filepath}"
-
-            aws_creds = get_aws_credentials()
-            region = aws_creds.get("AWS_REGION", "us-east-1")
-
-            if not filepath.startswith(WORKSPACE_DIR):
-                raise ValueError(f"{filepath} does not appear to be a file under the {WORKSPACE_DIR} directory. Files to be uploaded must exist under {WORKSPACE_DIR}.")
+    if not bucket:
+        # For local testing, provide a fallback message
+        logger.warning("FILE_BUCKET environment variable not set. Using local file path for testing.")
+        return f"Local file path (S3 upload skipped): {filepath}"
 
-            try:
-                filename = os.path.basename(filepath)
-                key = f"agentcore/{trace_id}/{filename}"
+    if not is_under_directory(filepath, workspace_dir):
+        raise ValueError(f"{filepath} does not appear to be a file under the {workspace_dir} directory. Files to be uploaded must exist under {workspace_dir}.")
 
-                s3 = boto3.client("s3", region_name=region)
-                s3.upload_file(filepath, bucket, key)
+    try:
+        filename = os.path.basename(filepath)
+        key = f"{prefix}/{filename}"
 
-                return f"https://{bucket}.s3.{region}.amazonaws.com/{key}"
-            except Exception as e:
-                logger.error(f"Error uploading file to S3: {e}")
-                # For local testing, provide a fallback
-                return f"Error uploading to S3: {str(e)}. Local file path: {filepath}"
+        await s3_uploader.upload_file_async(filepath, bucket, key, region)
+
+        return f"https://{bucket}.s3.{region}.amazonaws.com/{key}"
+    except Exception as e:
+        logger.error(f"Error uploading file to S3: {e}")
+        # For local testing, provide a fallback
+        return f"Error uploading to S3: {str(e)}. Local file path: {filepath}"
+
+
+@tool
+async def upload_files_to_s3_and_retrieve_s3_urls(pattern: str) -> str:
+    """Upload all files in a workspace directory or matching a glob pattern and retrieve their s3 paths
+
+    Args:
+        pattern: A directory or a glob pattern (e.g. "charts/*.png" or "**/*.md"), absolute or relative to the workspace directory
+    """
+    workspace_dir = get_upload_workspace_dir()
+    bucket, region, prefix = get_upload_target()
+
+    paths = limit_upload_paths(await run_blocking("workspace", resolve_upload_paths, pattern, workspace_dir))
+    if not paths:
+        raise ValueError(f"No files under the {workspace_dir} directory match {pattern}.")
+
+    if not bucket:
+        # For local testing, provide a fallback message
+        logger.warning("FILE_BUCKET environment variable not set. Using local file paths for testing.")
+        return "\n".join(f"Local file path (S3 upload skipped): {path}" for path in paths)
+
+    # Keep the directory structure so that files with the same name do not overwrite each other
+    files = [(path, f"{prefix}/{os.path.relpath(os.path.realpath(path), os.path.realpath(workspace_dir))}") for path in paths]
+    results = await s3_uploader.upload_files_async(files, bucket, region)
+
+    lines = []
+    for (path, key), result in zip(files, results, strict=True):
+        if isinstance(result, BaseException):
+            logger.error(f"Error uploading {path} to S3: {result}")
+            lines.append(f"Error uploading to S3: {str(result)}. Local file path: {path}")
+        else:
+            lines.append(f"https://{bucket}.s3.{region}.amazonaws.com/{key}")
+    return "\n".join(lines)
+
+
+@tool
+async def read_tool_result(handle: str, offset: int = 0) -> str:
+    """Read the rest of a tool result that was truncated
 
-        return upload_file_to_s3_and_retrieve_s3_url
+    Args:
+        handle: The handle given in the truncation notice of the result
+        offset: The character offset to continue reading from, as given in the notice
+    """
+    max_bytes, max_tokens = tool_result_policy.get_limits(READ_TOOL_RESULT_NAME)
+    workspace_dir = get_upload_workspace_dir()
+    # The result may still be being written
+    pending_store = tool_result_policy.get_pending_store(workspace_dir, handle)
+    if pending_store is not None:
+        await asyncio.wrap_future(pending_store)
+    return await run_blocking("workspace", read_stored_result, workspace_dir, handle, offset, max_bytes, max_tokens)
+
+
+def get_tool_name(agent_tool: Any) -> str:
+    """Get the name of a tool object or decorated tool function"""
+    return getattr(agent_tool, "tool_name", None) or getattr(agent_tool, "__name__", "")
+
+
+class ToolManager:
+    """Manages tools including MCP tools and built-in tools.
+
+    Built-in tools are created once and reused by every request. Every tool
+    is handed to the agent as a ManagedTool, which bounds the concurrent
+    calls of a request, applies per-tool timeouts and streams the latency
+    of each call.
+    """
+
+    def __init__(self):
+        self.mcp_pool = MCPServerPool()
+        self.mcp_tools = None
+        self.builtin_tools = None
+        self._builtin_tools_lock = threading.Lock()
+        # Wrappers keyed on the tools themselves, so a tool that is gone can never hand its wrapper to a new one
+        self._managed_tools: weakref.WeakKeyDictionary[Any, ManagedTool] = weakref.WeakKeyDictionary()
+        self._managed_tools_lock = threading.Lock()
+        # The last tool list and its version; the list is kept, so its tools stay alive while they are compared
+        self._tool_set_version: tuple[tuple[ManagedTool, ...], str] | None = None
+
+    def load_mcp_tools(self) -> list[Any]:
+        """Load MCP tools from the warm MCP server pool"""
+        # Starts the pool lazily if it was not started at application startup,
+        # otherwise waits until the pool is warm
+        self.mcp_pool.start()
+        self.mcp_tools = self.mcp_pool.get_tools()
+        return self.mcp_tools
+
+    def get_upload_tools(self) -> list[Any]:
+        """Get the S3 upload tools (single file and batch)"""
+        return [upload_file_to_s3_and_retrieve_s3_url, upload_files_to_s3_and_retrieve_s3_urls]
+
+    def get_tool_result_tools(self) -> list[Any]:
+        """Get the tool reading truncated tool results, if they are stored"""
+        return [read_tool_result] if tool_result_policy.enabled and tool_result_policy.spill else []
 
     def get_code_interpreter_tool(self) -> list[Any]:
         """Get code interpreter tool if available"""
         code_interpreter_tools = []
+        if not CODE_INTERPRETER_ENABLED:
+            return code_interpreter_tools
 
-        if CODE_INTERPRETER_AVAILABLE and AgentCoreCodeInterpreter:
+        # Imported on first use, since the code interpreter and its SDK are
+        # not needed until the first request (or the warm up) builds the tools
+        try:
+            from strands_tools.code_interpreter import AgentCoreCodeInterpreter
+        except ImportError as e:
+            logger.warning(f"Strands code interpreter tool not available: {e}")
+            AgentCoreCodeInterpreter = None
+
+        if AgentCoreCodeInterpreter:
             try:
                 aws_creds = get_aws_credentials()
                 region = aws_creds.get("AWS_REGION", "us-east-1")
@@ -136,13 +185,52 @@ class ToolManager:
 
         return code_interpreter_tools
 
-    def get_all_tools(self) -> list[Any]:
-        """Get all available tools (MCP + built-in + code interpreter)"""
-        mcp_tools = self.load_mcp_tools()
-        upload_tool = self.get_upload_tool()
-        code_interpreter_tools = self.get_code_interpreter_tool()
+    def get_builtin_tools(self) -> list[Any]:
+        """Get built-in tools (upload + tool results + code interpreter), creating them on first use"""
+        with self._builtin_tools_lock:
+            if self.builtin_tools is None:
+                upload_tools = self.get_upload_tools()
+                code_interpreter_tools = self.get_code_interpreter_tool()
+                self.builtin_tools = upload_tools + self.get_tool_result_tools() + code_interpreter_tools
+                logger.info(f"Built-in tools loaded: {len(self.builtin_tools)} (Upload: {len(upload_tools)}, Code Interpreter: {len(code_interpreter_tools)})")
 
-        all_tools = mcp_tools + [upload_tool] + code_interpreter_tools
-        logger.info(f"Total tools loaded: {len(all_tools)} (MCP: {len(mcp_tools)}, Built-in: 1, Code Interpreter: {len(code_interpreter_tools)})")
+        return self.builtin_tools
 
-        return all_tools
+    def build_tool_registry(self):
+        """Build all tools once at startup, starting the MCP servers in parallel"""
+        self.get_builtin_tools()
+        self.load_mcp_tools()
+        logger.info(f"Total tools loaded: {len(self.mcp_tools) + len(self.builtin_tools)} (MCP: {len(self.mcp_tools)}, Built-in: {len(self.builtin_tools)})")
+
+    def get_all_tools(self) -> list[Any]:
+        """Get all available tools (MCP + built-in + code interpreter)
+
+        Tools are sorted by name so that the tool specs sent to the model are
+        identical regardless of the order in which MCP servers became ready,
+        which keeps the cache_tools prompt-cache prefix stable.
+        """
+        tools = sorted(self.load_mcp_tools() + self.get_builtin_tools(), key=get_tool_name)
+        return self.get_managed_tools(tools)
+
+    def get_managed_tools(self, tools: list[Any]) -> list[ManagedTool]:
+        """Wrap tools in ManagedTool, reusing the wrappers of tools seen before
+
+        Wrappers of tools that are gone (e.g. of a restarted MCP server) are dropped.
+        """
+        with self._managed_tools_lock:
+            managed_tools = weakref.WeakKeyDictionary({agent_tool: self._managed_tools.get(agent_tool) or ManagedTool(agent_tool) for agent_tool in tools})
+            self._managed_tools = managed_tools
+        return [managed_tools[agent_tool] for agent_tool in tools]
+
+    def get_tool_set_version(self, tools: list[ManagedTool]) -> str:
+        """Version of the tools returned by get_all_tools, computed once per change of the tool list
+
+        Wrappers are reused while their tools stay the same, so the list
+        only has other wrappers when a tool was added, removed or replaced.
+        """
+        cached = self._tool_set_version
+        if cached is not None and len(cached[0]) == len(tools) and all(a is b for a, b in zip(cached[0], tools, strict=True)):
+            return cached[1]
+        version = get_tool_set_version(tools)
+        self._tool_set_version = (tuple(tools), version)
+        return version
@@ -0,0 +1,143 @@
+"""Latency tracing of the phases of an agent run for the agent core runtime."""
+
+import json
+import logging
+import sys
+import time
+from typing import Any
+
+from strands.experimental.hooks import AfterToolInvocationEvent, BeforeToolInvocationEvent
+from strands.hooks import HookRegistry
+
+from .config import TRACING_ENABLED
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Optional OpenTelemetry API (the spans are exported by opentelemetry-instrument)
+try:
+    from opentelemetry import trace
+    from opentelemetry.trace import Status, StatusCode
+
+    OTEL_AVAILABLE = True
+except ImportError:
+    trace = None
+    OTEL_AVAILABLE = False
+
+_tracer = trace.get_tracer("generic-agent-core-runtime") if OTEL_AVAILABLE and TRACING_ENABLED else None
+
+
+def payload_size(value: Any) -> int:
+    """Approximate size in bytes of a JSON-like payload (text and media)"""
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, bytes | bytearray | memoryview):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(payload_size(v) for v in value.values())
+    if isinstance(value, list | tuple):
+        return sum(payload_size(v) for v in value)
+    return len(json.dumps(value, default=str)) if value is not None else 0
+
+
+def is_mcp_tool(agent_tool: Any) -> bool:
+    """Whether a tool is provided by an MCP server.
+
+    strands.tools.mcp is not imported here, since it imports mcp; MCP tools
+    can only exist once the MCP server pool has imported it. Tools wrapped
+    in a ManagedTool are checked by their wrapped tool.
+    """
+    module = sys.modules.get("strands.tools.mcp.mcp_agent_tool")
+    return module is not None and isinstance(getattr(agent_tool, "wrapped", agent_tool), module.MCPAgentTool)
+
+
+class Phase:
+    """Times one phase of a run, as a histogram and, if tracing is enabled, as a span.
+
+    The duration is always recorded as phase_seconds{phase=...}. With
+    tracing disabled or OpenTelemetry missing no span is created, so a phase
+    costs two clock reads and one histogram update. Phases can be used as a
+    context manager or ended explicitly when they span several yields.
+    """
+
+    def __init__(self, name: str, parent: "Phase | None" = None, metric_labels: dict[str, Any] | None = None, **attributes: Any):
+        self.name = name
+        self.metric_labels = metric_labels or {}
+        self.span = None
+        self._start = time.perf_counter()
+        self._ended = False
+        if _tracer is not None:
+            context = trace.set_span_in_context(parent.span) if parent is not None and parent.span is not None else None
+            self.span = _tracer.start_span(name, context=context, attributes={k: v for k, v in attributes.items() if v is not None})
+
+    @property
+    def ended(self) -> bool:
+        """Whether the phase has ended"""
+        return self._ended
+
+    def set_attribute(self, key: str, value: Any):
+        """Add an attribute to the span"""
+        if self.span is not None and value is not None:
+            self.span.set_attribute(key, value)
+
+    def end(self, error: BaseException | None = None) -> float:
+        """End the phase and return its duration in seconds"""
+        elapsed = time.perf_counter() - self._start
+        if self._ended:
+            return elapsed
+        self._ended = True
+        metrics.observe("phase_seconds", elapsed, phase=self.name, **self.metric_labels)
+        if self.span is not None:
+            if error is not None:
+                self.span.record_exception(error)
+                self.span.set_status(Status(StatusCode.ERROR, str(error)))
+            self.span.end()
+        return elapsed
+
+    def __enter__(self) -> "Phase":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end(exc)
+        return False
+
+
+class ToolTracingHook:
+    """Agent hook that times every tool call as a phase of the request.
+
+    MCP tool calls are additionally recorded as mcp_round_trip_seconds,
+    since their time is spent in the MCP server process.
+    """
+
+    def __init__(self, parent: Phase | None = None):
+        self.parent = parent
+        self._phases: dict[str, Phase] = {}
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: Any):
+        registry.add_callback(BeforeToolInvocationEvent, self.before_tool)
+        registry.add_callback(AfterToolInvocationEvent, self.after_tool)
+
+    def before_tool(self, event: BeforeToolInvocationEvent):
+        tool_use = event.tool_use
+        is_mcp = is_mcp_tool(event.selected_tool)
+        self._phases[tool_use["toolUseId"]] = Phase(
+            "tool_call",
+            parent=self.parent,
+            metric_labels={"tool": tool_use["name"]},
+            **{"tool.name": tool_use["name"], "tool.kind": "mcp" if is_mcp else "builtin", "tool.input_bytes": payload_size(tool_use.get("input"))},
+        )
+
+    def after_tool(self, event: AfterToolInvocationEvent):
+        phase = self._phases.pop(event.tool_use["toolUseId"], None)
+        if phase is None:
+            return
+        result = event.result or {}
+        result_bytes = payload_size(result.get("content"))
+        phase.set_attribute("tool.result_bytes", result_bytes)
+        phase.set_attribute("tool.status", result.get("status"))
+        elapsed = phase.end(event.exception)
+
+        tool_name = event.tool_use["name"]
+        metrics.observe("tool_result_bytes", result_bytes, tool=tool_name)
+        if is_mcp_tool(event.selected_tool):
+            metrics.observe("mcp_round_trip_seconds", elapsed, tool=tool_name)
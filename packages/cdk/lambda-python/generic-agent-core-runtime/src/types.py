@@ -1,14 +1,41 @@
 """Data models for the agent core runtime."""
 
-from typing import Any
+from typing import Any, Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from strands.types.content import Message
 
+from .config import HISTORY_MAX_MESSAGES, HISTORY_MAX_TOKENS, HISTORY_STEP_TURNS, HISTORY_STRATEGY
+
+
+class ModelTarget(BaseModel):
+    modelId: str | None = None
+    region: str | None = None
+
 
 class ModelInfo(BaseModel):
     modelId: str
     region: str = "us-east-1"
+    fallbacks: list[ModelTarget] = []
+
+
+class HistoryConfig(BaseModel):
+    # The defaults come from the HISTORY_* environment variables and are validated like request values
+    model_config = ConfigDict(validate_default=True)
+
+    strategy: Literal["none", "sliding_window", "token_budget", "summarize"] = HISTORY_STRATEGY
+    max_messages: int = Field(HISTORY_MAX_MESSAGES, ge=1)
+    max_tokens: int = Field(HISTORY_MAX_TOKENS, ge=1)
+    step_turns: int = Field(HISTORY_STEP_TURNS, ge=1)
+
+
+# Fails at startup instead of on every request when the HISTORY_* environment variables are invalid
+DEFAULT_HISTORY_CONFIG = HistoryConfig()
+
+
+class ResponseCacheConfig(BaseModel):
+    enabled: bool = True
+    ttl_seconds: float | None = Field(None, ge=0)
 
 
 class AgentCoreRequest(BaseModel):
@@ -16,3 +43,5 @@ class AgentCoreRequest(BaseModel):
     system_prompt: str | None = None
     prompt: str | list[dict[str, Any]] = ""
     model: ModelInfo = {}
+    history: HistoryConfig | None = None
+    cache: ResponseCacheConfig | None = None
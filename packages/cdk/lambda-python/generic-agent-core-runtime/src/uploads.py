@@ -0,0 +1,173 @@
+"""S3 uploads of workspace files for the agent core runtime."""
+
+import asyncio
+import glob
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+
+from .clients import get_boto_client
+from .config import UPLOAD_BATCH_CONCURRENCY, UPLOAD_HASH_CACHE_SIZE, UPLOAD_MAX_CONCURRENCY, UPLOAD_MAX_FILES, UPLOAD_MULTIPART_CHUNKSIZE, UPLOAD_MULTIPART_THRESHOLD
+from .executors import run_blocking
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Metadata key holding the SHA-256 of the uploaded content
+HASH_METADATA_KEY = "sha256"
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def get_transfer_config() -> TransferConfig:
+    """Get the multipart transfer config shared by all uploads"""
+    return TransferConfig(
+        multipart_threshold=UPLOAD_MULTIPART_THRESHOLD,
+        multipart_chunksize=UPLOAD_MULTIPART_CHUNKSIZE,
+        max_concurrency=UPLOAD_MAX_CONCURRENCY,
+        use_threads=True,
+    )
+
+
+def hash_file(filepath: str) -> str:
+    """Compute the SHA-256 of a file without reading it into memory at once"""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_under_directory(filepath: str, directory: str) -> bool:
+    """Whether a path resolves to a location inside the directory"""
+    return os.path.realpath(filepath).startswith(os.path.realpath(directory) + os.sep)
+
+
+def resolve_upload_paths(pattern: str, workspace_dir: str) -> list[str]:
+    """Resolve a file, directory or glob pattern to the files under the workspace
+
+    Relative patterns are resolved against the workspace directory and
+    directories are uploaded recursively. Files outside the workspace are
+    never returned.
+    """
+    if not os.path.isabs(pattern):
+        pattern = os.path.join(workspace_dir, pattern)
+
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "**", "*")
+
+    paths = sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path) and is_under_directory(path, workspace_dir))
+    return paths
+
+
+class S3Uploader:
+    """Uploads workspace files to S3 with tuned multipart settings.
+
+    Every object is stored with the SHA-256 of its content in its metadata.
+    Before uploading, the hash of the local file is compared with the hash
+    of the existing object (remembered locally, or read with HeadObject), so
+    a file that is already uploaded under the same key is skipped.
+    """
+
+    def __init__(self, transfer_config: TransferConfig | None = None, hash_cache_size: int = UPLOAD_HASH_CACHE_SIZE):
+        self.transfer_config = transfer_config or get_transfer_config()
+        self.hash_cache_size = hash_cache_size
+        self._uploaded_hashes: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_known_hash(self, bucket: str, key: str) -> str | None:
+        with self._lock:
+            content_hash = self._uploaded_hashes.get((bucket, key))
+            if content_hash is not None:
+                self._uploaded_hashes.move_to_end((bucket, key))
+            return content_hash
+
+    def _set_known_hash(self, bucket: str, key: str, content_hash: str):
+        with self._lock:
+            self._uploaded_hashes[(bucket, key)] = content_hash
+            self._uploaded_hashes.move_to_end((bucket, key))
+            while len(self._uploaded_hashes) > self.hash_cache_size:
+                self._uploaded_hashes.popitem(last=False)
+
+    def get_remote_hash(self, s3, bucket: str, key: str) -> str | None:
+        """Get the content hash of an existing object, if any"""
+        content_hash = self._get_known_hash(bucket, key)
+        if content_hash is not None:
+            return content_hash
+
+        try:
+            response = s3.head_object(Bucket=bucket, Key=key)
+        except ClientError as e:
+            # Without s3:GetObject HeadObject is denied; the file is then always uploaded
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound", "403", "Forbidden", "AccessDenied"):
+                return None
+            raise
+
+        content_hash = response.get("Metadata", {}).get(HASH_METADATA_KEY)
+        if content_hash:
+            self._set_known_hash(bucket, key, content_hash)
+        return content_hash
+
+    def upload_file(self, filepath: str, bucket: str, key: str, region: str) -> bool:
+        """Upload a file unless the same content is already stored under the key
+
+        Returns whether the file was uploaded.
+        """
+        s3 = get_boto_client("s3", region)
+        content_hash = hash_file(filepath)
+
+        if self.get_remote_hash(s3, bucket, key) == content_hash:
+            logger.info(f"Skip uploading {filepath}: s3://{bucket}/{key} is up to date")
+            metrics.increment("s3_upload_skipped_total")
+            return False
+
+        start_time = time.monotonic()
+        s3.upload_file(
+            filepath,
+            bucket,
+            key,
+            ExtraArgs={"Metadata": {HASH_METADATA_KEY: content_hash}},
+            Config=self.transfer_config,
+        )
+        self._set_known_hash(bucket, key, content_hash)
+
+        metrics.increment("s3_uploads_total")
+        metrics.increment("s3_upload_bytes_total", os.path.getsize(filepath))
+        metrics.observe("s3_upload_seconds", time.monotonic() - start_time)
+        return True
+
+    async def upload_file_async(self, filepath: str, bucket: str, key: str, region: str) -> bool:
+        """Upload a file in the upload pool so the event loop is never blocked"""
+        return await run_blocking("upload", self.upload_file, filepath, bucket, key, region)
+
+    async def upload_files_async(self, files: list[tuple[str, str]], bucket: str, region: str, concurrency: int = UPLOAD_BATCH_CONCURRENCY) -> list[bool | BaseException]:
+        """Upload (filepath, key) pairs concurrently
+
+        Results are returned in the order of files. A failed upload returns
+        its exception instead of failing the whole batch.
+        """
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+        async def upload(filepath: str, key: str) -> bool:
+            async with semaphore:
+                return await self.upload_file_async(filepath, bucket, key, region)
+
+        return await asyncio.gather(*(upload(filepath, key) for filepath, key in files), return_exceptions=True)
+
+
+def limit_upload_paths(paths: list[str], max_files: int = UPLOAD_MAX_FILES) -> list[str]:
+    """Limit the number of files uploaded by one tool call"""
+    if len(paths) > max_files:
+        logger.warning(f"{len(paths)} files matched, uploading only the first {max_files}")
+        return paths[:max_files]
+    return paths
+
+
+# Shared uploader
+s3_uploader = S3Uploader()
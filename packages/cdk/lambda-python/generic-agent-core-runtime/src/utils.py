@@ -1,16 +1,19 @@
 """Utility functions for the agent core runtime."""
 
-import base64
+import binascii
+import json
 import logging
 import os
 import pathlib
+import re
 import shutil
 from typing import Any
 from uuid import uuid4
 
 from strands.types.content import ContentBlock
 
-from .config import WORKSPACE_DIR
+from .config import MAX_REQUEST_BODY_BYTES, MAX_REQUEST_MEDIA_BYTES, WORKSPACE_DIR
+from .media_cache import media_cache
 
 logger = logging.getLogger(__name__)
 
@@ -20,17 +23,17 @@ def create_id() -> str:
     return str(uuid4())
 
 
-def create_ws_directory():
+def create_ws_directory(workspace_dir: str = WORKSPACE_DIR):
     """Create workspace directory if it doesn't exist"""
-    logger.info("Create ws directory")
-    pathlib.Path(WORKSPACE_DIR).mkdir(exist_ok=True)
+    logger.info(f"Create ws directory {workspace_dir}")
+    pathlib.Path(workspace_dir).mkdir(parents=True, exist_ok=True)
 
 
-def clean_ws_directory():
+def clean_ws_directory(workspace_dir: str = WORKSPACE_DIR):
     """Clean up workspace directory"""
-    logger.info("Clean ws directory...")
-    if os.path.exists(WORKSPACE_DIR):
-        shutil.rmtree(WORKSPACE_DIR)
+    logger.info(f"Clean ws directory {workspace_dir}...")
+    if os.path.exists(workspace_dir):
+        shutil.rmtree(workspace_dir)
 
 
 def create_error_response(error_message: str) -> dict:
@@ -63,29 +66,219 @@ def create_empty_response() -> dict:
 
 # Base64 conversion utilities
 
+MEDIA_TYPES = ("image", "document", "video")
+
+
+class PayloadTooLargeError(ValueError):
+    """Raised when a request exceeds the configured body or media size limits"""
+
 
 def decode_base64_string(value: Any) -> bytes:
     """Convert base64 string or bytes to bytes"""
     if isinstance(value, bytes):
         return value
     elif isinstance(value, str):
-        return base64.b64decode(value + "==")  # add padding
+        # Only pad when needed so that well-formed payloads are not copied
+        if len(value) % 4:
+            value += "=" * (-len(value) % 4)
+        # a2b_base64 reads ASCII strings in place instead of encoding them to bytes first
+        return binascii.a2b_base64(value)
     else:
         raise ValueError(f"Invalid value type: {type(value)}")
 
 
+def decode_base64_view(encoded: memoryview) -> bytes:
+    """Convert a base64 value in a buffer to bytes, padded like decode_base64_string"""
+    if len(encoded) % 4:
+        # Only values without their padding are copied
+        return binascii.a2b_base64(bytes(encoded) + b"=" * (-len(encoded) % 4))
+    return binascii.a2b_base64(encoded)
+
+
 def convert_content_block_bytes(block: dict[str, Any]) -> dict[str, Any]:
-    """Convert base64 strings to bytes in a content block"""
-    block = block.copy()
+    """Convert base64 strings to bytes in a content block without modifying the given block"""
+    converted = None
 
     # Handle image, document, and video blocks
-    for media_type in ["image", "document", "video"]:
+    for media_type in MEDIA_TYPES:
         if media_type in block:
             media_data = block[media_type]
-            if "source" in media_data and "bytes" in media_data["source"]:
-                media_data["source"]["bytes"] = decode_base64_string(media_data["source"]["bytes"])
+            if "source" in media_data and "bytes" in media_data["source"] and not isinstance(media_data["source"]["bytes"], bytes):
+                source = media_data["source"]
+                if converted is None:
+                    converted = block.copy()
+                converted[media_type] = {**media_data, "source": {**source, "bytes": decode_base64_string(source["bytes"])}}
+
+    return block if converted is None else converted
+
+
+# Base64 values at least this long are decoded straight from the raw request body
+RAW_DECODE_MIN_CHARS = 4096
+MEDIA_PLACEHOLDER_PREFIX = "\x00media:"
+_MEDIA_BYTES_PATTERN = re.compile(rb'"bytes"\s*:\s*"')
+
+
+class MediaDecoder:
+    """Decodes base64 media of a request body into bytes buffers.
+
+    Only values at image, document or video .source.bytes are media. Large
+    "bytes" string values are cut out of the raw body and replaced with
+    small placeholders before the JSON is parsed, so the parser never
+    builds strings for them. The JSON object hook decodes the values of
+    media blocks, the large ones directly from the raw body (via memoryview
+    slices) and the small ones from the parsed strings; placeholders found
+    anywhere else, such as a tool input with a "bytes" key, are restored to
+    their original strings. Large values are looked up in the media cache
+    first, so attachments resent with the conversation history are only
+    decoded once. The decoded size of all media in a request is limited to
+    max_media_bytes.
+    """
+
+    def __init__(self, max_media_bytes: int = MAX_REQUEST_MEDIA_BYTES):
+        self.max_media_bytes = max_media_bytes
+        self.media_bytes = 0
+        # A per-request prefix, so that no string of the request can pass for a placeholder
+        nonce = uuid4().hex
+        self.placeholder_prefix = f"{MEDIA_PLACEHOLDER_PREFIX}{nonce}:"
+        self._escaped_placeholder_prefix = f"\\u0000media:{nonce}:".encode()
+        self.view: memoryview | None = None
+        self.spans: list[tuple[int, int]] = []
+        self.decoded = 0
+
+    def _check_size(self, encoded_length: int):
+        """Check the decoded size before allocating the buffer"""
+        self.media_bytes += encoded_length * 3 // 4
+        if self.media_bytes > self.max_media_bytes:
+            raise PayloadTooLargeError(f"Media in the request exceeds the limit of {self.max_media_bytes} bytes")
+
+    def _decode_cached(self, encoded: memoryview) -> bytes:
+        """Decode a base64 value, reusing the buffer of an identical earlier attachment"""
+        if not media_cache.enabled:
+            return decode_base64_view(encoded)
+
+        key = media_cache.key(encoded)
+        data = media_cache.get(key)
+        if data is None:
+            data = decode_base64_view(encoded)
+            media_cache.put(key, data)
+        return data
+
+    def _get_span(self, value: Any) -> tuple[int, int] | None:
+        """Position in the raw body of the value a placeholder stands for"""
+        if isinstance(value, str) and value.startswith(self.placeholder_prefix):
+            return self.spans[int(value[len(self.placeholder_prefix) :])]
+        return None
+
+    def extract(self, body: bytes | bytearray) -> bytes:
+        """Replace large "bytes" string values of the raw body with placeholders and return the remaining JSON
+
+        The body must stay unchanged until release is called. Slices of the
+        body are released as soon as they are used, so that only self.view
+        holds it.
+        """
+        view = memoryview(body)
+        pieces = []
+        position = 0
+
+        for match in _MEDIA_BYTES_PATTERN.finditer(body):
+            start = match.end()
+            end = body.find(b'"', start)
+            # Leave short or escaped values to the JSON parser
+            if start < position or end - start < RAW_DECODE_MIN_CHARS or body.find(b"\\", start, end) != -1:
+                continue
+
+            pieces.append(view[position:start])
+            pieces.append(self._escaped_placeholder_prefix + str(len(self.spans)).encode())
+            self.spans.append((start, end))
+            position = end
+
+        if not pieces:
+            view.release()
+            return body
+
+        pieces.append(view[position:])
+        self.view = view
+        remaining = b"".join(pieces)
+        for piece in pieces:
+            if isinstance(piece, memoryview):
+                piece.release()
+        return remaining
+
+    def __call__(self, obj: dict[str, Any]) -> dict[str, Any]:
+        for media_type in MEDIA_TYPES:
+            media = obj.get(media_type)
+            source = media.get("source") if isinstance(media, dict) else None
+            if not isinstance(source, dict) or not isinstance(source.get("bytes"), str):
+                continue
+            span = self._get_span(source["bytes"])
+            if span is None:
+                self._check_size(len(source["bytes"]))
+                source["bytes"] = decode_base64_string(source["bytes"])
+            else:
+                start, end = span
+                self._check_size(end - start)
+                with self.view[start:end] as encoded:
+                    source["bytes"] = self._decode_cached(encoded)
+                self.decoded += 1
+        return obj
+
+    def restore(self, value: Any) -> Any:
+        """Put the original strings back for placeholders outside of media blocks"""
+        if self.decoded == len(self.spans):
+            return value
+        if isinstance(value, dict):
+            for key, item in value.items():
+                value[key] = self.restore(item)
+        elif isinstance(value, list):
+            for index, item in enumerate(value):
+                value[index] = self.restore(item)
+        else:
+            span = self._get_span(value)
+            if span is not None:
+                start, end = span
+                with self.view[start:end] as encoded:
+                    return str(encoded, "utf-8")
+        return value
 
-    return block
+    def release(self):
+        """Release the raw body"""
+        if self.view is not None:
+            self.view.release()
+            self.view = None
+
+
+def parse_request_body(body: bytes | bytearray, max_media_bytes: int = MAX_REQUEST_MEDIA_BYTES) -> dict[str, Any]:
+    """Parse a JSON request body, decoding base64 media into bytes buffers
+
+    A bytearray body is consumed: its buffer is released once the request
+    has been parsed.
+    """
+    decoder = MediaDecoder(max_media_bytes)
+    try:
+        remaining = decoder.extract(body)
+        return decoder.restore(json.loads(remaining, object_hook=decoder))
+    finally:
+        decoder.release()
+        if isinstance(body, bytearray):
+            try:
+                body.clear()
+            except BufferError as e:
+                # A view of the body is still alive; never hide the outcome of parsing behind it
+                logger.warning(f"Could not release the request body: {e}")
+
+
+async def read_request_body(request: Any, max_body_bytes: int = MAX_REQUEST_BODY_BYTES) -> bytearray:
+    """Read the request body chunk by chunk into a single buffer, enforcing a size limit"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_body_bytes:
+        raise PayloadTooLargeError(f"Request body exceeds the limit of {max_body_bytes} bytes")
+
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_body_bytes:
+            raise PayloadTooLargeError(f"Request body exceeds the limit of {max_body_bytes} bytes")
+    return body
 
 
 def process_content_blocks(content_blocks: list[dict[str, Any] | str]) -> list[ContentBlock]:
@@ -129,3 +322,12 @@ def process_prompt(prompt: str | list[dict[str, Any]]) -> str | list[ContentBloc
     if isinstance(prompt, list):
         return process_content_blocks(prompt)
     return prompt
+
+
+def add_workspace_prompt(prompt: str | list[ContentBlock], workspace_prompt: str) -> list[ContentBlock]:
+    """Put the workspace description in front of a processed prompt"""
+    if isinstance(prompt, str):
+        blocks = [ContentBlock(text=prompt)] if prompt else []
+    else:
+        blocks = list(prompt)
+    return [ContentBlock(text=workspace_prompt), *blocks]
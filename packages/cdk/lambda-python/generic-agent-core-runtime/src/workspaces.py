@@ -0,0 +1,252 @@
+"""Retained per-session workspaces for the agent core runtime."""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+from uuid import uuid4
+
+from .config import (
+    WORKSPACE_DIR,
+    WORKSPACE_MAX_BYTES,
+    WORKSPACE_MAX_SESSIONS,
+    WORKSPACE_SESSION_MAX_BYTES,
+    WORKSPACE_SWEEP_INTERVAL,
+    WORKSPACE_TTL_SECONDS,
+)
+from .context import RequestContext
+from .metrics import metrics
+from .utils import clean_ws_directory, create_ws_directory
+
+logger = logging.getLogger(__name__)
+
+# Directories under the workspace root holding the session workspaces and the workspaces being deleted
+SESSIONS_DIR = "sessions"
+DELETED_DIR = ".deleted"
+
+SAFE_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+
+
+def get_session_dir_name(session_id: str) -> str:
+    """Directory name of the workspace of a session (ids that are not safe path names are hashed)"""
+    if SAFE_NAME_PATTERN.match(session_id):
+        return session_id
+    return hashlib.sha256(session_id.encode()).hexdigest()
+
+
+def get_directory_size(path: str) -> int:
+    """Total size of the files under a directory, without following symbolic links"""
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class SessionWorkspace:
+    """The retained workspace of a session"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.active = 0
+        self.last_used = time.monotonic()
+        self.size_bytes = 0
+        self.dirty = False
+
+
+class WorkspaceManager:
+    """Workspaces of the requests, retained per AgentCore session.
+
+    Requests of a session share a workspace that is kept between turns, so
+    cloned repositories, installed packages and intermediate files of
+    earlier turns can be reused. Requests without a session (batch items,
+    mcp-api chats) get a workspace of their own that is deleted after the
+    request.
+
+    Nothing is deleted on the request path: releasing a workspace only
+    wakes a sweeper thread. The sweeper measures the workspaces released
+    since its last run and deletes idle session workspaces that exceed
+    session_max_bytes, that were not used for ttl_seconds, or, least
+    recently used first, while the session workspaces exceed max_bytes or
+    max_sessions in total. A workspace in use by a request is never
+    deleted; its quota is checked once it is released.
+    """
+
+    def __init__(
+        self,
+        root: str = WORKSPACE_DIR,
+        max_sessions: int = WORKSPACE_MAX_SESSIONS,
+        session_max_bytes: int = WORKSPACE_SESSION_MAX_BYTES,
+        max_bytes: int = WORKSPACE_MAX_BYTES,
+        ttl_seconds: float = WORKSPACE_TTL_SECONDS,
+        sweep_interval: float = WORKSPACE_SWEEP_INTERVAL,
+    ):
+        self.root = root
+        self.max_sessions = max_sessions
+        self.session_max_bytes = session_max_bytes
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+        self._sessions: OrderedDict[str, SessionWorkspace] = OrderedDict()
+        self._pending_deletes: list[str] = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._wake = threading.Event()
+        self._sweeper: threading.Thread | None = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether session workspaces are retained"""
+        return self.max_sessions > 0
+
+    def acquire(self, context: RequestContext, retain: bool = False) -> str:
+        """Create the workspace of a request and point the request context at it
+
+        With retain, requests of the same session get the same workspace,
+        which outlives the request. This creates directories, so it runs
+        off the event loop.
+        """
+        if retain and self.enabled and context.session_id:
+            name = get_session_dir_name(context.session_id)
+            with self._lock:
+                entry = self._sessions.get(name)
+                if entry is None:
+                    entry = self._sessions[name] = SessionWorkspace(os.path.join(self.root, SESSIONS_DIR, name))
+                    metrics.increment("workspace_session_misses_total")
+                else:
+                    metrics.increment("workspace_session_hits_total")
+                entry.active += 1
+                entry.last_used = time.monotonic()
+                self._sessions.move_to_end(name)
+                # Created under the lock so that the sweeper cannot move it away in between
+                create_ws_directory(entry.path)
+            context.workspace_dir = entry.path
+            context.workspace_retained = True
+        else:
+            create_ws_directory(context.workspace_dir)
+        return context.workspace_dir
+
+    def release(self, context: RequestContext) -> None:
+        """Hand the workspace of a finished request to the sweeper (does not block)"""
+        with self._lock:
+            if context.workspace_retained:
+                entry = self._sessions.get(os.path.basename(context.workspace_dir))
+                if entry is not None:
+                    entry.active -= 1
+                    entry.last_used = time.monotonic()
+                    entry.dirty = True
+            else:
+                self._pending_deletes.append(context.workspace_dir)
+        self._wake.set()
+
+    def _evict(self, name: str, reason: str) -> str | None:
+        """Remove an idle session workspace and move its directory out of the way (called with the lock held)"""
+        entry = self._sessions.pop(name)
+        metrics.increment("workspace_evictions_total", reason=reason)
+        logger.info(f"Evicting the workspace of session {name} ({reason}, {entry.size_bytes} bytes)")
+        if not os.path.exists(entry.path):
+            return None
+        # Renaming is cheap, so the slow delete runs outside of the lock
+        deleted_path = os.path.join(self.root, DELETED_DIR, str(uuid4()))
+        os.makedirs(os.path.dirname(deleted_path), exist_ok=True)
+        os.rename(entry.path, deleted_path)
+        return deleted_path
+
+    def _update_gauges(self):
+        metrics.set_gauge("workspace_sessions", len(self._sessions))
+        metrics.set_gauge("workspace_bytes", sum(entry.size_bytes for entry in self._sessions.values()))
+
+    def sweep(self) -> None:
+        """Measure released workspaces, enforce the quotas and delete what is no longer needed"""
+        start_time = time.monotonic()
+        with self._lock:
+            deletes = self._pending_deletes
+            self._pending_deletes = []
+            measure = [(name, entry.path) for name, entry in self._sessions.items() if entry.dirty and entry.active == 0]
+
+        # Sizes are measured outside of the lock; a workspace taken again meanwhile is measured after its next release
+        sizes = {name: get_directory_size(path) for name, path in measure}
+
+        with self._lock:
+            for name, size in sizes.items():
+                entry = self._sessions.get(name)
+                if entry is not None and entry.active == 0:
+                    entry.size_bytes = size
+                    entry.dirty = False
+
+            now = time.monotonic()
+            for name, entry in list(self._sessions.items()):
+                if entry.active:
+                    continue
+                if entry.size_bytes > self.session_max_bytes:
+                    deletes.append(self._evict(name, "quota"))
+                elif entry.last_used + self.ttl_seconds < now:
+                    deletes.append(self._evict(name, "expired"))
+
+            # Least recently used first; workspaces in use are skipped
+            for name, entry in list(self._sessions.items()):
+                if len(self._sessions) <= self.max_sessions and sum(e.size_bytes for e in self._sessions.values()) <= self.max_bytes:
+                    break
+                if entry.active == 0:
+                    deletes.append(self._evict(name, "lru"))
+            self._update_gauges()
+
+        for path in deletes:
+            if path:
+                try:
+                    clean_ws_directory(path)
+                except OSError as e:
+                    logger.warning(f"Error deleting workspace {path}: {e}")
+        metrics.observe("workspace_sweep_seconds", time.monotonic() - start_time)
+
+    def start(self) -> None:
+        """Delete workspaces left by a previous process and start the sweeper thread"""
+        if self._sweeper is not None:
+            return
+        if os.path.isdir(self.root):
+            with self._lock:
+                self._pending_deletes.extend(os.path.join(self.root, name) for name in os.listdir(self.root))
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="workspace-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def _sweep_loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Error sweeping workspaces: {e}")
+            self._wake.wait(self.sweep_interval)
+            self._wake.clear()
+
+    def get_status(self) -> dict[str, Any]:
+        """Get the workspace status for the metrics endpoint"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "sessions": len(self._sessions),
+                "active": sum(1 for entry in self._sessions.values() if entry.active),
+                "bytes": sum(entry.size_bytes for entry in self._sessions.values()),
+                "pending_deletes": len(self._pending_deletes),
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "session_max_bytes": self.session_max_bytes,
+            }
+
+    def stop(self) -> None:
+        """Stop the sweeper and delete the workspaces of finished requests"""
+        self._stopping.set()
+        self._wake.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
+        self.sweep()
+
+
+workspaces = WorkspaceManager()
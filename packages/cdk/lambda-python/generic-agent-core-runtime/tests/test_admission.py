@@ -0,0 +1,89 @@
+"""Admission of agent runs: FIFO handoff, rejections and cancelled waiters."""
+
+import asyncio
+
+import pytest
+
+from src.admission import AdmissionController, AdmissionRejectedError
+
+
+def test_slots_are_handed_over_in_fifo_order():
+    async def run():
+        controller = AdmissionController(max_concurrent=1, max_queue=5, max_wait_seconds=5)
+        first = await controller.acquire()
+        admitted = []
+
+        async def wait(name):
+            ticket = await controller.acquire()
+            admitted.append(name)
+            return ticket
+
+        tasks = [asyncio.create_task(wait(name)) for name in ("a", "b", "c")]
+        await asyncio.sleep(0)
+        assert controller.queue_depth == 3
+
+        first.release()
+        first.release()  # Releasing twice is a no-op
+        for task in tasks:
+            (await task).release()
+        assert admitted == ["a", "b", "c"]
+        assert controller.running == 0
+        assert controller.queue_depth == 0
+
+    asyncio.run(run())
+
+
+def test_full_queue_is_rejected_with_429():
+    async def run():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, max_wait_seconds=5)
+        ticket = await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejectedError) as e:
+            await controller.acquire()
+        assert e.value.status_code == 429
+        assert e.value.retry_after >= 1
+
+        ticket.release()
+        (await waiter).release()
+
+    asyncio.run(run())
+
+
+def test_wait_timeout_is_rejected_with_503():
+    async def run():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, max_wait_seconds=0.05)
+        ticket = await controller.acquire()
+
+        with pytest.raises(AdmissionRejectedError) as e:
+            await controller.acquire()
+        assert e.value.status_code == 503
+        assert controller.queue_depth == 0
+
+        ticket.release()
+        assert controller.running == 0
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_passes_on_its_slot_without_counting_a_run():
+    async def run():
+        controller = AdmissionController(max_concurrent=1, max_queue=5, max_wait_seconds=5)
+        ticket = await controller.acquire()
+        cancelled = asyncio.create_task(controller.acquire())
+        waiting = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+
+        # The slot is handed to the first waiter, which is cancelled before it runs
+        ticket.release()
+        average_run_seconds = controller.average_run_seconds
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+
+        assert controller.average_run_seconds == average_run_seconds
+        (await waiting).release()
+        assert controller.running == 0
+
+    asyncio.run(run())
@@ -0,0 +1,111 @@
+"""Failover of model calls between equivalent targets."""
+
+import asyncio
+
+import pytest
+from strands.models.model import Model
+from strands.types.exceptions import ModelThrottledException
+
+import src.agent
+from src.agent import AgentManager
+from src.context import RequestContext
+from src.metrics import metrics
+from src.routing import ModelRouter, RoutedModel
+
+PRIMARY = ("model-a", "us-east-1")
+FALLBACK = ("model-b", "us-west-2")
+
+
+class FakeModel(Model):
+    """Answers with a short text, or throttles after the message start"""
+
+    def __init__(self, name: str, throttle_calls: int = 0, throttle_after_first_token: bool = False):
+        self.name = name
+        self.throttle_calls = throttle_calls
+        self.throttle_after_first_token = throttle_after_first_token
+        self.calls = 0
+
+    def update_config(self, **model_config):
+        pass
+
+    def get_config(self):
+        return {"model_id": self.name}
+
+    async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs):
+        raise NotImplementedError
+        yield  # pragma: no cover
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs):
+        self.calls += 1
+        yield {"messageStart": {"role": "assistant"}}
+        if self.throttle_calls > 0:
+            self.throttle_calls -= 1
+            raise ModelThrottledException("ThrottlingException: Too many requests")
+        yield {"contentBlockDelta": {"delta": {"text": f"from {self.name}"}}}
+        if self.throttle_after_first_token:
+            raise ModelThrottledException("ThrottlingException: Too many requests")
+        yield {"contentBlockStop": {}}
+        yield {"messageStop": {"stopReason": "end_turn"}}
+        yield {"metadata": {"usage": {"inputTokens": 10, "outputTokens": 5, "totalTokens": 15}, "metrics": {"latencyMs": 1}}}
+
+
+def routed(primary: FakeModel, fallback: FakeModel) -> tuple[ModelRouter, RoutedModel]:
+    router = ModelRouter(cooldown_seconds=60)
+    return router, RoutedModel(router, {PRIMARY: primary, FALLBACK: fallback})
+
+
+async def collect(model: Model) -> list[dict]:
+    return [event async for event in model.stream([{"role": "user", "content": [{"text": "hi"}]}])]
+
+
+def test_failover_holds_back_events_until_the_first_token():
+    primary, fallback = FakeModel("a", throttle_calls=1), FakeModel("b")
+    router, model = routed(primary, fallback)
+
+    events = asyncio.run(collect(model))
+    # The message start of the throttled call never reaches the agent
+    assert [event for event in events if "messageStart" in event] == [{"messageStart": {"role": "assistant"}}]
+    assert events[1] == {"contentBlockDelta": {"delta": {"text": "from b"}}}
+    assert (primary.calls, fallback.calls) == (1, 1)
+
+    # The throttled target is in a cooldown, so the next call goes to the fallback first
+    assert router.rank([PRIMARY, FALLBACK]) == [FALLBACK, PRIMARY]
+    status = router.get_status()
+    assert status["model-a@us-east-1"]["throttles"] == 1
+    assert status["model-a@us-east-1"]["cooldown_seconds"] > 0
+    asyncio.run(collect(model))
+    assert (primary.calls, fallback.calls) == (1, 2)
+
+
+def test_throttle_after_the_first_token_is_raised():
+    primary, fallback = FakeModel("a", throttle_after_first_token=True), FakeModel("b")
+    _, model = routed(primary, fallback)
+    with pytest.raises(ModelThrottledException):
+        asyncio.run(collect(model))
+    assert fallback.calls == 0
+
+
+def test_every_target_throttled():
+    _, model = routed(FakeModel("a", throttle_calls=1), FakeModel("b", throttle_calls=1))
+    with pytest.raises(ModelThrottledException):
+        asyncio.run(collect(model))
+
+
+def test_metrics_are_labelled_with_the_served_target(monkeypatch):
+    primary, fallback = FakeModel("a", throttle_calls=1), FakeModel("b")
+    models = {PRIMARY: primary, FALLBACK: fallback}
+    monkeypatch.setattr(src.agent, "get_bedrock_model", lambda model_id, region: models[(model_id, region)])
+    manager = AgentManager()
+    monkeypatch.setattr(manager.tool_manager, "get_all_tools", lambda: [])
+
+    async def run():
+        model_info = {"modelId": PRIMARY[0], "region": PRIMARY[1], "fallbacks": [{"modelId": FALLBACK[0], "region": FALLBACK[1]}]}
+        context = RequestContext("session", None)
+        return b"".join([chunk async for chunk in manager.process_request_streaming([], None, "hi", model_info, context)])
+
+    assert b"from b" in asyncio.run(run())
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]['output_tokens_total{model_id="model-b"}'] == 5
+    assert 'output_tokens_total{model_id="model-a"}' not in snapshot["counters"]
+    assert snapshot["histograms"]['time_to_first_token_seconds{model_id="model-b"}']["count"] == 1
+    assert 'time_to_first_token_seconds{model_id="model-a"}' not in snapshot["histograms"]
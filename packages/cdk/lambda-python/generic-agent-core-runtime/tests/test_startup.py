@@ -0,0 +1,49 @@
+"""Startup time of the agent core runtime stays within its budget."""
+
+import os
+import statistics
+import subprocess
+import sys
+
+import pytest
+
+from src.config import STARTUP_IMPORT_BUDGET_SECONDS
+from src.startup import RUNTIME_DIR, measure_import_time, parse_importtime
+
+# The slowest imports of the runtime, which are deferred to their first use
+DEFERRED_MODULES = ["mcp", "strands_tools"]
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   _io
+import time:      2000 |       2500 |     json.decoder
+import time:       500 |       3000 |   json
+import time:      1000 |       4000 | app
+import time:       300 |        300 | src
+"""
+
+
+def test_parse_importtime():
+    report = parse_importtime(IMPORTTIME_OUTPUT, top=2)
+    assert report["total_seconds"] == 0.0043
+    assert report["modules"] == [
+        {"module": "app", "self_seconds": 0.001, "cumulative_seconds": 0.004},
+        {"module": "json", "self_seconds": 0.0005, "cumulative_seconds": 0.003},
+    ]
+    assert report["packages"] == {"json": 0.0025, "app": 0.001}
+
+
+@pytest.mark.parametrize("module", ["app", "mcp_api"])
+def test_import_defers_slow_modules(module):
+    code = f"import sys, {module}; print(' '.join(name for name in {DEFERRED_MODULES!r} if name in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=RUNTIME_DIR, capture_output=True, text=True, timeout=60, check=True)
+    assert result.stdout.split() == [], f"import {module} loaded {result.stdout.strip()} at startup"
+
+
+# Wall-clock timings depend on the machine, so the budget is only checked on demand (e.g. in the image build)
+@pytest.mark.skipif(os.environ.get("STARTUP_BUDGET_TEST", "false").lower() != "true", reason="set STARTUP_BUDGET_TEST=true to check the import time budget")
+def test_import_app_within_budget():
+    # The median of a few cold imports, like bench/startup.py, so a single slow run does not fail the test
+    reports = [measure_import_time("app") for _ in range(3)]
+    import_seconds = statistics.median(report["total_seconds"] for report in reports)
+    slowest = reports[-1]["packages"]
+    assert import_seconds <= STARTUP_IMPORT_BUDGET_SECONDS, f"import app took {import_seconds:.2f}s (budget {STARTUP_IMPORT_BUDGET_SECONDS}s), slowest packages: {slowest}"
@@ -0,0 +1,165 @@
+"""The text-and-trace stream of mcp-api matches the output of the original mcp-api app."""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from src.config import MCP_API_FIXED_SYSTEM_PROMPT, get_system_prompt
+from src.streaming import NDJSONStreamEncoder, TextTraceStreamEncoder, iter_with_deadline
+
+# The stream of the original mcp-api app (packages/cdk/mcp-api/app.py), kept as the reference
+
+
+def stream_chunk(text, trace):
+    return json.dumps({"text": text, "trace": trace}, ensure_ascii=False) + "\n"
+
+
+def extract_text(event):
+    for c in event["message"]["content"]:
+        if "text" in c:
+            return c["text"]
+    return None
+
+
+def extract_tool_use(event):
+    for c in event["message"]["content"]:
+        if "toolUse" in c:
+            return {"name": c["toolUse"]["name"], "input": c["toolUse"]["input"]}
+    return None
+
+
+def extract_tool_result(event, max_chars=None):
+    texts = []
+    length = 0
+    for c in event["message"]["content"]:
+        if "toolResult" in c:
+            for t in c["toolResult"]["content"]:
+                if "text" in t:
+                    texts.append(t["text"])
+                    length += len(t["text"])
+                    if max_chars is not None and length > max_chars:
+                        texts[-1] = texts[-1][: max_chars - (length - len(t["text"]))]
+                        return "".join(texts) + "..."
+    return "".join(texts)
+
+
+def legacy_stream(events):
+    for event in events:
+        if "message" in event:
+            if event["message"]["role"] == "assistant":
+                text = extract_text(event)
+                tool_use = extract_tool_use(event)
+                if text is not None and tool_use is not None:
+                    yield stream_chunk("", f"{text}\n")
+                    yield stream_chunk("", f"```\n{tool_use['name']}: {tool_use['input']}\n```\n")
+                elif text is not None:
+                    yield stream_chunk(text, None)
+                else:
+                    yield stream_chunk("", f"```\n{tool_use['name']}: {tool_use['input']}\n```\n")
+            else:
+                yield stream_chunk("", f"```\n{extract_tool_result(event, 200)}\n```\n")
+
+
+def encode(events):
+    encoder = TextTraceStreamEncoder()
+    return "".join(chunk.decode() for event in events if (chunk := encoder.encode_agent_event(event)) is not None)
+
+
+def assistant(*content):
+    return {"message": {"role": "assistant", "content": list(content)}}
+
+
+def tool_result(*content):
+    return {"message": {"role": "user", "content": [{"toolResult": {"toolUseId": "t1", "status": "success", "content": list(content)}}]}}
+
+
+TOOL_USE = {"toolUse": {"toolUseId": "t1", "name": "search", "input": {"query": "東京 weather", "limit": 3}}}
+
+
+def test_text():
+    events = [{"data": "Hel"}, {"data": "lo"}, assistant({"text": "Hello, 世界"})]
+    assert encode(events) == "".join(legacy_stream(events))
+
+
+def test_tool_use():
+    events = [assistant(TOOL_USE), assistant({"text": "Let me search."}, TOOL_USE)]
+    assert encode(events) == "".join(legacy_stream(events))
+
+
+def test_tool_result():
+    events = [
+        tool_result({"text": "short"}),
+        tool_result({"text": "a" * 150}, {"json": {"ignored": True}}, {"text": "b" * 150}),
+        tool_result({"text": "c" * 200}),
+        tool_result(),
+    ]
+    assert encode(events) == "".join(legacy_stream(events))
+
+
+def test_conversation():
+    events = [
+        {"init_event_loop": True},
+        assistant({"text": "Let me search."}, TOOL_USE),
+        tool_result({"text": "Sunny, 25°C"}),
+        assistant({"text": "It is sunny."}),
+        {"result": None},
+    ]
+    assert encode(events) == "".join(legacy_stream(events))
+
+
+def test_error():
+    # The original app had no error event; errors are shown in the chat like assistant text
+    encoder = TextTraceStreamEncoder()
+    message = "An error occurred while processing your request: 失敗"
+    assert encoder.encode_error(message).decode() == stream_chunk(message, None)
+
+
+def test_mcp_api_system_prompt():
+    system_prompt = get_system_prompt("Be brief.", MCP_API_FIXED_SYSTEM_PROMPT)
+    assert system_prompt.startswith(MCP_API_FIXED_SYSTEM_PROMPT)
+    assert "AgentCore" not in system_prompt
+    assert "upload_files_to_s3_and_retrieve_s3_urls" not in system_prompt
+    assert "read_tool_result" not in system_prompt
+
+
+def delta(text):
+    return {"event": {"contentBlockDelta": {"delta": {"text": text}}}}
+
+
+async def stream(encoder, events):
+    """Stream events like the agent manager, returning the writes and their times"""
+    writes = []
+    start_time = time.monotonic()
+    async for event in iter_with_deadline(events, encoder.flush_deadline):
+        chunk = encoder.flush() if event is None else encoder.encode(event)
+        if chunk:
+            writes.append((time.monotonic() - start_time, chunk))
+    chunk = encoder.flush()
+    if chunk:
+        writes.append((time.monotonic() - start_time, chunk))
+    return writes
+
+
+def test_flush_when_due_without_next_event():
+    async def events():
+        for text in ("a", "b", "c"):
+            yield delta(text)
+        await asyncio.sleep(0.5)
+        yield {"event": {"messageStop": {"stopReason": "end_turn"}}}
+
+    writes = asyncio.run(stream(NDJSONStreamEncoder(max_bytes=1 << 20, max_ms=50), events()))
+    # The first delta right away, the buffered deltas when due, then the stop event
+    assert [chunk.count(b"\n") for _, chunk in writes] == [1, 2, 1]
+    assert writes[1][0] < 0.3
+    assert writes[2][0] >= 0.5
+
+
+def test_iter_with_deadline_raises_errors():
+    async def events():
+        yield delta("a")
+        raise RuntimeError("model failed")
+
+    with pytest.raises(RuntimeError, match="model failed"):
+        asyncio.run(stream(NDJSONStreamEncoder(), events()))
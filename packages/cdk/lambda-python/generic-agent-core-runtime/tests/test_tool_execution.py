@@ -0,0 +1,60 @@
+"""Time-limited execution of tool calls."""
+
+import asyncio
+import threading
+
+from strands import tool
+
+from src.config import TOOL_TIMEOUTS
+from src.metrics import metrics
+from src.tool_execution import ManagedTool, abandoned_tool_runs
+
+release = threading.Event()
+
+
+@tool
+def hanging_tool(text: str) -> str:
+    """Block until released"""
+    release.wait(5)
+    return text
+
+
+async def call(managed_tool: ManagedTool) -> list:
+    tool_use = {"toolUseId": "t1", "name": managed_tool.tool_name, "input": {"text": "hi"}}
+    return [event async for event in managed_tool.stream(tool_use, {})]
+
+
+def test_timed_out_sync_tool_is_tracked_until_its_thread_finishes(monkeypatch):
+    monkeypatch.setitem(TOOL_TIMEOUTS, "hanging_tool", 0.05)
+    release.clear()
+    managed_tool = ManagedTool(hanging_tool)
+
+    async def run():
+        events = await call(managed_tool)
+        latency = events[0]["callback"]["event"]["toolLatency"]
+        assert latency["timedOut"] is True
+        assert latency["status"] == "error"
+        assert "did not finish within 0.05s" in events[-1]["content"][0]["text"]
+
+        # The thread of the tool is still running and counted as abandoned
+        assert abandoned_tool_runs.running == 1
+        assert metrics.snapshot()["gauges"]["tool_abandoned_runs"] == 1
+
+        release.set()
+        for _ in range(100):
+            if abandoned_tool_runs.running == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert abandoned_tool_runs.running == 0
+        assert metrics.snapshot()["gauges"]["tool_abandoned_runs"] == 0
+
+    asyncio.run(run())
+    assert metrics.snapshot()["counters"]['tool_abandoned_runs_total{tool="hanging_tool"}'] == 1
+
+
+def test_sync_tool_within_its_timeout(monkeypatch):
+    monkeypatch.setitem(TOOL_TIMEOUTS, "hanging_tool", 5)
+    release.set()
+    events = asyncio.run(call(ManagedTool(hanging_tool)))
+    assert events[0]["callback"]["event"]["toolLatency"]["timedOut"] is False
+    assert events[-1]["status"] == "success"
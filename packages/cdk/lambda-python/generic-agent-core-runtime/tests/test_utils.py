@@ -0,0 +1,52 @@
+"""Parsing of request bodies with base64 media."""
+
+import base64
+import json
+
+import pytest
+
+from src.utils import RAW_DECODE_MIN_CHARS, PayloadTooLargeError, parse_request_body
+
+LARGE_MEDIA = b"\x89PNG" + bytes(range(256)) * 40
+assert len(base64.b64encode(LARGE_MEDIA)) > RAW_DECODE_MIN_CHARS
+
+
+def image_block(encoded: str) -> dict:
+    return {"image": {"format": "png", "source": {"bytes": encoded}}}
+
+
+def request_body(*blocks: dict, **fields) -> bytearray:
+    return bytearray(json.dumps({"prompt": list(blocks), **fields}).encode())
+
+
+@pytest.mark.parametrize("media", [LARGE_MEDIA, LARGE_MEDIA[:-1], LARGE_MEDIA[:-2], b"small"], ids=["large", "large-one-pad", "large-two-pads", "small"])
+def test_decodes_padded_and_unpadded_media(media):
+    encoded = base64.b64encode(media).decode()
+    for value in (encoded, encoded.rstrip("=")):
+        body = request_body(image_block(value))
+        assert parse_request_body(body)["prompt"][0]["image"]["source"]["bytes"] == media
+        assert not body
+
+
+def test_leaves_bytes_outside_of_media_blocks():
+    text = "hello world " * 500
+    encoded = base64.b64encode(LARGE_MEDIA).decode()
+    tool_use = {"toolUse": {"toolUseId": "t1", "name": "echo", "input": {"bytes": text, "nested": {"source": {"bytes": encoded}}}}}
+    request = parse_request_body(request_body(image_block(encoded), messages=[{"role": "assistant", "content": [tool_use]}]))
+    assert request["prompt"][0]["image"]["source"]["bytes"] == LARGE_MEDIA
+    assert request["messages"][0]["content"][0]["toolUse"]["input"] == tool_use["toolUse"]["input"]
+
+
+def test_malformed_body_raises_the_parse_error():
+    body = request_body(image_block(base64.b64encode(LARGE_MEDIA).decode()))
+    del body[-3:]
+    with pytest.raises(json.JSONDecodeError):
+        parse_request_body(body)
+    assert not body
+
+
+def test_media_over_the_limit():
+    body = request_body(image_block(base64.b64encode(LARGE_MEDIA).decode()))
+    with pytest.raises(PayloadTooLargeError):
+        parse_request_body(body, max_media_bytes=len(LARGE_MEDIA) // 2)
+    assert not body
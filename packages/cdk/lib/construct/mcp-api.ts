@@ -28,11 +28,16 @@ export class McpApi extends Construct {
   constructor(scope: Construct, id: string, props: McpApiProps) {
     super(scope, id);
     const mcpFunction = new DockerImageFunction(this, 'McpFunction', {
-      code: DockerImageCode.fromImageAsset('./mcp-api', {
-        networkMode: props.isSageMakerStudio
-          ? NetworkMode.custom('sagemaker')
-          : NetworkMode.DEFAULT,
-      }),
+      // mcp-api is served by the generic AgentCore runtime sources with its own entry point
+      code: DockerImageCode.fromImageAsset(
+        './lambda-python/generic-agent-core-runtime',
+        {
+          file: 'Dockerfile.mcp-api',
+          networkMode: props.isSageMakerStudio
+            ? NetworkMode.custom('sagemaker')
+            : NetworkMode.DEFAULT,
+        }
+      ),
       memorySize: 1024,
       ephemeralStorageSize: Size.mebibytes(1024),
       timeout: Duration.minutes(15),
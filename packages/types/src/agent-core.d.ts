@@ -246,6 +246,16 @@ export type StrandsMetadataEvent = {
   usage: StrandsUsage;
 };
 
+// Tool latency event (sent by the AgentCore runtime after each tool call)
+export type StrandsToolLatencyEvent = {
+  toolUseId: string;
+  name: string;
+  status?: 'success' | 'error';
+  timedOut: boolean;
+  queueMs: number;
+  latencyMs: number;
+};
+
 // Exception event base
 export type StrandsExceptionEvent = {
   message: string;
@@ -276,6 +286,7 @@ export type StrandsStreamEvent = {
   redactContent?: StrandsRedactContentEvent;
   serviceUnavailableException?: StrandsExceptionEvent;
   throttlingException?: StrandsExceptionEvent;
+  toolLatency?: StrandsToolLatencyEvent;
   validationException?: StrandsExceptionEvent;
 };
 
@@ -292,4 +303,5 @@ export type StrandsStreamEventType =
   | 'redactContent'
   | 'serviceUnavailableException'
   | 'throttlingException'
+  | 'toolLatency'
   | 'validationException';